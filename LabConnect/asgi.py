@@ -14,4 +14,22 @@ from django.core.asgi import get_asgi_application
 # Alteração aqui:
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LabConnect.settings.production')
 
-application = get_asgi_application()
\ No newline at end of file
+# Inicializa o Django antes de importar consumers/models
+django_asgi_app = get_asgi_application()
+
+try:
+    from channels.auth import AuthMiddlewareStack
+    from channels.routing import ProtocolTypeRouter, URLRouter
+    from channels.security.websocket import AllowedHostsOriginValidator
+except ImportError:
+    # Sem channels: apenas HTTP (as páginas continuam no polling)
+    application = django_asgi_app
+else:
+    from accounts.routing import websocket_urlpatterns
+
+    application = ProtocolTypeRouter({
+        'http': django_asgi_app,
+        'websocket': AllowedHostsOriginValidator(
+            AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        ),
+    })
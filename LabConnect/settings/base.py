@@ -50,6 +50,19 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'LabConnect.urls'
 
+# ASGI (HTTP + WebSocket de notificações via Django Channels, se instalado)
+ASGI_APPLICATION = 'LabConnect.asgi.application'
+
+# Notificações em tempo real: as páginas abrem o WebSocket em vez de fazer polling
+REALTIME_NOTIFICATIONS = os.environ.get('REALTIME_NOTIFICATIONS', 'False') == 'True'
+
+# Channel layer em memória (um único processo: desenvolvimento e testes)
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    }
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -158,6 +171,19 @@ WHATSAPP_ENABLED = os.environ.get('WHATSAPP_ENABLED', 'True') == 'True'
 WHATSAPP_SERVICE_URL = os.environ.get('WHATSAPP_SERVICE_URL', 'http://localhost:3000/api')
 WHATSAPP_API_KEY = os.environ.get('WHATSAPP_API_KEY', '')
 
+# Fila de saída do WhatsApp (processada por: python manage.py process_whatsapp_outbox)
+WHATSAPP_OUTBOX = {
+    'BATCH_SIZE': int(os.environ.get('WHATSAPP_OUTBOX_BATCH_SIZE', '20')),
+    'MAX_ATTEMPTS': int(os.environ.get('WHATSAPP_OUTBOX_MAX_ATTEMPTS', '6')),
+    'BACKOFF_BASE': 30,  # segundos; dobra a cada tentativa
+    'BACKOFF_MAX': 60 * 60,  # 1 hora
+    'RATE_LIMIT_PER_SECOND': float(os.environ.get('WHATSAPP_RATE_LIMIT_PER_SECOND', '1')),
+    'DEDUPE_WINDOW': 60 * 60,  # mensagens idênticas para o mesmo número em 1 hora são descartadas
+    'LOCK_TIMEOUT': 5 * 60,  # mensagens presas em 'sending' voltam para a fila após 5 minutos
+    'REQUEST_TIMEOUT': 15,
+    'POLL_INTERVAL': 2,
+}
+
 # Ollama configuration
 OLLAMA_API_URL = os.environ.get('OLLAMA_API_URL', 'http://localhost:11434/api/chat')
 OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3')
@@ -166,6 +192,16 @@ OLLAMA_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3')
 DOCLING_ENABLED = os.environ.get('DOCLING_ENABLED', 'True') == 'True'
 DOCLING_MODEL = os.environ.get('DOCLING_MODEL', "pt_core_news_sm")
 DOCLING_CACHE_DIR = os.path.join(BASE_DIR, 'docling_cache')
+# Carregar o modelo spaCy na inicialização (usar com 'gunicorn --preload'); senão, no primeiro uso
+DOCLING_PRELOAD = os.environ.get('DOCLING_PRELOAD', 'False') == 'True'
+
+# Análise NLP em lote (nlp.pipe) e cache das análises por conteúdo
+DOCLING_ANALYSIS = {
+    'BATCH_SIZE': int(os.environ.get('DOCLING_BATCH_SIZE', '64')),
+    'N_PROCESS': int(os.environ.get('DOCLING_N_PROCESS', '1')),
+    'MEMORY_CACHE_SIZE': 4096,
+    'DISK_CACHE': True,
+}
 
 SPACY_MODEL = 'pt_core_news_sm'
 
@@ -178,6 +214,15 @@ INVENTORY_AUTOMATION = {
     'MAX_FILE_SIZE': int(os.environ.get('MAX_IMPORT_FILE_SIZE', '10485760')),  # 10MB
 }
 
+# Tarefas longas do inventário (comando process_import_jobs)
+INVENTORY_JOBS = {
+    'WORKERS': int(os.environ.get('INVENTORY_JOBS_WORKERS', '2')),
+    'CHUNK_SIZE': int(os.environ.get('INVENTORY_JOBS_CHUNK_SIZE', '200')),  # linhas gravadas por transação
+    'MAX_ATTEMPTS': 3,
+    'STALE_AFTER': 10 * 60,  # tarefas sem heartbeat por 10 minutos são retomadas por outro worker
+    'POLL_INTERVAL': 2,
+}
+
 # Configurações de upload de arquivos
 FILE_UPLOAD_MAX_MEMORY_SIZE = INVENTORY_AUTOMATION['MAX_FILE_SIZE']
 DATA_UPLOAD_MAX_MEMORY_SIZE = INVENTORY_AUTOMATION['MAX_FILE_SIZE']
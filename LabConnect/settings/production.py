@@ -48,6 +48,17 @@ CACHES = {
     }
 }
 
+# Channel layer compartilhado entre os workers WSGI (que publicam) e o servidor ASGI (WebSocket)
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.environ.get('CHANNEL_REDIS_URL', os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/4'))],
+            'prefix': 'labconnect',
+        },
+    }
+}
+
 # Middleware adicional para produção
 MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
 # TEMPORARIAMENTE DESABILITADO - MIDDLEWARE.insert(2, 'performance_middleware.PerformanceMiddleware')
@@ -2,6 +2,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import User, PasswordResetRequest
+from .notifications import NotificationCounterService
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'user_type', 'is_approved', 'registration_date')
@@ -22,6 +23,7 @@ class CustomUserAdmin(UserAdmin):
     
     def approve_users(self, request, queryset):
         queryset.update(is_approved=True)
+        NotificationCounterService.invalidate(technicians=True)
         self.message_user(request, f"{queryset.count()} usuários foram aprovados com sucesso.")
     approve_users.short_description = "Aprovar usuários selecionados"
 
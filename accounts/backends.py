@@ -1,86 +1,311 @@
 # accounts/backends.py
 import msal
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import logging
+import threading
+import time
 from django.conf import settings
 from django.core.mail.backends.base import BaseEmailBackend
 
+logger = logging.getLogger(__name__)
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+GRAPH_SCOPES = ["https://graph.microsoft.com/.default"]
+
+# O $batch do Graph aceita até 20 requisições, mas no máximo 4 simultâneas por
+# caixa de correio; como todos os envios saem da mesma caixa, cada $batch leva
+# no máximo 4 sendMail
+GRAPH_MAILBOX_CONCURRENCY = 4
+
+# Respostas 429 (throttling): novas tentativas e espera máxima por Retry-After
+THROTTLE_RETRIES = 3
+MAX_RETRY_AFTER = 30
+
+# Renovar o token um pouco antes de expirar
+TOKEN_REFRESH_MARGIN = 5 * 60
+
+
+class _GraphConnection:
+    """
+    Estado compartilhado pelo processo: app MSAL (com seu cache de tokens),
+    último access token e sessão HTTP keep-alive para o Graph
+    """
+    _lock = threading.Lock()
+    _msal_app = None
+    _access_token = None
+    _expires_at = 0
+    _session = None
+
+    @classmethod
+    def get_session(cls):
+        if cls._session is None:
+            with cls._lock:
+                if cls._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+                    session.mount('https://', adapter)
+                    cls._session = session
+        return cls._session
+
+    @classmethod
+    def get_token(cls):
+        """
+        Retorna um access token válido, reutilizando o anterior até pouco antes de expirar
+
+        Raises:
+            Exception: se o token não puder ser obtido
+        """
+        if cls._access_token and time.time() < cls._expires_at:
+            return cls._access_token
+
+        with cls._lock:
+            if cls._access_token and time.time() < cls._expires_at:
+                return cls._access_token
+
+            if cls._msal_app is None:
+                cls._msal_app = msal.ConfidentialClientApplication(
+                    settings.MS_CLIENT_ID,
+                    authority=f"https://login.microsoftonline.com/{settings.MS_TENANT_ID}",
+                    client_credential=settings.MS_CLIENT_SECRET,
+                )
+
+            # Solicitar token para enviar emails (o MSAL consulta o próprio cache antes)
+            result = cls._msal_app.acquire_token_for_client(scopes=GRAPH_SCOPES)
+
+            if "access_token" not in result:
+                error = result.get("error")
+                error_description = result.get("error_description")
+                raise Exception(f"Erro ao obter token: {error} - {error_description}")
+
+            cls._access_token = result["access_token"]
+            cls._expires_at = time.time() + int(result.get("expires_in", 3600)) - TOKEN_REFRESH_MARGIN
+            return cls._access_token
+
+    @classmethod
+    def invalidate_token(cls):
+        with cls._lock:
+            cls._access_token = None
+            cls._expires_at = 0
+
+
+def _retry_after(headers):
+    """Segundos indicados no Retry-After (padrão 1s, limitado a MAX_RETRY_AFTER)"""
+    headers = {str(key).lower(): value for key, value in (headers or {}).items()}
+    try:
+        seconds = float(headers.get('retry-after', 1))
+    except (TypeError, ValueError):
+        seconds = 1
+    return min(max(seconds, 0), MAX_RETRY_AFTER)
+
+
+class GraphEmailError(Exception):
+    """
+    Falha no envio de parte das mensagens
+
+    Attributes:
+        failed_messages: mensagens que não foram entregues (as demais já foram
+            enviadas e não devem ser reenviadas)
+        sent_count: mensagens entregues
+    """
+
+    def __init__(self, message, failed_messages=(), sent_count=0):
+        super().__init__(message)
+        self.failed_messages = list(failed_messages)
+        self.sent_count = sent_count
+
+
 class MicrosoftGraphEmailBackend(BaseEmailBackend):
     def __init__(self, fail_silently=False, **kwargs):
         super().__init__(fail_silently=fail_silently)
         self.fail_silently = fail_silently
-        
+
     def send_messages(self, email_messages):
-        """Envia mensagens de email via Microsoft Graph API"""
+        """
+        Envia mensagens de email via Microsoft Graph API
+
+        Uma mensagem vai direto para /sendMail; várias mensagens são agrupadas
+        em chamadas $batch de até GRAPH_MAILBOX_CONCURRENCY envios. Envios
+        recusados por throttling (429) são repetidos após o Retry-After; o erro
+        final (GraphEmailError) lista só as mensagens que de fato falharam.
+        """
         if not email_messages:
             return 0
-            
-        # Configurações
-        client_id = settings.MS_CLIENT_ID
-        client_secret = settings.MS_CLIENT_SECRET
-        tenant_id = settings.MS_TENANT_ID
+
         sender_email = settings.MS_SENDER_EMAIL
-            
-        # Obter token
-        app = msal.ConfidentialClientApplication(
-            client_id,
-            authority=f"https://login.microsoftonline.com/{tenant_id}",
-            client_credential=client_secret,
-        )
-        
-        # Solicitar token para enviar emails
-        result = app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"])
-        
-        if "access_token" not in result:
-            error = result.get("error")
-            error_description = result.get("error_description")
+
+        try:
+            _GraphConnection.get_token()
+        except Exception as e:
             if not self.fail_silently:
-                raise Exception(f"Erro ao obter token: {error} - {error_description}")
+                raise
+            logger.warning(f"Erro ao obter token do Microsoft Graph: {str(e)}")
             return 0
-            
-        access_token = result["access_token"]
-        
-        # Enviar cada mensagem
+
         sent_count = 0
-        
-        for message in email_messages:
+        failures = []
+
+        for start in range(0, len(email_messages), GRAPH_MAILBOX_CONCURRENCY):
+            chunk = email_messages[start:start + GRAPH_MAILBOX_CONCURRENCY]
             try:
-                # Converter para formato Graph API
-                graph_message = self._build_graph_message(message)
-                
-                # Enviar via Graph API
-                response = requests.post(
-                    f"https://graph.microsoft.com/v1.0/users/{sender_email}/sendMail",
-                    headers={
-                        "Authorization": f"Bearer {access_token}",
-                        "Content-Type": "application/json"
-                    },
-                    data=json.dumps(graph_message)
-                )
-                
-                if response.status_code == 202:
-                    sent_count += 1
+                if len(chunk) == 1:
+                    sent, failed = self._send_single(chunk[0], sender_email)
                 else:
-                    if not self.fail_silently:
-                        response_json = response.json()
-                        error_msg = response_json.get('error', {}).get('message', 'Unknown error')
-                        raise Exception(f"Erro ao enviar email: {error_msg}")
+                    sent, failed = self._send_batch(chunk, sender_email)
             except Exception as e:
-                if not self.fail_silently:
-                    raise
-        
+                # Erro de rede/HTTP no lote inteiro: nenhuma mensagem do lote foi confirmada
+                sent, failed = 0, [(message, str(e)) for message in chunk]
+            sent_count += sent
+            failures.extend(failed)
+
+        if failures:
+            error_msg = (
+                f"Erro ao enviar {len(failures)} de {len(email_messages)} emails "
+                f"via Microsoft Graph: {failures[0][1]}"
+            )
+            if not self.fail_silently:
+                raise GraphEmailError(error_msg, [message for message, _ in failures], sent_count)
+            logger.warning(error_msg)
+
         return sent_count
-    
+
+    def _post(self, url, payload):
+        """
+        POST autenticado no Graph, renovando o token uma vez se ele for recusado
+
+        O token é lido a cada chamada: depois de uma renovação, os lotes
+        seguintes já usam o novo token.
+        """
+        session = _GraphConnection.get_session()
+
+        def do_post(token):
+            return session.post(
+                url,
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": "application/json"
+                },
+                data=json.dumps(payload),
+                timeout=30
+            )
+
+        response = do_post(_GraphConnection.get_token())
+        if response.status_code == 401:
+            _GraphConnection.invalidate_token()
+            response = do_post(_GraphConnection.get_token())
+
+        # Throttling da chamada inteira: nada foi processado, pode repetir
+        for _ in range(THROTTLE_RETRIES):
+            if response.status_code != 429:
+                break
+            time.sleep(_retry_after(response.headers))
+            response = do_post(_GraphConnection.get_token())
+        return response
+
+    @staticmethod
+    def _error_message(body, status):
+        return ((body or {}).get('error') or {}).get('message') or f"HTTP {status}"
+
+    def _send_single(self, message, sender_email):
+        """
+        Envia uma mensagem via /sendMail
+
+        Returns:
+            tuple: (enviadas, [(mensagem, erro), ...])
+        """
+        response = self._post(
+            f"{GRAPH_BASE_URL}/users/{sender_email}/sendMail",
+            self._build_graph_message(message)
+        )
+
+        if response.status_code == 202:
+            return 1, []
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        return 0, [(message, self._error_message(body, response.status_code))]
+
+    def _send_batch(self, messages, sender_email):
+        """
+        Envia até GRAPH_MAILBOX_CONCURRENCY mensagens em uma chamada $batch
+
+        Sub-requisições recusadas com 429 são reenviadas (apenas elas) após o
+        maior Retry-After recebido; as já aceitas (202) nunca são reenviadas.
+
+        Returns:
+            tuple: (enviadas, [(mensagem, erro), ...])
+        """
+        pending = {str(index): message for index, message in enumerate(messages)}
+        sent_count = 0
+        failures = []
+
+        for attempt in range(THROTTLE_RETRIES + 1):
+            batch_requests = [
+                {
+                    "id": request_id,
+                    "method": "POST",
+                    "url": f"/users/{sender_email}/sendMail",
+                    "headers": {"Content-Type": "application/json"},
+                    "body": self._build_graph_message(message),
+                }
+                for request_id, message in pending.items()
+            ]
+
+            response = self._post(f"{GRAPH_BASE_URL}/$batch", {"requests": batch_requests})
+
+            if response.status_code != 200:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                error = f"Erro ao enviar emails em lote: {self._error_message(body, response.status_code)}"
+                failures.extend((message, error) for message in pending.values())
+                return sent_count, failures
+
+            responses = response.json().get('responses', [])
+            throttled = {}
+            wait_seconds = 0
+            for item in responses:
+                message = pending.get(str(item.get('id')))
+                if message is None:
+                    continue
+                status = item.get('status')
+                if status == 202:
+                    sent_count += 1
+                elif status == 429 and attempt < THROTTLE_RETRIES:
+                    throttled[str(item.get('id'))] = message
+                    wait_seconds = max(wait_seconds, _retry_after(item.get('headers')))
+                else:
+                    failures.append((message, self._error_message(item.get('body'), status)))
+
+            # Sub-requisições sem resposta não foram confirmadas
+            answered = {str(item.get('id')) for item in responses}
+            failures.extend(
+                (message, 'Sem resposta no lote')
+                for request_id, message in pending.items() if request_id not in answered
+            )
+
+            if not throttled:
+                break
+            logger.info(f"Graph throttling: reenviando {len(throttled)} email(s) em {wait_seconds}s")
+            time.sleep(wait_seconds)
+            pending = throttled
+
+        return sent_count, failures
+
     def _build_graph_message(self, email_message):
         """Converte EmailMessage do Django para formato Graph API"""
         to_recipients = [{"emailAddress": {"address": email}} for email in email_message.to]
         cc_recipients = [{"emailAddress": {"address": email}} for email in getattr(email_message, 'cc', []) or []]
         bcc_recipients = [{"emailAddress": {"address": email}} for email in getattr(email_message, 'bcc', []) or []]
-        
+
         # Corpo da mensagem
-        body = {"contentType": "HTML" if hasattr(email_message, 'content_subtype') and email_message.content_subtype == "html" else "Text", 
+        body = {"contentType": "HTML" if hasattr(email_message, 'content_subtype') and email_message.content_subtype == "html" else "Text",
                 "content": email_message.body}
-        
+
         # Mensagem no formato Graph API
         graph_message = {
             "message": {
@@ -90,10 +315,10 @@ class MicrosoftGraphEmailBackend(BaseEmailBackend):
             },
             "saveToSentItems": "true"
         }
-        
+
         if cc_recipients:
             graph_message["message"]["ccRecipients"] = cc_recipients
         if bcc_recipients:
             graph_message["message"]["bccRecipients"] = bcc_recipients
-            
-        return graph_message
\ No newline at end of file
+
+        return graph_message
@@ -0,0 +1,47 @@
+# accounts/consumers.py
+"""
+Consumer WebSocket das notificações em tempo real
+
+Cada conexão entra no grupo do usuário e, para técnicos, no grupo de todos os
+técnicos; os eventos publicados pelo NotificationPushService são repassados
+ao navegador como JSON.
+"""
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import TECHNICIANS_GROUP, user_group
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """Canal de eventos de notificação do usuário autenticado"""
+
+    async def connect(self):
+        # AuthMiddlewareStack já resolveu o usuário da sessão antes do connect
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated or not user.is_approved:
+            await self.close()
+            return
+
+        self.notification_groups = [user_group(user.id)]
+        if user.user_type == 'technician':
+            self.notification_groups.append(TECHNICIANS_GROUP)
+
+        for group in self.notification_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+
+        await self.accept()
+        await self.send_json({
+            'type': 'connection.ready',
+            'user_id': user.id,
+            'user_type': user.user_type,
+        })
+
+    async def disconnect(self, code):
+        for group in getattr(self, 'notification_groups', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Canal só de saída; mensagens do navegador são ignoradas
+        pass
+
+    async def notification_event(self, message):
+        await self.send_json(message['event'])
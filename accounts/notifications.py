@@ -0,0 +1,218 @@
+# accounts/notifications.py
+"""
+Contadores de notificações materializados no cache por usuário
+
+O context processor da sidebar lê apenas estes contadores (uma leitura de
+cache por página). Eles são recalculados sob demanda quando a entrada não
+existe e descartados pelos signals de ScheduleRequest, ScheduleRequestComment
+e User. A lista do dropdown de notificações é montada por um endpoint
+separado, carregado só quando o usuário abre o menu.
+"""
+import logging
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from cache_manager import CacheManager
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationCounterService:
+    """Contadores de notificações por usuário"""
+
+    CACHE_PREFIX = 'notification_counters'
+    # Os contadores de técnicos dependem de dados globais: em vez de apagar a
+    # chave de cada técnico, todos são gravados sob esta tag do CacheManager
+    TECHNICIANS_TAG = CacheManager.tag('notification_counters', 'technicians')
+    # Rede de segurança para a janela de 7 dias das atualizações de status
+    CACHE_TTL = 60 * 5
+
+    EMPTY_COUNTERS = {
+        'pending_requests_count': 0,
+        'pending_count': 0,
+        'notifications_count': 0,
+    }
+
+    @classmethod
+    def get_cache_key(cls, user):
+        return f'{cls.CACHE_PREFIX}_user_{user.id}'
+
+    @classmethod
+    def get_counters(cls, user):
+        """
+        Retorna os contadores da sidebar/cabeçalho do usuário
+
+        Returns:
+            dict: pending_requests_count, pending_count e notifications_count
+        """
+        if user.user_type not in ('technician', 'professor'):
+            return dict(cls.EMPTY_COUNTERS)
+
+        if user.user_type == 'technician':
+            counters = CacheManager.get_cache(cls.CACHE_PREFIX, 'technician', user.id)
+            if counters is None:
+                counters = cls._compute_technician_counters(user)
+                CacheManager.set_cache(
+                    cls.CACHE_PREFIX, counters, 'technician', user.id,
+                    ttl=cls.CACHE_TTL, tags=[cls.TECHNICIANS_TAG]
+                )
+            return counters
+
+        cache_key = cls.get_cache_key(user)
+        counters = cache.get(cache_key)
+        if counters is None:
+            counters = cls._compute_professor_counters(user)
+            cache.set(cache_key, counters, cls.CACHE_TTL)
+        return counters
+
+    @staticmethod
+    def _compute_technician_counters(user):
+        from accounts.models import User
+        from scheduling.models import ScheduleRequest, ScheduleRequestComment
+
+        pending_requests = ScheduleRequest.objects.filter(status='pending').count()
+        pending_users = User.objects.filter(is_approved=False).count()
+        unread_messages = ScheduleRequestComment.objects.filter(
+            schedule_request__status='pending',
+            is_read=False
+        ).exclude(author=user).count()
+
+        return {
+            'pending_requests_count': pending_requests,
+            'pending_count': pending_users,
+            'notifications_count': unread_messages + pending_requests + pending_users,
+        }
+
+    @staticmethod
+    def _compute_professor_counters(user):
+        from scheduling.models import ScheduleRequest, ScheduleRequestComment
+
+        unread_messages = ScheduleRequestComment.objects.filter(
+            schedule_request__professor=user,
+            is_read=False
+        ).exclude(author=user).count()
+
+        # Atualizações de status (aprovadas/rejeitadas) dos últimos 7 dias
+        recent_status_updates = ScheduleRequest.objects.filter(
+            professor=user,
+            status__in=['approved', 'rejected'],
+            review_date__isnull=False,
+            review_date__gte=timezone.now() - timezone.timedelta(days=7)
+        ).count()
+
+        return {
+            'pending_requests_count': 0,
+            'pending_count': 0,
+            'notifications_count': unread_messages + recent_status_updates,
+        }
+
+    @classmethod
+    def invalidate(cls, user_ids=(), technicians=False):
+        """
+        Descarta contadores após o commit da transação atual
+
+        Args:
+            user_ids: ids de usuários (professores) afetados
+            technicians (bool): se os contadores de todos os técnicos mudaram
+        """
+        user_ids = {user_id for user_id in user_ids if user_id}
+
+        def do_invalidate():
+            if user_ids:
+                cache.delete_many([f'{cls.CACHE_PREFIX}_user_{user_id}' for user_id in user_ids])
+            if technicians:
+                CacheManager.invalidate_tags(cls.TECHNICIANS_TAG)
+
+        transaction.on_commit(do_invalidate)
+
+    @staticmethod
+    def build_notifications(user, limit=10):
+        """
+        Monta a lista de notificações do dropdown do cabeçalho
+
+        Returns:
+            list: dicionários com title, message, timestamp, type, url e icon
+        """
+        from scheduling.models import ScheduleRequest, ScheduleRequestComment
+
+        notifications = []
+
+        if user.user_type == 'technician':
+            counters = NotificationCounterService.get_counters(user)
+            pending_requests = counters['pending_requests_count']
+            pending_users = counters['pending_count']
+
+            # Mensagens não lidas dos professores
+            unread_messages = ScheduleRequestComment.objects.filter(
+                schedule_request__status='pending',
+                is_read=False
+            ).exclude(author=user).select_related('author').order_by('-created_at')[:limit]
+
+            for message in unread_messages:
+                notifications.append({
+                    'title': f'Mensagem de {message.author.get_full_name()}',
+                    'message': message.message[:50] + '...' if len(message.message) > 50 else message.message,
+                    'timestamp': message.created_at,
+                    'type': 'message',
+                    'url': f'/scheduling/request/{message.schedule_request_id}/',
+                    'icon': 'bi bi-chat-dots'
+                })
+
+            if pending_requests > 0:
+                notifications.append({
+                    'title': 'Solicitações Pendentes',
+                    'message': f'{pending_requests} solicitação(ões) aguardando aprovação',
+                    'timestamp': None,
+                    'type': 'pending_requests',
+                    'url': '/scheduling/pending/',
+                    'icon': 'bi bi-hourglass-split'
+                })
+
+            if pending_users > 0:
+                notifications.append({
+                    'title': 'Usuários Aguardando Aprovação',
+                    'message': f'{pending_users} usuário(s) aguardando aprovação',
+                    'timestamp': None,
+                    'type': 'pending_users',
+                    'url': '/accounts/pending-users/',
+                    'icon': 'bi bi-person-plus'
+                })
+
+        elif user.user_type == 'professor':
+            # Mensagens não lidas dos técnicos
+            unread_messages = ScheduleRequestComment.objects.filter(
+                schedule_request__professor=user,
+                is_read=False
+            ).exclude(author=user).order_by('-created_at')[:limit]
+
+            for message in unread_messages:
+                notifications.append({
+                    'title': 'Mensagem do Técnico',
+                    'message': message.message[:50] + '...' if len(message.message) > 50 else message.message,
+                    'timestamp': message.created_at,
+                    'type': 'message',
+                    'url': f'/scheduling/request/{message.schedule_request_id}/',
+                    'icon': 'bi bi-chat-dots'
+                })
+
+            recent_reviews = ScheduleRequest.objects.filter(
+                professor=user,
+                status__in=['approved', 'rejected'],
+                review_date__isnull=False
+            ).select_related('laboratory').order_by('-review_date')[:3]
+
+            for review in recent_reviews:
+                status_text = 'aprovada' if review.status == 'approved' else 'rejeitada'
+                notifications.append({
+                    'title': f'Solicitação {status_text}',
+                    'message': f'Sua solicitação para {review.laboratory.name} foi {status_text}',
+                    'timestamp': review.review_date,
+                    'type': 'status_update',
+                    'url': f'/scheduling/request/{review.id}/',
+                    'icon': 'bi bi-check-circle' if review.status == 'approved' else 'bi bi-x-circle'
+                })
+
+        # Mais recentes primeiro
+        notifications.sort(key=lambda x: x['timestamp'] or timezone.now(), reverse=True)
+        return notifications[:limit]
@@ -0,0 +1,166 @@
+# accounts/realtime.py
+"""
+Eventos de notificação em tempo real (WebSocket via Django Channels)
+
+Os signals de ScheduleRequest e ScheduleRequestComment (e a revisão em lote)
+publicam, após o commit, mudanças de status, novos comentários e os deltas
+dos contadores da sidebar/cabeçalho nos grupos dos usuários afetados. Abas
+conectadas aplicam os deltas e deixam de consultar as APIs de polling; os
+contadores exatos continuam vindo do NotificationCounterService a cada página.
+
+Sem channels instalado (ou sem CHANNEL_LAYERS) a publicação é ignorada e as
+páginas continuam no polling.
+"""
+import logging
+from collections import defaultdict
+from django.db import transaction
+
+try:
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+    CHANNELS_AVAILABLE = True
+except ImportError:
+    CHANNELS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Grupo com todos os técnicos conectados (contadores globais)
+TECHNICIANS_GROUP = 'notifications_technicians'
+
+# Status que contam como atualização de status para o professor
+REVIEWED_STATUSES = ('approved', 'rejected')
+
+
+def user_group(user_id):
+    return f'notifications_user_{user_id}'
+
+
+class NotificationPushService:
+    """Publicação de eventos nos grupos de usuários/técnicos do channel layer"""
+
+    # Tipo da mensagem no channel layer -> NotificationConsumer.notification_event
+    MESSAGE_TYPE = 'notification.event'
+
+    @classmethod
+    def publish(cls, event, user_ids=(), technicians=False):
+        """
+        Publica um evento após o commit da transação atual
+
+        Args:
+            event (dict): payload enviado ao navegador (com a chave 'type')
+            user_ids: ids dos usuários que recebem o evento
+            technicians (bool): se todos os técnicos recebem o evento
+        """
+        if not CHANNELS_AVAILABLE:
+            return
+
+        groups = [user_group(user_id) for user_id in sorted({user_id for user_id in user_ids if user_id})]
+        if technicians:
+            groups.append(TECHNICIANS_GROUP)
+        if groups:
+            transaction.on_commit(lambda: cls._send(groups, event))
+
+    @classmethod
+    def _send(cls, groups, event):
+        message = {'type': cls.MESSAGE_TYPE, 'event': event}
+        try:
+            # Dentro do try: o backend configurado pode não estar instalado
+            # (ex.: channels_redis) e isto roda após o commit da requisição
+            channel_layer = get_channel_layer()
+            if channel_layer is None:
+                return
+            group_send = async_to_sync(channel_layer.group_send)
+            for group in groups:
+                group_send(group, message)
+        except Exception as e:
+            # Falha no channel layer não pode afetar a requisição; os clientes voltam ao polling
+            logger.warning(f"Erro ao publicar evento em tempo real ({event.get('type')}): {str(e)}")
+
+    @classmethod
+    def publish_schedule_changes(cls, changes):
+        """
+        Publica mudanças de solicitações para os professores e técnicos
+
+        Cada professor recebe só as suas solicitações; os técnicos recebem todas.
+        Os deltas seguem o cálculo do NotificationCounterService: solicitações
+        pendentes (técnicos) e atualizações de status aprovadas/rejeitadas
+        (professor).
+
+        Args:
+            changes: tuplas (solicitação, status anterior ou None, removida)
+        """
+        if not CHANNELS_AVAILABLE:
+            return
+
+        schedules = []
+        by_professor = defaultdict(list)
+        professor_deltas = defaultdict(int)
+        pending_delta = 0
+
+        for schedule, previous_status, deleted in changes:
+            status = None if deleted else schedule.status
+            item = {
+                'id': schedule.id,
+                'status': status,
+                'previous_status': previous_status,
+                'laboratory_id': schedule.laboratory_id,
+                'scheduled_date': str(schedule.scheduled_date) if schedule.scheduled_date else None,
+            }
+            schedules.append(item)
+            by_professor[schedule.professor_id].append(item)
+
+            pending_delta += (status == 'pending') - (previous_status == 'pending')
+            professor_deltas[schedule.professor_id] += (
+                (status in REVIEWED_STATUSES) - (previous_status in REVIEWED_STATUSES)
+            )
+
+        for professor_id, items in by_professor.items():
+            delta = professor_deltas[professor_id]
+            cls.publish({
+                'type': 'schedule.changed',
+                'schedules': items,
+                'counters': {'notifications_count': delta} if delta else {},
+            }, user_ids=[professor_id])
+
+        technician_counters = {}
+        if pending_delta:
+            technician_counters = {
+                'pending_requests_count': pending_delta,
+                'notifications_count': pending_delta,
+            }
+        cls.publish({
+            'type': 'schedule.changed',
+            'schedules': schedules,
+            'counters': technician_counters,
+        }, technicians=True)
+
+    @classmethod
+    def publish_comment(cls, comment, professor_id, schedule_status):
+        """
+        Publica um novo comentário para o professor da solicitação e os técnicos
+
+        O autor não conta a própria mensagem: o navegador ignora os deltas de
+        eventos em que author_id é o usuário conectado.
+        """
+        if not CHANNELS_AVAILABLE:
+            return
+
+        event = {
+            'type': 'comment.created',
+            'schedule_id': comment.schedule_request_id,
+            'comment_id': comment.id,
+            'author_id': comment.author_id,
+            'author_name': comment.author.get_full_name(),
+            'message': comment.message,
+            'created_at': str(comment.created_at) if comment.created_at else None,
+        }
+
+        cls.publish(dict(event, counters={'notifications_count': 1}), user_ids=[professor_id])
+        # Técnicos contam apenas mensagens de solicitações pendentes
+        technician_counters = {'notifications_count': 1} if schedule_status == 'pending' else {}
+        cls.publish(dict(event, counters=technician_counters), technicians=True)
+
+    @classmethod
+    def publish_notifications_read(cls, user_id):
+        """Avisa as outras abas do usuário que as notificações foram marcadas como lidas"""
+        cls.publish({'type': 'notifications.read', 'counters': {}}, user_ids=[user_id])
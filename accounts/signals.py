@@ -0,0 +1,15 @@
+# accounts/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import User
+from .notifications import NotificationCounterService
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """Atualiza o contador de usuários aguardando aprovação dos técnicos"""
+    # Saves parciais que não mexem na aprovação (ex.: last_login no login) não alteram contadores
+    if update_fields and 'is_approved' not in update_fields:
+        return
+    NotificationCounterService.invalidate([instance.id], technicians=True)
@@ -0,0 +1,147 @@
+# accounts/tests.py
+"""
+Testes das notificações em tempo real (WebSocket via Django Channels)
+
+Usam o InMemoryChannelLayer; são ignorados quando channels não está instalado
+(requirements-ci.txt não o inclui).
+"""
+from datetime import date, time
+from unittest import skipUnless
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+
+from accounts.models import User
+from accounts.realtime import TECHNICIANS_GROUP, user_group
+from laboratories.models import Laboratory
+from scheduling.models import ScheduleRequest, ScheduleRequestComment
+
+try:
+    from channels.layers import get_channel_layer
+    from channels.testing import WebsocketCommunicator
+    from accounts.consumers import NotificationConsumer
+    CHANNELS_AVAILABLE = True
+except ImportError:
+    CHANNELS_AVAILABLE = False
+
+
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@skipUnless(CHANNELS_AVAILABLE, 'channels não está instalado')
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class NotificationConsumerTests(TestCase):
+    """Autenticação e grupos do NotificationConsumer, e eventos publicados pelos signals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.professor = User.objects.create(
+            email='professor@cogna.com.br', first_name='Paula', last_name='Prof',
+            user_type='professor', is_approved=True,
+        )
+        cls.technician = User.objects.create(
+            email='tecnico@cogna.com.br', first_name='Tiago', last_name='Tec',
+            user_type='technician', is_approved=True,
+        )
+        cls.unapproved = User.objects.create(
+            email='novo@cogna.com.br', first_name='Nina', last_name='Nova',
+            user_type='professor', is_approved=False,
+        )
+        cls.laboratory = Laboratory.objects.create(name='Química 1', location='Bloco A', capacity=30)
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def connect_ready(self, user):
+        communicator, connected = await self.connect(user)
+        self.assertTrue(connected)
+        ready = await communicator.receive_json_from()
+        self.assertEqual(ready['type'], 'connection.ready')
+        self.assertEqual(ready['user_id'], user.id)
+        return communicator
+
+    async def test_rejects_anonymous_and_unapproved_users(self):
+        from django.contrib.auth.models import AnonymousUser
+
+        for user in (AnonymousUser(), self.unapproved):
+            communicator, connected = await self.connect(user)
+            self.assertFalse(connected)
+            await communicator.disconnect()
+
+    async def test_technicians_join_the_technician_group(self):
+        professor = await self.connect_ready(self.professor)
+        technician = await self.connect_ready(self.technician)
+        channel_layer = get_channel_layer()
+
+        await channel_layer.group_send(TECHNICIANS_GROUP, {
+            'type': 'notification.event', 'event': {'type': 'test.technicians'},
+        })
+        self.assertEqual((await technician.receive_json_from())['type'], 'test.technicians')
+        self.assertTrue(await professor.receive_nothing())
+
+        await channel_layer.group_send(user_group(self.professor.id), {
+            'type': 'notification.event', 'event': {'type': 'test.professor'},
+        })
+        self.assertEqual((await professor.receive_json_from())['type'], 'test.professor')
+        self.assertTrue(await technician.receive_nothing())
+
+        await professor.disconnect()
+        await technician.disconnect()
+
+    def save_and_commit(self, save):
+        """Executa save() e os callbacks on_commit (onde os eventos são publicados)"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return save()
+
+    async def test_signals_publish_events_with_counter_deltas(self):
+        professor = await self.connect_ready(self.professor)
+        technician = await self.connect_ready(self.technician)
+
+        # Nova solicitação pendente: +1 pendente para os técnicos, nada para o professor
+        schedule = await sync_to_async(self.save_and_commit)(lambda: ScheduleRequest.objects.create(
+            professor=self.professor, laboratory=self.laboratory, subject='Titulação',
+            scheduled_date=date(2030, 3, 14), start_time=time(8, 0), end_time=time(10, 0),
+        ))
+
+        event = await technician.receive_json_from()
+        self.assertEqual(event['type'], 'schedule.changed')
+        self.assertEqual(event['schedules'][0]['id'], schedule.id)
+        self.assertEqual(event['counters'], {'pending_requests_count': 1, 'notifications_count': 1})
+
+        event = await professor.receive_json_from()
+        self.assertEqual(event['type'], 'schedule.changed')
+        self.assertEqual(event['counters'], {})
+
+        # Aprovação: -1 pendente para os técnicos, +1 atualização de status para o professor
+        def approve():
+            schedule.status = 'approved'
+            schedule.save()
+        await sync_to_async(self.save_and_commit)(approve)
+
+        event = await technician.receive_json_from()
+        self.assertEqual(event['schedules'][0]['previous_status'], 'pending')
+        self.assertEqual(event['counters'], {'pending_requests_count': -1, 'notifications_count': -1})
+        event = await professor.receive_json_from()
+        self.assertEqual(event['schedules'][0]['status'], 'approved')
+        self.assertEqual(event['counters'], {'notifications_count': 1})
+
+        # Comentário do técnico em solicitação aprovada: conta só para o professor
+        comment = await sync_to_async(self.save_and_commit)(lambda: ScheduleRequestComment.objects.create(
+            schedule_request=schedule, author=self.technician, message='Bancada 3 reservada',
+        ))
+
+        event = await professor.receive_json_from()
+        self.assertEqual(event['type'], 'comment.created')
+        self.assertEqual(event['comment_id'], comment.id)
+        self.assertEqual(event['counters'], {'notifications_count': 1})
+        event = await technician.receive_json_from()
+        self.assertEqual(event['type'], 'comment.created')
+        self.assertEqual(event['counters'], {})
+
+        self.assertTrue(await professor.receive_nothing())
+        self.assertTrue(await technician.receive_nothing())
+        await professor.disconnect()
+        await technician.disconnect()
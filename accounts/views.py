@@ -101,17 +101,20 @@ def is_professor(user):
 @login_required
 @user_passes_test(is_technician)
 def pending_approvals(request):
-    from django.core.cache import cache
-    # Cache otimizado para lista de usuários pendentes
-    cache_key = f'pending_users_{request.user.id}'
-    pending_users = cache.get(cache_key)
+    from cache_manager import CacheManager
+    # Cache otimizado para lista de usuários pendentes (compartilhado entre técnicos,
+    # invalidado pela tag 'pending_users' quando qualquer usuário muda)
+    pending_users = CacheManager.get_cache('pending_users', 'list')
     
     if pending_users is None:
         pending_users = list(User.objects.filter(is_approved=False).select_related().only(
             'id', 'first_name', 'last_name', 'email', 'phone_number', 
             'user_type', 'lab_department', 'registration_date'
         ))
-        cache.set(cache_key, pending_users, 120)  # Cache por 2 minutos
+        CacheManager.set_cache(
+            'pending_users', pending_users, 'list', ttl=120,  # Cache por 2 minutos
+            tags=(CacheManager.tag('pending_users'),)
+        )
     
     # Suporte a AJAX para atualizações em tempo real
     is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
@@ -142,8 +145,7 @@ def pending_approvals(request):
                     user.delete()  # Ou marcar como rejeitado ao invés de deletar
                     messages.warning(request, f'Usuário {user.get_full_name()} foi rejeitado.')
                 
-                # Invalidar cache após mudanças
-                cache.delete(f'pending_users_{request.user.id}')
+                # Cache da lista é invalidado pelo signal de User (tag 'pending_users')
                 
                 # Resposta AJAX ou redirect normal
                 if is_ajax:
@@ -6,6 +6,9 @@ from django.core.cache import cache
 from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 import logging
+import math
+import random
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +31,29 @@ class CacheManager:
         'materials_stats': 600,      # 10 minutos
         'user_data': 3600,           # 1 hora
         'laboratory_data': 1800,     # 30 minutos
+        'chart_data': 600,           # 10 minutos
+        'ai_duplicates': 3600,       # 1 hora (invalidado por alterações em Material)
+        'similarity_index': 3600,    # 1 hora (invalidado quando palavras-chave mudam)
+        'calendar_events': 600,      # 10 minutos (invalidado por alterações em agendamentos)
+        'availability_matrix': 600,  # 10 minutos (invalidado por agendamentos aprovados)
+        'professor_stats': 600,      # 10 minutos (invalidado por agendamentos e comentários do professor)
     }
     
+    # Stampede: tempo extra em que um valor vencido ainda pode ser servido,
+    # duração máxima do lock de recálculo e espera quando não há valor antigo
+    STALE_TTL = 120
+    LOCK_TIMEOUT = 30
+    LOCK_WAIT = 2
+    
+    # Prefixo das chaves que guardam a versão de cada tag
+    TAG_VERSION_PREFIX = 'cache_tag_version'
+    
+    # Chaves antigas (sem tags) ainda removidas por compatibilidade
+    LEGACY_SCHEDULING_KEYS = [
+        'pending_requests_list',
+        'pending_appointments_count',
+    ]
+    
     @classmethod
     def get_cache_key(cls, cache_type, *args):
         """Gera chave de cache padronizada"""
@@ -37,23 +61,179 @@ class CacheManager:
         key_parts = [prefix, cache_type] + [str(arg) for arg in args]
         return '_'.join(key_parts)
     
+    # === TAGS / GERAÇÕES ===
+    #
+    # Cada valor é gravado junto com a versão atual das tags das quais depende
+    # (laboratório, departamento, usuário, status...). Invalidar uma tag é só
+    # incrementar sua versão: O(1), sem listar chaves e funcionando em qualquer
+    # backend (o RedisCache do Django não tem delete_pattern). Valores com
+    # versões antigas são tratados como MISS e expiram pelo TTL.
+    
+    @staticmethod
+    def tag(kind, value=None):
+        """Monta o nome de uma tag, ex.: tag('lab', 3) -> 'lab:3'"""
+        return kind if value is None else f'{kind}:{value}'
+    
+    @classmethod
+    def _tag_version_key(cls, tag):
+        return f'{cls.TAG_VERSION_PREFIX}:{tag}'
+    
+    @staticmethod
+    def _new_tag_version():
+        # Versão inicial baseada no relógio: se a chave de versão for despejada
+        # do cache, valores gravados com a versão anterior não voltam a valer
+        return time.time_ns()
+    
+    @classmethod
+    def get_tag_versions(cls, tags):
+        """Retorna {tag: versão atual}, inicializando tags ainda sem versão"""
+        keys = {cls._tag_version_key(tag): tag for tag in tags}
+        if not keys:
+            return {}
+        
+        found = cache.get_many(list(keys))
+        versions = {}
+        for key, tag in keys.items():
+            version = found.get(key)
+            if version is None:
+                cache.add(key, cls._new_tag_version(), None)
+                version = cache.get(key)
+            versions[tag] = version
+        return versions
+    
+    @classmethod
+    def invalidate_tags(cls, *tags):
+        """Invalida todos os valores registrados sob as tags informadas"""
+        for tag in set(tags):
+            key = cls._tag_version_key(tag)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Tag sem versão: nada foi gravado com a versão atual
+                cache.set(key, cls._new_tag_version(), None)
+        logger.debug(f"Cache tags invalidated: {sorted(set(tags))}")
+    
     @classmethod
-    def set_cache(cls, cache_type, value, *args, ttl=None):
-        """Define valor no cache com TTL apropriado"""
+    def wrap_value(cls, value, tags):
+        return {'value': value, 'tags': cls.get_tag_versions(tags)}
+    
+    @classmethod
+    def is_current(cls, entry):
+        """Verifica se as tags do valor ainda estão na mesma versão"""
+        return cls.get_tag_versions(entry['tags']) == entry['tags']
+    
+    @classmethod
+    def set_cache(cls, cache_type, value, *args, ttl=None, tags=()):
+        """
+        Define valor no cache com TTL apropriado
+        
+        O próprio cache_type sempre é registrado como tag, junto com as tags
+        extras informadas.
+        """
         key = cls.get_cache_key(cache_type, *args)
         if ttl is None:
             ttl = cls.CACHE_TTL.get(cache_type, 300)
         
-        cache.set(key, value, ttl)
-        logger.debug(f"Cache SET: {key} (TTL: {ttl}s)")
+        cache.set(key, cls.wrap_value(value, (cache_type,) + tuple(tags)), ttl)
+        logger.debug(f"Cache SET: {key} (TTL: {ttl}s, tags: {list(tags)})")
         return key
     
     @classmethod
     def get_cache(cls, cache_type, *args):
-        """Obtém valor do cache"""
+        """Obtém valor do cache (None se ausente ou invalidado por alguma tag)"""
         key = cls.get_cache_key(cache_type, *args)
-        value = cache.get(key)
-        logger.debug(f"Cache GET: {key} {'HIT' if value is not None else 'MISS'}")
+        entry = cache.get(key)
+        
+        if entry is None or not cls.is_current(entry) or entry.get('expires_at', math.inf) < time.time():
+            logger.debug(f"Cache GET: {key} MISS")
+            return None
+        
+        logger.debug(f"Cache GET: {key} HIT")
+        return entry['value']
+    
+    @classmethod
+    def get_or_compute(cls, cache_type, *args, compute, ttl=None, tags=(), stale_ttl=None, beta=1.0):
+        """
+        Cache-aside com proteção contra stampede
+        
+        - Só um worker recalcula por vez (lock com cache.add, equivalente ao SET NX do Redis);
+        - Recalcula antes de expirar com probabilidade crescente (XFetch), usando o
+          tempo que o último cálculo levou;
+        - Enquanto um worker recalcula, os demais recebem o último valor
+          (stale-while-revalidate), inclusive após invalidação por tags.
+        
+        Args:
+            cache_type (str): tipo do cache (prefixo, TTL padrão e tag)
+            args: partes adicionais da chave
+            compute (callable): função sem argumentos que calcula o valor
+            ttl (int): tempo (s) em que o valor é considerado fresco
+            tags: tags adicionais das quais o valor depende, ou função que as
+                retorna (avaliada só quando o valor é recalculado)
+            stale_ttl (int): tempo extra (s) em que o valor antigo ainda pode ser servido
+            beta (float): agressividade do recálculo antecipado (1.0 = padrão do XFetch)
+        """
+        key = cls.get_cache_key(cache_type, *args)
+        if ttl is None:
+            ttl = cls.CACHE_TTL.get(cache_type, 300)
+        if stale_ttl is None:
+            stale_ttl = cls.STALE_TTL
+        
+        entry = cache.get(key)
+        if entry is not None and not cls._should_recompute(entry, beta):
+            return entry['value']
+        
+        lock_key = f'{key}:lock'
+        if cache.add(lock_key, 1, cls.LOCK_TIMEOUT):
+            try:
+                return cls._compute_and_set(key, compute, ttl, stale_ttl, cache_type, tags)
+            finally:
+                cache.delete(lock_key)
+        
+        if entry is not None:
+            logger.debug(f"Cache STALE: {key} (recálculo em andamento)")
+            return entry['value']
+        
+        # Sem valor antigo para servir: aguardar brevemente o worker que está calculando
+        deadline = time.monotonic() + cls.LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry['value']
+        
+        logger.warning(f"Cache lock wait expired: {key}, calculando sem lock")
+        return cls._compute_and_set(key, compute, ttl, stale_ttl, cache_type, tags)
+    
+    @classmethod
+    def _should_recompute(cls, entry, beta):
+        """Decide se o valor deve ser recalculado (invalidado, expirado ou XFetch)"""
+        if not cls.is_current(entry):
+            return True
+        expires_at = entry.get('expires_at')
+        if expires_at is None:
+            return False
+        # XFetch: antecipa o recálculo proporcionalmente ao custo do último cálculo
+        delta = entry.get('delta', 0)
+        return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+    
+    @classmethod
+    def _compute_and_set(cls, key, compute, ttl, stale_ttl, cache_type, tags):
+        if callable(tags):
+            tags = tags()
+        # Ler as versões antes de calcular: uma invalidação durante o cálculo
+        # deixa o valor já marcado como desatualizado
+        tag_versions = cls.get_tag_versions((cache_type,) + tuple(tags))
+        started = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - started
+        
+        cache.set(key, {
+            'value': value,
+            'tags': tag_versions,
+            'expires_at': time.time() + ttl,
+            'delta': delta,
+        }, ttl + stale_ttl)
+        logger.debug(f"Cache COMPUTE: {key} ({delta:.3f}s, TTL: {ttl}s)")
         return value
     
     @classmethod
@@ -65,170 +245,138 @@ class CacheManager:
     
     @classmethod
     def invalidate_pattern(cls, pattern):
-        """Invalida todas as chaves que correspondem a um padrão"""
-        # Para Redis: usar delete_pattern
-        # Para outros backends: implementar busca manual
-        try:
-            if hasattr(cache, 'delete_pattern'):
-                cache.delete_pattern(f"*{pattern}*")
-                logger.info(f"Cache invalidated pattern: {pattern}")
-            else:
-                # Fallback: limpar manualmente as chaves conhecidas que correspondem ao padrão
-                if 'pending_requests' in pattern:
-                    keys_to_delete = [
-                        'pending_requests_list',
-                        'pending_appointments_count',
-                    ]
-                    # Adicionar chaves dinâmicas de usuários (limitar aos últimos 10 users ativos)
-                    for user_id in range(1, 11):  # Assumindo IDs de usuário de 1 a 10
-                        keys_to_delete.append(f'pending_requests_list_{user_id}')
-                    
-                    cache.delete_many(keys_to_delete)
-                    logger.info(f"Cache invalidated manually for pattern: {pattern}")
-                elif 'dashboard' in pattern:
-                    keys_to_delete = [
-                        'dashboard_stats_technician',
-                        'dashboard_stats_professor',
-                        'dash_dashboard_stats',
-                        'dash_pending_requests',
-                        'dash_pending_appointments'
-                    ]
-                    cache.delete_many(keys_to_delete)
-                    logger.info(f"Dashboard cache invalidated manually for pattern: {pattern}")
-                elif 'appointments' in pattern:
-                    keys_to_delete = [
-                        'dash_pending_appointments',
-                        'pending_appointments_count'
-                    ]
-                    cache.delete_many(keys_to_delete)
-                    logger.info(f"Appointments cache invalidated manually for pattern: {pattern}")
-                else:
-                    logger.debug(f"No manual invalidation rule for pattern: {pattern} (this is not an error)")
-        except Exception as e:
-            logger.error(f"Error invalidating cache pattern {pattern}: {e}")
+        """
+        Invalida todos os valores gravados com o cache_type/tag informado
+        
+        Mantido por compatibilidade: equivale a invalidate_tags(pattern).
+        """
+        cls.invalidate_tags(pattern)
     
     @classmethod
     def invalidate_dashboard_cache(cls, user_type=None, department=None):
         """Invalida cache do dashboard"""
-        patterns = ['dash_dashboard_stats', 'dash_pending_requests']
+        tags = [cls.tag('dashboard')]
         
         if user_type:
-            patterns.append(f'dash_dashboard_stats_{user_type}')
+            tags.append(cls.tag('user_type', user_type))
         if department:
-            patterns.append(f'dash_dashboard_stats_{department}')
-            patterns.append(f'mat_materials_stats_{department}')
+            tags.append(cls.tag('department', department))
         
-        for pattern in patterns:
-            cls.invalidate_pattern(pattern)
+        cls.invalidate_tags(*tags)
     
     @classmethod
     def invalidate_scheduling_cache(cls, user_id=None):
         """Invalida cache de agendamentos"""
-        patterns = ['sched_pending_requests', 'dash_pending_appointments']
+        tags = [cls.tag('scheduling')]
         
         if user_id:
-            patterns.append(f'sched_pending_requests_list_{user_id}')
+            tags.append(cls.tag('user', user_id))
         
-        for pattern in patterns:
-            cls.invalidate_pattern(pattern)
+        cls.invalidate_tags(*tags)
     
     @classmethod
     def invalidate_materials_cache(cls, department=None, laboratory_id=None):
         """Invalida cache de materiais"""
-        patterns = ['mat_materials_stats', 'inv_materials_list']
+        tags = [cls.tag('materials')]
         
         if department:
-            patterns.append(f'mat_materials_stats_{department}')
+            tags.append(cls.tag('department', department))
         if laboratory_id:
-            patterns.append(f'inv_materials_lab_{laboratory_id}')
+            tags.append(cls.tag('materials_lab', laboratory_id))
         
-        for pattern in patterns:
-            cls.invalidate_pattern(pattern)
+        cls.invalidate_tags(*tags)
     
     @classmethod
-    def force_invalidate_all_scheduling_cache(cls):
-        """Força invalidação completa de todos os caches de agendamento"""
-        # Lista completa de chaves de cache relacionadas a agendamentos
-        cache_keys = [
-            'pending_requests_list',
-            'pending_appointments_count',
-            'dashboard_stats_technician', 
-            'dashboard_stats_professor',
-            'dash_dashboard_stats',
-            'dash_pending_requests',
-            'sched_pending_requests',
-            'dash_pending_appointments'
-        ]
+    def get_schedule_tags(cls, schedule):
+        """Tags afetadas por uma mudança em um agendamento (estado atual e carregado)"""
+        tags = {
+            cls.tag('scheduling'),
+            cls.tag('lab', schedule.laboratory_id),
+            cls.tag('user', schedule.professor_id),
+            cls.tag('status', schedule.status),
+        }
+        loaded_slot = getattr(schedule, '_loaded_slot', None)
+        if loaded_slot and loaded_slot[0]:
+            tags.add(cls.tag('lab', loaded_slot[0]))
+        loaded_status = getattr(schedule, '_loaded_status', None)
+        if loaded_status:
+            tags.add(cls.tag('status', loaded_status))
+        return tags
+    
+    @classmethod
+    def invalidate_schedules(cls, *schedules, previous_status=None):
+        """
+        Invalida, após o commit, os caches que dependem dos agendamentos informados
         
-        # Adicionar chaves específicas de usuários (expandir conforme necessário)
-        for user_id in range(1, 21):  # Suporte para usuários ID 1-20
-            cache_keys.extend([
-                f'pending_requests_list_{user_id}',
-                f'sched_pending_requests_list_{user_id}',
-                f'dash_dashboard_stats_technician_{user_id}',
-                f'dash_dashboard_stats_professor_{user_id}'
-            ])
+        Args:
+            schedules: instâncias de ScheduleRequest alteradas
+            previous_status (str): status anterior, quando não está registrado na instância
+        """
+        from django.db import transaction
         
-        # Deletar todas as chaves
-        cache.delete_many(cache_keys)
-        logger.info(f"Force invalidated {len(cache_keys)} scheduling cache keys")
+        tags = set()
+        for schedule in schedules:
+            tags |= cls.get_schedule_tags(schedule)
+        if previous_status:
+            tags.add(cls.tag('status', previous_status))
         
-        # Também tentar invalidar por padrão se disponível
-        cls.invalidate_pattern('pending_requests')
-        cls.invalidate_pattern('dashboard')
+        if tags:
+            transaction.on_commit(lambda: cls.invalidate_tags(*tags))
+    
+    @classmethod
+    def force_invalidate_all_scheduling_cache(cls):
+        """Força invalidação completa de todos os caches de agendamento"""
+        cls.invalidate_tags(cls.tag('scheduling'), cls.tag('dashboard'))
+        cache.delete_many(cls.LEGACY_SCHEDULING_KEYS)
+        logger.info("Force invalidated scheduling and dashboard cache tags")
 
 
 # === SIGNALS PARA INVALIDAÇÃO AUTOMÁTICA ===
-
-@receiver(post_save, sender='scheduling.ScheduleRequest')
-def invalidate_schedule_cache(sender, instance, **kwargs):
-    """Invalida cache quando agendamento é modificado"""
-    CacheManager.invalidate_scheduling_cache()
-    CacheManager.invalidate_dashboard_cache()
-    logger.info(f"Cache invalidated due to ScheduleRequest change: {instance.id}")
-
-@receiver(post_delete, sender='scheduling.ScheduleRequest')
-def invalidate_schedule_cache_delete(sender, instance, **kwargs):
-    """Invalida cache quando agendamento é deletado"""
-    CacheManager.invalidate_scheduling_cache()
-    CacheManager.invalidate_dashboard_cache()
-    logger.info(f"Cache invalidated due to ScheduleRequest deletion: {instance.id}")
+# Agendamentos e comentários são tratados em scheduling/signals.py
 
 @receiver(post_save, sender='inventory.Material')
+@receiver(post_delete, sender='inventory.Material')
 def invalidate_material_cache(sender, instance, **kwargs):
-    """Invalida cache quando material é modificado"""
-    department = None
-    if instance.laboratory and hasattr(instance.laboratory, 'departments'):
-        dept_codes = instance.laboratory.get_departments_codes()
-        department = dept_codes[0] if dept_codes else None
-    
-    CacheManager.invalidate_materials_cache(department, instance.laboratory_id)
-    CacheManager.invalidate_dashboard_cache(department=department)
-    logger.info(f"Cache invalidated due to Material change: {instance.id}")
+    """Invalida cache quando material é modificado ou deletado"""
+    CacheManager.invalidate_materials_cache(laboratory_id=instance.laboratory_id)
+    logger.debug(f"Cache invalidated due to Material change: {instance.id}")
 
 @receiver(post_delete, sender='inventory.Material')
-def invalidate_material_cache_delete(sender, instance, **kwargs):
-    """Invalida cache quando material é deletado"""
-    CacheManager.invalidate_materials_cache()
-    CacheManager.invalidate_dashboard_cache()
-    logger.info(f"Cache invalidated due to Material deletion: {instance.id}")
+def invalidate_similarity_index(sender, instance, **kwargs):
+    """Material removido sai do índice de similaridade (alterações são tratadas no save)"""
+    from inventory.similarity import features_hash, invalidate_index
+    if features_hash(instance.analyzed_data):
+        invalidate_index()
+
+@receiver(post_save, sender='laboratories.Laboratory')
+@receiver(post_delete, sender='laboratories.Laboratory')
+def invalidate_laboratory_cache(sender, instance, **kwargs):
+    """Invalida cache quando laboratório é modificado (departamentos, ativo, estoque)"""
+    tags = [
+        CacheManager.tag('laboratories'),
+        CacheManager.tag('lab', instance.id),
+        CacheManager.tag('materials_lab', instance.id),
+    ]
+    if instance.department:
+        tags.append(CacheManager.tag('department', instance.department))
+    CacheManager.invalidate_tags(*tags)
 
-@receiver(post_save, sender='scheduling.ScheduleRequestComment')
-def invalidate_comment_cache(sender, instance, **kwargs):
-    """Invalida cache quando comentário é adicionado"""
-    CacheManager.invalidate_scheduling_cache(instance.schedule_request.professor_id)
-    logger.info(f"Cache invalidated due to Comment change: {instance.id}")
+@receiver(m2m_changed, sender='laboratories.Laboratory_departments')
+def invalidate_laboratory_departments_cache(sender, instance, action, **kwargs):
+    """Invalida cache quando os departamentos de um laboratório mudam"""
+    if action.startswith('post_'):
+        CacheManager.invalidate_tags(CacheManager.tag('laboratories'))
 
 @receiver(post_save, sender='accounts.User')
-def invalidate_user_cache(sender, instance, **kwargs):
+@receiver(post_delete, sender='accounts.User')
+def invalidate_user_cache(sender, instance, update_fields=None, **kwargs):
     """Invalida cache quando usuário é modificado"""
-    if instance.user_type == 'professor':
-        CacheManager.invalidate_scheduling_cache(instance.id)
-    
-    if instance.is_approved:
-        CacheManager.invalidate_dashboard_cache()
+    # Atualização apenas do last_login (login) não altera dados cacheados
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
     
-    logger.info(f"Cache invalidated due to User change: {instance.id}")
+    CacheManager.invalidate_tags(CacheManager.tag('user', instance.id), CacheManager.tag('pending_users'))
+    logger.debug(f"Cache invalidated due to User change: {instance.id}")
 
 # === DECORATORS PARA CACHE ===
 
@@ -13,6 +13,7 @@ urlpatterns = [
     path('api/upcoming-classes/', views.upcoming_classes_api, name='upcoming_classes_api'),
     path('api/laboratory-availability/', views.laboratory_availability_api, name='laboratory_availability_api'),
     path('api/laboratory/<int:lab_id>/availability/', views.lab_specific_availability_api, name='lab_specific_availability_api'),
+    path('api/free-laboratories/', views.free_laboratories_api, name='free_laboratories_api'),
     path('api/schedule-conflict-check/', views.schedule_conflict_check_api, name='schedule_conflict_check_api'),
     path('api/notifications/check/', views.notifications_check_api, name='notifications_check_api'),
 ]
\ No newline at end of file
@@ -5,14 +5,15 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from accounts.views import is_technician, is_professor
 from django.utils import timezone
 from datetime import timedelta, date # Adicionar date
-from scheduling.models import DraftScheduleRequest, ScheduleRequest, ScheduleRequestComment
+from scheduling.models import DraftScheduleRequest, LabDailyUsage, ScheduleRequest
+from scheduling.availability import AvailabilityMatrix, LabFinder, MIN_FREE_MINUTES
+from scheduling.services import ProfessorStatsService, ScheduleConflictIndex
 from inventory.models import Material
 from accounts.models import User
 from laboratories.models import Laboratory, Department # Importar Laboratory
-from django.db.models import Count, Q, F # Importar F aqui
+from django.db.models import Count, Q, F, Sum # Importar F aqui
 from django.http import HttpResponse, JsonResponse # Importar JsonResponse
 from django.template.loader import render_to_string # Para renderizar partes do template
-from django.db.models import Count
 from django.db.models.functions import TruncYear, TruncWeek, TruncMonth
 from django.core.cache import cache
 from cache_manager import CacheManager
@@ -39,11 +40,20 @@ def technician_dashboard(request):
     
     # OTIMIZADO: Query com cache e seleção eficiente de campos
     cache_key_appointments = f'appointments_{request.user.id}_{department_filter}_{week_offset}'
-    appointments_base = CacheManager.get_cache('dashboard_appointments', cache_key_appointments)
     
-    if appointments_base is None:
+    def get_appointment_tags():
+        tags = [CacheManager.tag('dashboard'), CacheManager.tag('comments')]
+        if department_filter != 'all':
+            filtered_labs = get_laboratories_by_department(department_filter)
+            tags.append(CacheManager.tag('laboratories'))
+            tags.extend(CacheManager.tag('lab', lab_id) for lab_id in filtered_labs.values_list('id', flat=True))
+        else:
+            tags.append(CacheManager.tag('scheduling'))
+        return tags
+    
+    def compute_appointments():
         # Query super otimizada - apenas campos necessários
-        appointments_base = ScheduleRequest.objects.select_related(
+        appointments = ScheduleRequest.objects.select_related(
             'professor', 
             'laboratory',
             'reviewed_by'
@@ -67,11 +77,15 @@ def technician_dashboard(request):
         # Aplicar filtro de departamento ANTES da conversão para lista
         if department_filter != 'all':
             filtered_labs = get_laboratories_by_department(department_filter)
-            appointments_base = appointments_base.filter(laboratory__in=filtered_labs)
+            appointments = appointments.filter(laboratory__in=filtered_labs)
         
-        # Converter para lista e cachear por 3 minutos
-        appointments_base = list(appointments_base[:50])  # Limitar resultados
-        CacheManager.set_cache('dashboard_appointments', appointments_base, cache_key_appointments, ttl=180)
+        return list(appointments[:50])  # Limitar resultados
+    
+    # Cache por 3 minutos, recalculado por um único worker (demais recebem o último valor)
+    appointments_base = CacheManager.get_or_compute(
+        'dashboard_appointments', cache_key_appointments,
+        compute=compute_appointments, ttl=180, tags=get_appointment_tags
+    )
     
     current_week_appointments = appointments_base
     
@@ -140,11 +154,11 @@ def technician_dashboard(request):
     
     # OTIMIZADO: Statistics com cache inteligente
     cache_key_stats = f'dashboard_stats_{request.user.user_type}_{department_filter}'
-    pending_appointments_count = CacheManager.get_cache('dashboard_stats', cache_key_stats, 'pending_count')
-    
-    if pending_appointments_count is None:
-        pending_appointments_count = ScheduleRequest.objects.filter(status='pending').count()
-        CacheManager.set_cache('dashboard_stats', pending_appointments_count, cache_key_stats, 'pending_count')
+    pending_appointments_count = CacheManager.get_or_compute(
+        'dashboard_stats', cache_key_stats, 'pending_count',
+        compute=lambda: ScheduleRequest.objects.filter(status='pending').count(),
+        tags=(CacheManager.tag('dashboard'), CacheManager.tag('status', 'pending'))
+    )
     
     # Get pending approvals - OTIMIZADO
     pending_approvals = ScheduleRequest.objects.filter(
@@ -157,11 +171,20 @@ def technician_dashboard(request):
     
     # OTIMIZADO: Materials statistics com cache e query unificada
     cache_key_materials = f'materials_stats_{department_filter}_{today}'
-    materials_stats = CacheManager.get_cache('materials_stats', cache_key_materials)
     
-    if materials_stats is None:
+    def get_materials_tags():
+        tags = [CacheManager.tag('dashboard')]
+        if department_filter != 'all':
+            filtered_labs = get_laboratories_by_department(department_filter)
+            tags.append(CacheManager.tag('laboratories'))
+            tags.extend(CacheManager.tag('materials_lab', lab_id) for lab_id in filtered_labs.values_list('id', flat=True))
+        else:
+            tags.append(CacheManager.tag('materials'))
+        return tags
+    
+    def compute_materials_stats():
         # Query unificada para materiais com filtros
-        materials_base = Material.objects.select_related('category', 'laboratory')
+        materials_base = Material.objects.all()
         
         # Aplicar filtro de departamento se necessário
         if department_filter != 'all':
@@ -169,9 +192,7 @@ def technician_dashboard(request):
             materials_base = materials_base.filter(laboratory__in=filtered_labs)
         
         # Contar em uma única query usando aggregation
-        from django.db.models import Case, When, IntegerField
-        
-        materials_stats = materials_base.aggregate(
+        return materials_base.aggregate(
             low_stock_count=Count(
                 'id', 
                 filter=Q(quantity__lt=F('minimum_stock'))
@@ -186,8 +207,11 @@ def technician_dashboard(request):
             ),
             total_materials=Count('id')
         )
-        
-        CacheManager.set_cache('materials_stats', materials_stats, cache_key_materials, ttl=600)
+    
+    materials_stats = CacheManager.get_or_compute(
+        'materials_stats', cache_key_materials,
+        compute=compute_materials_stats, ttl=600, tags=get_materials_tags
+    )
     
     materials_in_alert_count = materials_stats['low_stock_count']
     materials_near_expiration_count = materials_stats['near_expiration_count']
@@ -490,9 +514,10 @@ def professor_dashboard(request):
     # Verificar se é dia de agendamento (segunda = 0, terça = 1)
     is_scheduling_day = today.weekday() in [0, 1]
     
-    # Estatísticas do professor
-    pending_count = ScheduleRequest.objects.filter(professor=professor, status='pending').count()
-    approved_count = ScheduleRequest.objects.filter(professor=professor, status='approved').count()
+    # Estatísticas do professor (status, semana exibida e mensagens em uma única query, em cache)
+    stats = ProfessorStatsService.get_stats(professor, start_of_week)
+    pending_count = stats['pending']
+    approved_count = stats['approved']
     draft_count = DraftScheduleRequest.objects.filter(professor=professor).count()
     
     # Buscar próximas aulas aprovadas
@@ -507,32 +532,12 @@ def professor_dashboard(request):
         professor=professor
     ).select_related('laboratory').order_by('-created_at')
     
-    # Calcular estatísticas da semana
-    this_week_count = ScheduleRequest.objects.filter(
-        professor=professor,
-        status='approved',
-        scheduled_date__range=[start_of_week, end_of_week]
-    ).count()
+    # Estatísticas da semana (mudança percentual em relação à semana anterior)
+    this_week_count = stats['this_week']
+    week_change = stats['week_change']
     
-    # Calcular mudança percentual (semana anterior)
-    prev_week_start = start_of_week - timedelta(weeks=1)
-    prev_week_end = end_of_week - timedelta(weeks=1)
-    prev_week_count = ScheduleRequest.objects.filter(
-        professor=professor,
-        status='approved',
-        scheduled_date__range=[prev_week_start, prev_week_end]
-    ).count()
-    
-    if prev_week_count > 0:
-        week_change = ((this_week_count - prev_week_count) / prev_week_count) * 100
-    else:
-        week_change = 100 if this_week_count > 0 else 0
-    
-    # Contar mensagens não lidas do técnico
-    unread_messages_count = ScheduleRequestComment.objects.filter(
-        schedule_request__professor=professor,
-        is_read=False
-    ).exclude(author=professor).count()
+    # Mensagens não lidas do técnico
+    unread_messages_count = stats['unread_messages']
     
     context = {
         'calendar_data': calendar_data,
@@ -579,21 +584,18 @@ def laboratory_availability_api(request):
         week_start = today - timedelta(days=today.weekday())
         
         from laboratories.models import Laboratory
-        laboratories = Laboratory.objects.filter(is_active=True)
+        active_lab_ids = list(Laboratory.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+        total_labs = len(active_lab_ids)
+        week_end = week_start + timedelta(days=4)
+        
+        # Disponível = alguma janela livre de pelo menos 1 hora no dia (não basta não ter agendamentos)
+        matrix = AvailabilityMatrix.get(week_start, week_end, active_lab_ids)
+        available_by_day = matrix.count_by_date(matrix.has_free_window(MIN_FREE_MINUTES))
         
         week_data = []
         for i in range(5):  # Segunda a sexta
             current_date = week_start + timedelta(days=i)
-            
-            # Agendamentos aprovados para este dia
-            day_schedules = ScheduleRequest.objects.filter(
-                scheduled_date=current_date,
-                status='approved'
-            ).values_list('laboratory_id', flat=True)
-            
-            total_labs = laboratories.count()
-            occupied_labs = len(set(day_schedules))
-            labs_available = total_labs - occupied_labs
+            labs_available = available_by_day.get(current_date, 0)
             
             week_data.append({
                 'date': current_date.strftime('%Y-%m-%d'),
@@ -623,55 +625,15 @@ def laboratory_availability_api(request):
 def professor_stats_api(request):
     """API para estatísticas do professor em tempo real"""
     try:
-        professor = request.user
-        today = timezone.now().date()
-        
-        # Calcular estatísticas atuais
-        pending_count = ScheduleRequest.objects.filter(
-            professor=professor,
-            status='pending'
-        ).count()
-        
-        approved_count = ScheduleRequest.objects.filter(
-            professor=professor,
-            status='approved'
-        ).count()
-        
-        total_count = ScheduleRequest.objects.filter(
-            professor=professor
-        ).count()
-        
-        # Agendamentos desta semana
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-        
-        this_week_count = ScheduleRequest.objects.filter(
-            professor=professor,
-            status='approved',
-            scheduled_date__range=[week_start, week_end]
-        ).count()
-        
-        # Calcular mudança percentual
-        previous_week_start = week_start - timedelta(weeks=1)
-        previous_week_end = week_end - timedelta(weeks=1)
-        
-        previous_week_count = ScheduleRequest.objects.filter(
-            professor=professor,
-            status='approved',
-            scheduled_date__range=[previous_week_start, previous_week_end]
-        ).count()
-        
-        if previous_week_count > 0:
-            percentage_change = round(((this_week_count - previous_week_count) / previous_week_count) * 100, 1)
-        else:
-            percentage_change = 100 if this_week_count > 0 else 0
+        # Semana atual, com a mesma contagem (segunda a sexta) do dashboard
+        professor_stats = ProfessorStatsService.get_stats(request.user)
         
         stats = {
-            'pending': pending_count,
-            'approved': approved_count,
-            'total': total_count,
-            'thisWeek': this_week_count,
-            'percentageChange': percentage_change,
+            'pending': professor_stats['pending'],
+            'approved': professor_stats['approved'],
+            'total': professor_stats['total'],
+            'thisWeek': professor_stats['this_week'],
+            'percentageChange': round(professor_stats['week_change'], 1),
         }
         
         return JsonResponse({
@@ -750,17 +712,23 @@ def schedule_conflict_check_api(request):
                 'error': 'Dados incompletos'
             }, status=400)
         
-        # Verificar conflitos
-        conflicts = ScheduleRequest.objects.filter(
-            laboratory_id=laboratory_id,
-            scheduled_date=date,
-            status='approved'
-        ).exclude(
-            # Verificar sobreposição de horários
-            Q(end_time__lte=start_time) | Q(start_time__gte=end_time)
-        ).select_related('professor')
+        try:
+            laboratory_id = int(laboratory_id)
+            date = datetime.date.fromisoformat(date)
+            start_time = datetime.time.fromisoformat(start_time)
+            end_time = datetime.time.fromisoformat(end_time)
+        except (TypeError, ValueError):
+            return JsonResponse({
+                'success': False,
+                'error': 'Dados inválidos'
+            }, status=400)
         
-        has_conflict = conflicts.exists()
+        # Verificar conflitos pelo índice de intervalos (sem query quando não há conflito)
+        conflicts = list(ScheduleConflictIndex.get_conflicting_requests(
+            laboratory_id, date, start_time, end_time
+        ).select_related('professor'))
+        
+        has_conflict = len(conflicts) > 0
         conflict_list = []
         
         if has_conflict:
@@ -861,7 +829,7 @@ def notifications_check_api(request):
 
 @login_required
 def chart_data(request):
-    """API para dados de gráficos - VERSÃO CORRIGIDA FINAL"""
+    """API para dados de gráficos (uma única query agrupada por laboratório e período)"""
     import logging
     logger = logging.getLogger('dashboard')
     
@@ -869,171 +837,28 @@ def chart_data(request):
         period = request.GET.get('period', 'week')
         department = request.GET.get('department', 'all')
         
-        logger.info(f"CHART-DATA REQUEST: period={period}, department={department}")
-        
         # Validar período
         if period not in ['week', 'month', 'year']:
             return JsonResponse({'error': 'Período inválido'}, status=400)
         
-        # Configurar período e data
         today = timezone.now().date()
         
-        if period == 'week':
-            start_date = today - timedelta(weeks=8)
-            end_date = today
-            x_axis_title = "Semanas"
-        elif period == 'month':
-            # 🔧 CORREÇÃO: Cálculo mais preciso para mês
-            start_date = today.replace(day=1) - timedelta(days=365)
-            end_date = today
-            x_axis_title = "Meses"
-        else:  # year
-            start_date = today.replace(month=1, day=1) - timedelta(days=5*365)
-            end_date = today
-            x_axis_title = "Anos"
-        
-        logger.info(f"Período: {start_date} até {end_date}")
-        
-        # Buscar laboratórios
-        laboratories = get_laboratories_by_department(department)
-        
-        logger.info(f"Laboratórios: {[lab.name for lab in laboratories]}")
-        
-        if not laboratories.exists():
-            return JsonResponse({
-                'labels': [],
-                'datasets': [],
-                'xAxisTitle': x_axis_title
-            })
-        
-        # 🔧 CORREÇÃO PRINCIPAL: Buscar agendamentos e processar corretamente
-        schedules = ScheduleRequest.objects.filter(
-            scheduled_date__range=[start_date, end_date],
-            status='approved'
+        def get_chart_tags():
+            tags = [CacheManager.tag('laboratories')]
+            if department != 'all':
+                laboratory_ids = get_laboratories_by_department(department).values_list('id', flat=True)
+                tags.extend(CacheManager.tag('lab', lab_id) for lab_id in laboratory_ids)
+            else:
+                tags.append(CacheManager.tag('scheduling'))
+            return tags
+        
+        response_data = CacheManager.get_or_compute(
+            'chart_data', period, department, today,
+            compute=lambda: build_chart_data(period, department, today),
+            tags=get_chart_tags
         )
         
-        if department != 'all':
-            schedules = schedules.filter(laboratory__department=department)
-        
-        logger.info(f"Total de agendamentos encontrados: {schedules.count()}")
-        
-        # Debug detalhado dos agendamentos
-        for schedule in schedules:
-            logger.info(f"   {schedule.scheduled_date} - {schedule.laboratory.name} - {schedule.subject}")
-        
-        # 🔧 CORREÇÃO: Gerar labels baseados no período
-        labels = []
-        
-        if period == 'week':
-            current_date = start_date
-            while current_date <= end_date:
-                labels.append(current_date.strftime("Semana %d/%m"))
-                current_date += timedelta(weeks=1)
-        elif period == 'month':
-            # 🔧 CORREÇÃO: Gerar labels mensais corretamente
-            current_date = start_date.replace(day=1)
-            while current_date <= end_date:
-                labels.append(current_date.strftime("%b %Y"))
-                # Próximo mês
-                if current_date.month == 12:
-                    current_date = current_date.replace(year=current_date.year + 1, month=1)
-                else:
-                    current_date = current_date.replace(month=current_date.month + 1)
-        else:  # year
-            current_year = start_date.year
-            while current_year <= end_date.year:
-                labels.append(str(current_year))
-                current_year += 1
-        
-        logger.info(f"Labels gerados: {len(labels)} -> {labels}")
-        
-        # 🔧 CORREÇÃO PRINCIPAL: Processar dados por laboratório MANUALMENTE
-        data_by_lab = {}
-        
-        for lab in laboratories:
-            # Inicializar array com zeros
-            lab_data = [0] * len(labels)
-            
-            # Buscar agendamentos específicos deste laboratório
-            lab_schedules = schedules.filter(laboratory=lab)
-            
-            logger.info(f"Processando {lab.name}: {lab_schedules.count()} agendamentos")
-            
-            # 🔧 CORREÇÃO: Processar cada agendamento individualmente
-            for schedule in lab_schedules:
-                schedule_date = schedule.scheduled_date
-                
-                try:
-                    if period == 'week':
-                        # Calcular índice da semana
-                        weeks_diff = (schedule_date - start_date).days // 7
-                        if 0 <= weeks_diff < len(labels):
-                            lab_data[weeks_diff] += 1
-                            logger.info(f"   Semana {weeks_diff}: +1 -> {lab_data[weeks_diff]}")
-                    
-                    elif period == 'month':
-                        # 🔧 CORREÇÃO: Calcular índice do mês corretamente
-                        start_month = start_date.replace(day=1)
-                        schedule_month = schedule_date.replace(day=1)
-                        
-                        # Diferença em meses
-                        months_diff = (schedule_month.year - start_month.year) * 12 + (schedule_month.month - start_month.month)
-                        
-                        if 0 <= months_diff < len(labels):
-                            lab_data[months_diff] += 1
-                            logger.info(f"   {lab.name} - {schedule_date} -> Mês {months_diff} ({labels[months_diff]}): +1 -> {lab_data[months_diff]}")
-                        else:
-                            logger.warning(f"   {lab.name} - {schedule_date} -> Índice {months_diff} fora do range (0-{len(labels)-1})")
-                    
-                    else:  # year
-                        year_diff = schedule_date.year - start_date.year
-                        if 0 <= year_diff < len(labels):
-                            lab_data[year_diff] += 1
-                            logger.info(f"   Ano {year_diff}: +1 -> {lab_data[year_diff]}")
-                
-                except Exception as e:
-                    logger.error(f"   Erro ao processar agendamento {schedule.id}: {str(e)}")
-                    continue
-            
-            # Armazenar dados do laboratório
-            data_by_lab[lab.name] = lab_data
-            total = sum(lab_data)
-            logger.info(f"{lab.name} - Total: {total}, Array: {lab_data}")
-        
-        # 🔧 CORREÇÃO: Construir datasets
-        datasets = []
-        colors = ['#4a6fa5', '#198754', '#dc3545', '#6610f2', '#fd7e14', '#6c757d']
-        
-        for idx, (lab_name, lab_data) in enumerate(data_by_lab.items()):
-            color_idx = idx % len(colors)
-            
-            dataset = {
-                'label': lab_name,
-                'data': lab_data.copy(),  # Usar .copy() para garantir nova lista
-                'borderColor': colors[color_idx],
-                'backgroundColor': f"{colors[color_idx]}20",
-                'tension': 0.3,
-                'fill': True
-            }
-            
-            datasets.append(dataset)
-            total = sum(lab_data)
-            logger.info(f"Dataset criado - {lab_name}: Total={total}, Data={lab_data}")
-        
-        # Resposta final
-        response_data = {
-            'labels': labels,
-            'datasets': datasets,
-            'xAxisTitle': x_axis_title
-        }
-        
-        logger.info(f"RESPOSTA FINAL:")
-        logger.info(f"   Labels: {len(labels)}")
-        logger.info(f"   Datasets: {len(datasets)}")
-        for i, dataset in enumerate(datasets):
-            total = sum(dataset['data'])
-            logger.info(f"   Dataset {i} ({dataset['label']}): Total={total}")
-        
+        logger.debug(f"CHART-DATA: period={period}, department={department}, datasets={len(response_data['datasets'])}")
         return JsonResponse(response_data)
         
     except Exception as e:
@@ -1045,6 +870,113 @@ def chart_data(request):
             'error': f'Erro interno: {str(e)}'
         }, status=500)
 
+
+def build_chart_data(period, department, today):
+    """
+    Monta labels e datasets do gráfico de uso dos laboratórios
+    
+    Os agendamentos aprovados vêm do rollup diário (LabDailyUsage), somados
+    no banco com uma única query agrupada por laboratório e semana/mês/ano
+    (TruncWeek/TruncMonth/TruncYear).
+    
+    Args:
+        period (str): 'week', 'month' ou 'year'
+        department (str): Código do departamento ou 'all'
+        today (date): Data de referência
+    
+    Returns:
+        dict: labels, datasets e xAxisTitle no formato do Chart.js
+    """
+    if period == 'week':
+        # Semanas de calendário (segunda-feira), as mesmas usadas por TruncWeek
+        start_date = today - timedelta(weeks=8, days=today.weekday())
+        x_axis_title = "Semanas"
+        trunc = TruncWeek('date')
+    elif period == 'month':
+        start_date = (today.replace(day=1) - timedelta(days=365)).replace(day=1)
+        x_axis_title = "Meses"
+        trunc = TruncMonth('date')
+    else:  # year
+        start_date = today.replace(month=1, day=1) - timedelta(days=5*365)
+        start_date = start_date.replace(month=1, day=1)
+        x_axis_title = "Anos"
+        trunc = TruncYear('date')
+    
+    # Gerar labels e o índice de cada período
+    labels = []
+    bucket_index = {}
+    
+    if period == 'week':
+        current_date = start_date
+        while current_date <= today:
+            bucket_index[current_date] = len(labels)
+            labels.append(current_date.strftime("Semana %d/%m"))
+            current_date += timedelta(weeks=1)
+    elif period == 'month':
+        current_date = start_date
+        while current_date <= today:
+            bucket_index[current_date] = len(labels)
+            labels.append(current_date.strftime("%b %Y"))
+            # Próximo mês
+            if current_date.month == 12:
+                current_date = current_date.replace(year=current_date.year + 1, month=1)
+            else:
+                current_date = current_date.replace(month=current_date.month + 1)
+    else:  # year
+        for year in range(start_date.year, today.year + 1):
+            bucket_index[date(year, 1, 1)] = len(labels)
+            labels.append(str(year))
+    
+    laboratories = list(get_laboratories_by_department(department).values_list('id', 'name'))
+    
+    if not laboratories:
+        return {
+            'labels': [],
+            'datasets': [],
+            'xAxisTitle': x_axis_title
+        }
+    
+    data_by_lab = {lab_id: [0] * len(labels) for lab_id, _ in laboratories}
+    
+    rows = LabDailyUsage.objects.filter(
+        date__range=[start_date, today],
+        status='approved',
+        laboratory_id__in=data_by_lab.keys()
+    ).annotate(
+        bucket=trunc
+    ).values('laboratory_id', 'bucket').annotate(
+        total=Sum('request_count')
+    ).order_by()
+    
+    for row in rows:
+        bucket = row['bucket']
+        if isinstance(bucket, datetime.datetime):
+            bucket = bucket.date()
+        index = bucket_index.get(bucket)
+        if index is not None:
+            data_by_lab[row['laboratory_id']][index] += row['total']
+    
+    # Construir datasets
+    datasets = []
+    colors = ['#4a6fa5', '#198754', '#dc3545', '#6610f2', '#fd7e14', '#6c757d']
+    
+    for idx, (lab_id, lab_name) in enumerate(laboratories):
+        color_idx = idx % len(colors)
+        datasets.append({
+            'label': lab_name,
+            'data': data_by_lab[lab_id],
+            'borderColor': colors[color_idx],
+            'backgroundColor': f"{colors[color_idx]}20",
+            'tension': 0.3,
+            'fill': True
+        })
+    
+    return {
+        'labels': labels,
+        'datasets': datasets,
+        'xAxisTitle': x_axis_title
+    }
+
 @login_required
 @require_http_methods(["GET"])
 def lab_specific_availability_api(request, lab_id):
@@ -1082,6 +1014,9 @@ def lab_specific_availability_api(request, lab_id):
             status='approved'
         ).order_by('start_time')
         
+        # Ocupação do laboratório no dia (máscara de slots de 15 minutos)
+        matrix = AvailabilityMatrix.get(date, date, [lab.id])
+        
         # Gerar slots de tempo disponíveis (das 7h às 18h)
         from datetime import time
         
@@ -1093,16 +1028,10 @@ def lab_specific_availability_api(request, lab_id):
             slot_start = time(hour, 0)
             slot_end = time(hour + 1, 0)
             
-            # Verificar se há conflito com agendamentos existentes
-            has_conflict = existing_schedules.filter(
-                start_time__lt=slot_end,
-                end_time__gt=slot_start
-            ).exists()
-            
             time_slots.append({
                 'start': slot_start.strftime('%H:%M'),
                 'end': slot_end.strftime('%H:%M'),
-                'available': not has_conflict
+                'available': matrix.is_free(lab.id, date, slot_start, slot_end)
             })
         
         return JsonResponse({
@@ -1129,6 +1058,93 @@ def lab_specific_availability_api(request, lab_id):
             'success': False,
             'error': str(e)
         }, status=500)
+
+@login_required
+@require_http_methods(["GET"])
+def free_laboratories_api(request):
+    """
+    API de busca de laboratórios livres
+
+    Parâmetros (GET):
+        dates: datas separadas por vírgula (YYYY-MM-DD) ou start_date/end_date
+        start_time, end_time: janela do dia (HH:MM, padrão 07:00 às 23:00)
+        duration: minutos livres necessários (padrão: a janela inteira)
+        min_capacity: capacidade mínima
+        departments: códigos de departamento separados por vírgula
+        limit: máximo de laboratórios
+    """
+    from datetime import datetime
+    
+    try:
+        if request.GET.get('dates'):
+            dates = [
+                datetime.strptime(value.strip(), '%Y-%m-%d').date()
+                for value in request.GET['dates'].split(',') if value.strip()
+            ]
+        elif request.GET.get('start_date'):
+            start_date = datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.GET.get('end_date', request.GET['start_date']), '%Y-%m-%d').date()
+            if end_date < start_date:
+                raise ValueError('end_date anterior a start_date')
+            if (end_date - start_date).days >= LabFinder.MAX_DAYS:
+                raise ValueError(f'Intervalo máximo de {LabFinder.MAX_DAYS} dias')
+            dates = AvailabilityMatrix.date_range(start_date, end_date)
+        else:
+            return JsonResponse({
+                'success': False,
+                'error': 'Informe dates ou start_date/end_date'
+            }, status=400)
+        
+        start_time = datetime.strptime(request.GET.get('start_time', '07:00'), '%H:%M').time()
+        end_time = datetime.strptime(request.GET.get('end_time', '23:00'), '%H:%M').time()
+        duration = int(request.GET['duration']) if request.GET.get('duration') else None
+        min_capacity = int(request.GET.get('min_capacity') or 0)
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+        department_codes = [code.strip() for code in request.GET.get('departments', '').split(',') if code.strip()]
+        
+        results = LabFinder.search(
+            dates,
+            start_time=start_time,
+            end_time=end_time,
+            duration=duration,
+            min_capacity=min_capacity,
+            department_codes=department_codes,
+            limit=limit,
+        )
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Parâmetros inválidos: {str(e)}'
+        }, status=400)
+    
+    laboratories = [
+        {
+            'id': laboratory['id'],
+            'name': laboratory['name'],
+            'location': laboratory['location'],
+            'capacity': laboratory['capacity'],
+            'departments': laboratory['departments'],
+            'freeMinutes': laboratory['free_minutes'],
+            'matches': [
+                {
+                    'date': match['date'].strftime('%Y-%m-%d'),
+                    'windows': [
+                        {'start': start.strftime('%H:%M'), 'end': end.strftime('%H:%M')}
+                        for start, end in match['windows']
+                    ],
+                }
+                for match in laboratory['matches']
+            ],
+        }
+        for laboratory in results
+    ]
+    
+    return JsonResponse({
+        'success': True,
+        'count': len(laboratories),
+        'laboratories': laboratories,
+        'last_updated': timezone.now().isoformat()
+    })
     
 def get_laboratories_by_department(department_filter):
     """
@@ -38,42 +38,62 @@ class SmartDashboardCache:
         
         return f"dashboard_{view_type}_{key_hash}"
     
+    @classmethod
+    def get_tags(cls, user, **kwargs):
+        """Tags das quais uma resposta de dashboard depende"""
+        from cache_manager import CacheManager
+        
+        tags = [
+            CacheManager.tag('dashboard'),
+            CacheManager.tag('scheduling'),
+            CacheManager.tag('user', user.id),
+            CacheManager.tag('user_type', user.user_type),
+        ]
+        department = kwargs.get('department', 'all')
+        if department and department != 'all':
+            tags.append(CacheManager.tag('department', department))
+        return tags
+    
     @classmethod
     def get_cached_response(cls, user, view_type, **kwargs):
-        """Obtém resposta cacheada se disponível"""
+        """Obtém resposta cacheada se disponível (e não invalidada por nenhuma tag)"""
+        from cache_manager import CacheManager
+        
         cache_key = cls.get_cache_key(user, view_type, **kwargs)
-        return cache.get(cache_key)
+        entry = cache.get(cache_key)
+        if entry is None or not CacheManager.is_current(entry):
+            return None
+        return entry['value']
     
     @classmethod
     def cache_response(cls, user, view_type, response_data, **kwargs):
         """Cacheia resposta do dashboard"""
+        from cache_manager import CacheManager
+        
         cache_key = cls.get_cache_key(user, view_type, **kwargs)
         ttl = cls.CACHE_TTL.get(view_type, 300)
         
-        cache.set(cache_key, response_data, ttl)
+        cache.set(cache_key, CacheManager.wrap_value(response_data, cls.get_tags(user, **kwargs)), ttl)
         return cache_key
     
     @classmethod
     def invalidate_user_cache(cls, user_id=None, user_type=None, department=None):
-        """Invalida cache específico do usuário ou tipo"""
-        patterns = []
+        """Invalida cache específico do usuário, tipo ou departamento"""
+        from cache_manager import CacheManager
+        
+        tags = []
         
         if user_id:
-            patterns.append(f"dashboard_*_*{user_id}*")
+            tags.append(CacheManager.tag('user', user_id))
         
         if user_type:
-            patterns.append(f"dashboard_{user_type}_*")
+            tags.append(CacheManager.tag('user_type', user_type))
         
         if department:
-            patterns.append(f"dashboard_*_*{department}*")
+            tags.append(CacheManager.tag('department', department))
         
-        # Para Redis, usar delete_pattern
-        for pattern in patterns:
-            try:
-                if hasattr(cache, 'delete_pattern'):
-                    cache.delete_pattern(pattern)
-            except:
-                pass
+        if tags:
+            CacheManager.invalidate_tags(*tags)
 
 def smart_cache_dashboard(view_type):
     """Decorator para cache inteligente de dashboard"""
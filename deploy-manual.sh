@@ -73,6 +73,20 @@ python manage.py collectstatic --noinput --settings=LabConnect.settings.producti
 echo "🔄 Reiniciando serviço Django..."
 sudo systemctl restart labconnect
 
+echo "📤 Reiniciando worker da fila do WhatsApp..."
+if systemctl list-unit-files labconnect-whatsapp-outbox.service --no-legend | grep -q labconnect-whatsapp-outbox; then
+    sudo systemctl restart labconnect-whatsapp-outbox
+else
+    echo "⚠️ labconnect-whatsapp-outbox.service não instalado - mensagens WhatsApp ficarão na fila (veja DEPLOY-MANUAL.md)"
+fi
+
+echo "⚙️ Reiniciando worker das tarefas do inventário..."
+if systemctl list-unit-files labconnect-import-jobs.service --no-legend | grep -q labconnect-import-jobs; then
+    sudo systemctl restart labconnect-import-jobs
+else
+    echo "⚠️ labconnect-import-jobs.service não instalado - importações e análises de IA ficarão na fila (veja DEPLOY-MANUAL.md)"
+fi
+
 echo "⏳ Aguardando serviço inicializar..."
 sleep 5
 
@@ -89,6 +103,8 @@ fi
 echo "📊 Verificando status final..."
 echo "--- Status do serviço Django ---"
 sudo systemctl status labconnect --no-pager -l || echo "❌ Erro ao obter status do Django"
+sudo systemctl status labconnect-whatsapp-outbox --no-pager -l || echo "⚠️ Worker do WhatsApp não está rodando"
+sudo systemctl status labconnect-import-jobs --no-pager -l || echo "⚠️ Worker das tarefas do inventário não está rodando"
 
 echo "--- Processos LabConnect ---"
 ps aux | grep -v grep | grep -i labconnect || echo "⚠️ Nenhum processo encontrado"
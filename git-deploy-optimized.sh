@@ -110,6 +110,20 @@ fi
 log_deploy "🔄 Reiniciando serviços (downtime mínimo)..."
 sudo systemctl reload labconnect || sudo systemctl restart labconnect
 
+# Worker da fila do WhatsApp (envio fora do request/response)
+if systemctl list-unit-files labconnect-whatsapp-outbox.service --no-legend | grep -q labconnect-whatsapp-outbox; then
+    sudo systemctl restart labconnect-whatsapp-outbox
+else
+    log_deploy "⚠️ labconnect-whatsapp-outbox.service não instalado - mensagens WhatsApp ficarão na fila"
+fi
+
+# Worker das tarefas de importação/IA do inventário
+if systemctl list-unit-files labconnect-import-jobs.service --no-legend | grep -q labconnect-import-jobs; then
+    sudo systemctl restart labconnect-import-jobs
+else
+    log_deploy "⚠️ labconnect-import-jobs.service não instalado - importações e análises de IA ficarão na fila"
+fi
+
 # 9. Ajustar permissões apenas se necessário
 if [ "$STASH_CREATED" = true ] || git diff HEAD~1 HEAD --name-only | grep -q "\.py$"; then
     log_deploy "🔐 Ajustando permissões..."
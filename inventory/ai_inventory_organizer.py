@@ -15,6 +15,7 @@ except ImportError:
 from typing import Dict, List, Tuple, Any, Optional
 from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 from .models import Material, MaterialCategory
 from laboratories.models import Laboratory
 import logging
@@ -334,12 +335,8 @@ class AIInventoryOrganizer:
         options = options or {}
         
         try:
-            # 1. Ler e detectar estrutura
-            df = self._read_and_analyze_excel(file_path)
-            structure_info = self._detect_complex_structure(df)
-            
-            # 2. Extrair materiais
-            materials_df = self._extract_materials_from_complex_structure(df, structure_info)
+            # 1-2. Ler, detectar estrutura e extrair materiais
+            materials_df = self.load_materials(file_path)
             
             if materials_df.empty:
                 return {
@@ -348,17 +345,8 @@ class AIInventoryOrganizer:
                     'stats': self.stats
                 }
             
-            # 3. Aplicar IA
-            df_organized = self._apply_ai_organization(materials_df, options)
-            
-            # 4. Detectar duplicatas
-            df_deduplicated = self._detect_and_handle_duplicates(df_organized, options)
-            
-            # 5. Validar dados
-            df_validated = self._validate_final_data(df_deduplicated)
-            
-            # 6. Salvar no banco
-            results = self._save_organized_data(df_validated, options)
+            # 3-6. Aplicar IA, tratar duplicatas, validar e salvar
+            results, df_validated = self.organize_rows(materials_df, options)
             
             return {
                 'success': True,
@@ -376,6 +364,76 @@ class AIInventoryOrganizer:
                 'stats': self.stats
             }
     
+    def load_materials(self, file_path: str) -> DataFrame:
+        """Lê a planilha, detecta a estrutura e extrai os materiais (sem gravar nada)"""
+        df = self._read_and_analyze_excel(file_path)
+        structure_info = self._detect_complex_structure(df)
+        materials_df = self._extract_materials_from_complex_structure(df, structure_info)
+        return materials_df.reset_index(drop=True)
+    
+    def organize_rows(self, materials_df: DataFrame, options: Dict = None) -> Tuple[List[Dict], DataFrame]:
+        """
+        Aplica a IA, valida e grava um bloco de materiais extraídos
+        
+        Usado por organize_inventory_from_excel (planilha inteira) e pelas
+        tarefas em segundo plano (ImportJob), que chamam bloco a bloco.
+        """
+        options = options or {}
+        df_organized = self._apply_ai_organization(materials_df, options)
+        df_deduplicated = self._detect_and_handle_duplicates(df_organized, options)
+        df_validated = self._validate_final_data(df_deduplicated)
+        return self._save_organized_data(df_validated, options), df_validated
+    
+    def categorize_materials(self, materials) -> int:
+        """Recategoriza materiais existentes pela IA; retorna quantos foram alterados"""
+        categorized_count = 0
+        
+        for material in materials:
+            try:
+                suggestion = self._categorize_with_ai(material.name, material.description or '')
+                
+                category, created = MaterialCategory.objects.get_or_create(
+                    name=suggestion['category'],
+                    defaults={'material_type': suggestion['type']}
+                )
+                
+                material.category = category
+                material.analyzed_data = material.analyzed_data or {}
+                material.analyzed_data.update({
+                    'ai_batch_categorized': True,
+                    'batch_date': str(timezone.now())
+                })
+                material.save()
+                categorized_count += 1
+            
+            except Exception as e:
+                logger.error(f"Erro ao categorizar material {material.id}: {e}")
+        
+        return categorized_count
+    
+    def describe_materials(self, materials) -> int:
+        """Gera descrições para materiais existentes; retorna quantas foram geradas"""
+        generated_count = 0
+        
+        for material in materials:
+            try:
+                material.description = self._generate_description_with_ai(
+                    material.name,
+                    material.category.name
+                )
+                material.analyzed_data = material.analyzed_data or {}
+                material.analyzed_data.update({
+                    'ai_description_generated': True,
+                    'generation_date': str(timezone.now())
+                })
+                material.save()
+                generated_count += 1
+            
+            except Exception as e:
+                logger.error(f"Erro ao gerar descrição do material {material.id}: {e}")
+        
+        return generated_count
+    
     # Manter todos os outros métodos da versão anterior
     def _read_and_analyze_excel(self, file_path: str) -> DataFrame:
         """Lê planilha - Mantido da versão anterior"""
@@ -1,7 +1,8 @@
 # inventory/ai_views.py - Views para funcionalidades de IA - CORRIGIDA
 
-from datetime import timezone
+from django.utils import timezone
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.http import JsonResponse
@@ -11,13 +12,34 @@ from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.db.models import F
 from accounts.views import is_technician
+from cache_manager import CacheManager
 from .ai_inventory_organizer import AIInventoryOrganizer
-from .models import Material, MaterialCategory
+from .duplicates import find_duplicate_groups
+from .jobs import ImportJobService
+from .models import ImportJob, Material, MaterialCategory
 from laboratories.models import Laboratory
 import json
 import os
 import tempfile
-import re
+
+# Ações do processador em lote -> tipo de ImportJob
+BATCH_ACTION_JOBS = {
+    'categorize_all': 'ai_categorize',
+    'generate_descriptions': 'ai_descriptions',
+}
+
+
+def job_started_response(request, job):
+    """Resposta imediata após enfileirar uma tarefa (JSON para AJAX, redirect para a página de progresso)"""
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({
+            'success': True,
+            'job_id': job.id,
+            'status_url': reverse('ai_job_status', args=[job.id]),
+        }, status=202)
+    
+    messages.info(request, f"{job.get_kind_display()} enviada para processamento em segundo plano.")
+    return redirect('ai_job_detail', job_id=job.id)
 
 @login_required
 @user_passes_test(is_technician)
@@ -75,45 +97,9 @@ def ai_organize_inventory(request):
             'create_missing_labs': request.POST.get('create_missing_labs', True)
         }
         
-        try:
-            # Salvar arquivo temporariamente
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                for chunk in file.chunks():
-                    tmp_file.write(chunk)
-                tmp_file_path = tmp_file.name
-            
-            # Processar com IA
-            organizer = AIInventoryOrganizer()
-            result = organizer.organize_inventory_from_excel(tmp_file_path, options)
-            
-            # Limpar arquivo temporário
-            os.unlink(tmp_file_path)
-            
-            if result['success']:
-                messages.success(request, result['message'])
-                
-                # Mostrar estatísticas detalhadas
-                stats = result['stats']
-                if stats['auto_categorized'] > 0:
-                    messages.info(request, f"IA categorizou automaticamente {stats['auto_categorized']} materiais.")
-                if stats['auto_assigned_lab'] > 0:
-                    messages.info(request, f"IA atribuiu automaticamente {stats['auto_assigned_lab']} laboratórios.")
-                if stats['descriptions_generated'] > 0:
-                    messages.info(request, f"IA gerou {stats['descriptions_generated']} descrições automáticas.")
-                if stats['duplicates_found'] > 0:
-                    messages.warning(request, f"Encontradas e tratadas {stats['duplicates_found']} duplicatas.")
-                
-                return redirect('material_list')
-            else:
-                messages.error(request, f"Erro na organização automática: {result['error']}")
-                
-        except Exception as e:
-            messages.error(request, f"Erro ao processar arquivo: {str(e)}")
-            if 'tmp_file_path' in locals():
-                try:
-                    os.unlink(tmp_file_path)
-                except:
-                    pass
+        # O processamento roda no worker (process_import_jobs); a view só enfileira
+        job = ImportJobService.enqueue('ai_organize', user=request.user, uploaded_file=file, options=options)
+        return job_started_response(request, job)
     
     context = {
         'title': 'Organização Automática com IA',
@@ -223,7 +209,7 @@ def ai_apply_categorization(request):
         material.analyzed_data = material.analyzed_data or {}
         material.analyzed_data.update({
             'ai_categorized': True,
-            'categorization_date': str(timezone.now()) if 'timezone' in globals() else None,
+            'categorization_date': str(timezone.now()),
             'confidence': 0.85
         })
         material.save()
@@ -242,50 +228,39 @@ def ai_apply_categorization(request):
 @login_required
 @user_passes_test(is_technician)
 def ai_duplicate_detector(request):
-    """Detector de duplicatas usando IA - VERSÃO CORRIGIDA"""
+    """Detector de duplicatas (candidatos por MinHash-LSH, ver inventory/duplicates.py)"""
+    
+    # Grupos (ids e similaridades) em cache, invalidados por qualquer alteração em Material
+    groups = CacheManager.get_or_compute(
+        'ai_duplicates',
+        compute=lambda: find_duplicate_groups(
+            Material.objects.order_by('name').values_list('id', 'name')
+        ),
+        tags=[CacheManager.tag('materials')]
+    )
+    
+    # Carregar apenas os materiais exibidos
+    visible_groups = groups[:20]  # Limitar para performance
+    material_ids = {main_id for main_id, _ in visible_groups}
+    material_ids.update(other_id for _, similar in visible_groups for other_id, _ in similar)
+    materials = Material.objects.select_related('category', 'laboratory').in_bulk(material_ids)
     
-    # Buscar possíveis duplicatas
-    materials = Material.objects.all().order_by('name')
     duplicates = []
-    processed_names = set()
-    
-    for material in materials:
-        # Normalizar nome para comparação
-        normalized_name = normalize_name_for_comparison(material.name)
-        
-        if normalized_name in processed_names:
+    for main_id, similar in visible_groups:
+        if main_id not in materials:
             continue
-        
-        # Buscar materiais similares
-        similar_materials = []
-        for other_material in materials:
-            if other_material.id == material.id:
-                continue
-            
-            other_normalized = normalize_name_for_comparison(other_material.name)
-            
-            # Calcular similaridade simples
-            similarity = calculate_similarity(normalized_name, other_normalized)
-            
-            if similarity > 0.8:  # 80% de similaridade
-                similar_materials.append({
-                    'material': other_material,
-                    'similarity': similarity * 100  # Converter para porcentagem
-                })
-        
-        if similar_materials:
-            duplicates.append({
-                'main_material': material,
-                'similar_materials': similar_materials
-            })
-            processed_names.add(normalized_name)
-            for sim in similar_materials:
-                processed_names.add(normalize_name_for_comparison(sim['material'].name))
+        duplicates.append({
+            'main_material': materials[main_id],
+            'similar_materials': [
+                {'material': materials[other_id], 'similarity': similarity}
+                for other_id, similarity in similar if other_id in materials
+            ]
+        })
     
     context = {
         'title': 'Detector de Duplicatas IA',
-        'duplicates': duplicates[:20],  # Limitar para performance
-        'total_duplicates': len(duplicates)
+        'duplicates': duplicates,
+        'total_duplicates': len(groups)
     }
     
     return render(request, 'inventory/ai_duplicates.html', context)
@@ -323,7 +298,7 @@ def ai_merge_duplicates(request):
         main_material.analyzed_data = main_material.analyzed_data or {}
         main_material.analyzed_data.update({
             'merged_duplicates': True,
-            'merge_date': str(timezone.now()) if 'timezone' in globals() else None,
+            'merge_date': str(timezone.now()),
             'merged_count': len(duplicate_ids)
         })
         main_material.save()
@@ -409,72 +384,12 @@ def ai_batch_processor(request):
     if request.method == 'POST':
         action = request.POST.get('action')
         
-        if action == 'categorize_all':
-            # Categorizar todos os materiais sem categoria
-            uncategorized = Material.objects.filter(
-                category__name__in=['Material Geral', 'Diversos']
-            )
-            
-            organizer = AIInventoryOrganizer()
-            categorized_count = 0
-            
-            for material in uncategorized:
-                try:
-                    suggestion = organizer._categorize_with_ai(
-                        material.name, 
-                        material.description or ''
-                    )
-                    
-                    category, created = MaterialCategory.objects.get_or_create(
-                        name=suggestion['category'],
-                        defaults={'material_type': suggestion['type']}
-                    )
-                    
-                    material.category = category
-                    material.analyzed_data = material.analyzed_data or {}
-                    material.analyzed_data.update({
-                        'ai_batch_categorized': True,
-                        'batch_date': str(timezone.now()) if 'timezone' in globals() else None
-                    })
-                    material.save()
-                    categorized_count += 1
-                    
-                except Exception as e:
-                    continue
-            
-            messages.success(request, f"IA categorizou automaticamente {categorized_count} materiais.")
-        
-        elif action == 'generate_descriptions':
-            # Gerar descrições para materiais sem descrição
-            from django.db import models
-            no_description = Material.objects.filter(
-                models.Q(description__isnull=True) | models.Q(description='')
-            )
-            
-            organizer = AIInventoryOrganizer()
-            generated_count = 0
-            
-            for material in no_description:
-                try:
-                    description = organizer._generate_description_with_ai(
-                        material.name, 
-                        material.category.name
-                    )
-                    
-                    material.description = description
-                    material.analyzed_data = material.analyzed_data or {}
-                    material.analyzed_data.update({
-                        'ai_description_generated': True,
-                        'generation_date': str(timezone.now()) if 'timezone' in globals() else None
-                    })
-                    material.save()
-                    generated_count += 1
-                    
-                except Exception as e:
-                    continue
-            
-            messages.success(request, f"IA gerou automaticamente {generated_count} descrições.")
+        kind = BATCH_ACTION_JOBS.get(action)
+        if kind:
+            job = ImportJobService.enqueue(kind, user=request.user)
+            return job_started_response(request, job)
         
+        messages.error(request, 'Ação inválida.')
         return redirect('ai_batch_processor')
     
     # Estatísticas para exibição
@@ -497,31 +412,22 @@ def ai_batch_processor(request):
     
     return render(request, 'inventory/ai_batch_processor.html', context)
 
-# Funções auxiliares para cálculo de similaridade
-def normalize_name_for_comparison(nome: str) -> str:
-    """Normaliza nome para comparação de duplicatas"""
-    try:
-        # Remove acentos, espaços extras, converte para minúsculo
-        nome_clean = str(nome).lower().strip()
-        nome_clean = re.sub(r'\s+', ' ', nome_clean)
-        nome_clean = re.sub(r'[^\w\s]', '', nome_clean)
-        return nome_clean
-    except Exception as e:
-        return str(nome).lower()
-
-def calculate_similarity(str1: str, str2: str) -> float:
-    """Calcula similaridade simples entre duas strings"""
-    if not str1 or not str2:
-        return 0.0
-    
-    # Método simples de similaridade baseado em caracteres comuns
-    set1 = set(str1.lower())
-    set2 = set(str2.lower())
-    
-    intersection = len(set1.intersection(set2))
-    union = len(set1.union(set2))
+@login_required
+@user_passes_test(is_technician)
+def ai_job_detail(request, job_id):
+    """Página de acompanhamento de uma tarefa em segundo plano"""
+    job = get_object_or_404(ImportJob, id=job_id)
     
-    if union == 0:
-        return 0.0
+    context = {
+        'title': job.get_kind_display(),
+        'job': job,
+    }
     
-    return intersection / union
\ No newline at end of file
+    return render(request, 'inventory/ai_job_detail.html', context)
+
+@login_required
+@user_passes_test(is_technician)
+def ai_job_status_api(request, job_id):
+    """Progresso da tarefa (consultado periodicamente pela página de acompanhamento)"""
+    job = get_object_or_404(ImportJob, id=job_id)
+    return JsonResponse(ImportJobService.to_dict(job))
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        # Pré-carregar o modelo spaCy (gunicorn --preload: compartilhado entre workers por copy-on-write)
+        if getattr(settings, 'DOCLING_ENABLED', False) and getattr(settings, 'DOCLING_PRELOAD', False):
+            import gc
+            from .services import warm_up_docling_service
+            warm_up_docling_service()
+            # Objetos já carregados saem do GC, que deixaria de tocar nas páginas compartilhadas
+            gc.freeze()
@@ -16,9 +16,13 @@ except ImportError:
 from typing import Dict, List, Tuple, Any, Optional
 from django.conf import settings
 from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from cache_manager import CacheManager
 from .models import Material, MaterialCategory
 from laboratories.models import Laboratory
-from .services import DoclingService
+from .services import get_docling_service
+from .similarity import FEATURES_KEY, assign_features, invalidate_index
 import logging
 import re
 
@@ -31,7 +35,7 @@ class InventoryAutomationService:
     """
     
     def __init__(self):
-        self.docling_service = DoclingService()
+        self.docling_service = get_docling_service()
         self.required_columns = ['name', 'quantity', 'minimum_stock']
         self.optional_columns = ['description', 'category', 'laboratory', 'category_type']
         self.stats = {
@@ -47,17 +51,8 @@ class InventoryAutomationService:
         Processa arquivo Excel e organiza automaticamente o inventário
         """
         try:
-            # Ler arquivo Excel
-            df = self._read_excel_file(file_path)
-            
-            # Validar e normalizar dados
-            df_cleaned = self._clean_and_validate_data(df)
-            
-            # Enriquecer dados com análise automática
-            df_enriched = self._enrich_data_with_analysis(df_cleaned)
-            
-            # Criar/atualizar materiais no banco de dados
-            results = self._save_materials_to_database(df_enriched)
+            df_cleaned = self.load_excel_file(file_path)
+            results = self.process_rows(df_cleaned)
             
             return {
                 'success': True,
@@ -74,6 +69,21 @@ class InventoryAutomationService:
                 'stats': self.stats
             }
     
+    def load_excel_file(self, file_path: str) -> DataFrame:
+        """Lê a planilha e devolve as linhas validadas e normalizadas (sem gravar nada)"""
+        df = self._read_excel_file(file_path)
+        return self._clean_and_validate_data(df).reset_index(drop=True)
+    
+    def process_rows(self, df: DataFrame) -> List[Dict[str, Any]]:
+        """
+        Enriquece e grava um bloco de linhas já normalizadas
+        
+        Usado por process_excel_file (planilha inteira) e pelas tarefas em
+        segundo plano (ImportJob), que chamam bloco a bloco.
+        """
+        df_enriched = self._enrich_data_with_analysis(df)
+        return self._save_materials_to_database(df_enriched)
+    
     def _read_excel_file(self, file_path: str) -> DataFrame:
         """Lê arquivo Excel e detecta automaticamente a estrutura"""
         
@@ -202,11 +212,9 @@ class InventoryAutomationService:
     def _enrich_data_with_analysis(self, df: DataFrame) -> DataFrame:
         """Enriquece dados com análise automática do Docling"""
         
-        enriched_rows = []
-        
+        rows = []
+        descriptions = []
         for index, row in df.iterrows():
-            enriched_row = row.copy()
-            
             # Analisar descrição se disponível
             description = str(row.get('description', ''))
             name = str(row.get('name', ''))
@@ -214,10 +222,18 @@ class InventoryAutomationService:
             # Criar descrição automática se não existir
             if not description or description == 'nan' or description == '':
                 description = self._generate_description(name)
-                enriched_row['description'] = description
             
-            # Analisar com Docling
-            analysis = self.docling_service.analyze_text(description)
+            rows.append((row, name, description))
+            descriptions.append(description)
+        
+        # Analisar com Docling em lote (nlp.pipe + cache por conteúdo)
+        analyses = self.docling_service.analyze_texts(descriptions)
+        
+        enriched_rows = []
+        for (row, name, description), analysis in zip(rows, analyses):
+            enriched_row = row.copy()
+            if description != str(row.get('description', '')):
+                enriched_row['description'] = description
             
             # Sugerir categoria se não especificada
             if not row.get('category') or str(row.get('category')) == 'nan':
@@ -325,95 +341,247 @@ class InventoryAutomationService:
         return Laboratory.objects.first()
     
     def _save_materials_to_database(self, df: DataFrame) -> List[Dict[str, Any]]:
-        """Salva materiais no banco de dados"""
+        """
+        Salva materiais no banco de dados em blocos (upsert baseado em conjuntos)
         
+        Categorias e laboratórios são resolvidos uma vez para a planilha toda;
+        cada bloco de BATCH_SIZE linhas busca os materiais existentes com uma
+        query e grava com bulk_create/bulk_update em uma transação própria.
+        """
         results = []
+        if df.empty:
+            return results
+        
+        batch_size = getattr(settings, 'INVENTORY_AUTOMATION', {}).get('BATCH_SIZE', 100)
+        categories = self._resolve_categories(df)
+        laboratory_resolver = self._build_laboratory_resolver()
+        
+        for start in range(0, len(df), batch_size):
+            chunk = df.iloc[start:start + batch_size]
+            results.extend(self._save_chunk(chunk, categories, laboratory_resolver))
         
-        with transaction.atomic():
-            for index, row in df.iterrows():
+        return results
+    
+    def _resolve_categories(self, df: DataFrame) -> Dict[str, MaterialCategory]:
+        """Mapeia nome -> categoria, criando as ausentes em uma única chamada"""
+        names = {}
+        for name, category_type in zip(
+            df['category'] if 'category' in df.columns else [''] * len(df),
+            df['category_type'] if 'category_type' in df.columns else [None] * len(df),
+        ):
+            name = self._category_name(name)
+            names.setdefault(name, self._category_type(category_type))
+        
+        categories = {}
+        for category in MaterialCategory.objects.filter(name__in=names).order_by('id'):
+            categories.setdefault(category.name, category)
+        
+        missing = [name for name in names if name not in categories]
+        if missing:
+            created = MaterialCategory.objects.bulk_create([
+                MaterialCategory(name=name, material_type=names[name]) for name in missing
+            ])
+            categories.update((category.name, category) for category in created)
+        
+        return categories
+    
+    @staticmethod
+    def _category_name(value) -> str:
+        value = str(value).strip() if value is not None else ''
+        return value if value and value != 'nan' else 'Material Geral'
+    
+    @staticmethod
+    def _category_type(value) -> str:
+        value = str(value).strip() if value is not None else ''
+        return value if value and value != 'nan' else 'consumable'
+    
+    @staticmethod
+    def _build_laboratory_resolver():
+        """
+        Resolve o laboratório pelo nome como name__icontains(...).first(), em memória
+        
+        Os laboratórios são lidos uma única vez (na ordenação padrão do modelo);
+        sem correspondência, vale o primeiro laboratório, como antes.
+        """
+        laboratories = list(Laboratory.objects.only('id', 'name'))
+        default = laboratories[0] if laboratories else None
+        resolved = {}
+        
+        def resolve(lab_name):
+            key = str(lab_name or '').strip().casefold()
+            if key == 'nan':
+                key = ''
+            if key not in resolved:
+                resolved[key] = next(
+                    (lab for lab in laboratories if key in lab.name.casefold()),
+                    default
+                )
+            return resolved[key]
+        
+        return resolve
+    
+    def _save_chunk(self, chunk: DataFrame, categories: Dict[str, MaterialCategory], laboratory_resolver) -> List[Dict[str, Any]]:
+        """Grava um bloco de linhas; em caso de erro no lote, refaz linha a linha para apontar a falha"""
+        results = []
+        prepared = []
+        
+        for index, row in chunk.iterrows():
+            try:
+                laboratory = laboratory_resolver(row.get('laboratory', ''))
+                if laboratory is None:
+                    raise ValueError("Nenhum laboratório cadastrado")
+                
+                prepared.append((index, {
+                    'name': str(row['name']),
+                    'description': row.get('description', ''),
+                    'quantity': int(row['quantity']),
+                    'minimum_stock': int(row['minimum_stock']),
+                    'category': categories[self._category_name(row.get('category', ''))],
+                    'laboratory': laboratory,
+                    'analyzed_data': row.get('analyzed_data', {}),
+                }))
+            except Exception as e:
+                results.append(self._error_result(index, row.get('name', 'N/A'), e))
+        
+        if not prepared:
+            return results
+        
+        try:
+            with transaction.atomic():
+                results.extend(self._upsert_rows(prepared))
+        except Exception as e:
+            logger.warning(f"Falha ao gravar bloco de {len(prepared)} materiais, gravando linha a linha: {e}")
+            for index, data in prepared:
                 try:
-                    result = self._create_or_update_material(row)
+                    with transaction.atomic():
+                        result = self._create_or_update_material(data)
+                    result['row'] = index + 2
+                    self._count_result(result)
                     results.append(result)
-                    self.stats['processed'] += 1
-                    
-                    if result['action'] == 'created':
-                        self.stats['created'] += 1
-                    elif result['action'] == 'updated':
-                        self.stats['updated'] += 1
-                        
-                except Exception as e:
-                    self.stats['errors'] += 1
-                    results.append({
-                        'row': index + 2,
-                        'name': row.get('name', 'N/A'),
-                        'action': 'error',
-                        'error': str(e)
-                    })
+                except Exception as row_error:
+                    results.append(self._error_result(index, data['name'], row_error))
         
         return results
     
-    def _create_or_update_material(self, row: Series) -> Dict[str, Any]:
-        """Cria ou atualiza um material"""
-        
-        name = row['name']
-        description = row.get('description', '')
-        quantity = int(row['quantity'])
-        minimum_stock = int(row['minimum_stock'])
-        
-        # Buscar categoria
-        category_name = row.get('category', 'Material Geral')
-        category = MaterialCategory.objects.filter(name=category_name).first()
-        if not category:
-            category_type = row.get('category_type', 'consumable')
-            category = MaterialCategory.objects.create(
-                name=category_name,
-                material_type=category_type
+    def _upsert_rows(self, prepared: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Cria ou atualiza um bloco de materiais com uma busca e duas gravações em lote"""
+        names = {data['name'].lower() for _, data in prepared}
+        laboratory_ids = {data['laboratory'].id for _, data in prepared}
+        
+        existing = {}
+        for material in Material.objects.annotate(name_key=Lower('name')).filter(
+            name_key__in=names, laboratory_id__in=laboratory_ids
+        ).order_by('id'):
+            existing.setdefault((material.name_key, material.laboratory_id), material)
+        
+        now = timezone.now()
+        to_create = {}
+        to_update = {}
+        actions = []
+        
+        for index, data in prepared:
+            key = (data['name'].lower(), data['laboratory'].id)
+            material = existing.get(key) or to_create.get(key)
+            
+            if material is None:
+                material = Material(
+                    name=data['name'],
+                    laboratory=data['laboratory'],
+                )
+                to_create[key] = material
+                action = 'created'
+            else:
+                if material.pk:
+                    to_update[key] = material
+                action = 'updated'
+            
+            material.description = data['description']
+            material.quantity = data['quantity']
+            material.minimum_stock = data['minimum_stock']
+            material.category = data['category']
+            # Mantém as palavras-chave de similaridade já gravadas (recalculadas só se o texto mudou)
+            features = (material.analyzed_data or {}).get(FEATURES_KEY)
+            material.analyzed_data = data['analyzed_data']
+            if features:
+                material.analyzed_data = dict(material.analyzed_data or {}, **{FEATURES_KEY: features})
+            material.updated_at = now
+            actions.append((index, data['name'], action, material))
+        
+        # bulk_create/bulk_update não passam pelo save: palavras-chave calculadas em lote aqui
+        if assign_features(list(to_create.values()) + list(to_update.values()), self.docling_service):
+            invalidate_index()
+        
+        if to_create:
+            Material.objects.bulk_create(list(to_create.values()))
+        if to_update:
+            Material.objects.bulk_update(
+                list(to_update.values()),
+                ['description', 'quantity', 'minimum_stock', 'category', 'analyzed_data', 'updated_at']
             )
         
-        # Buscar laboratório
-        lab_name = row.get('laboratory', '')
-        laboratory = Laboratory.objects.filter(name__icontains=lab_name).first()
-        if not laboratory:
-            laboratory = Laboratory.objects.first()
+        # bulk_create/bulk_update não disparam os signals de Material
+        tags = [CacheManager.tag('materials')]
+        tags.extend(CacheManager.tag('materials_lab', laboratory_id) for laboratory_id in laboratory_ids)
+        transaction.on_commit(lambda: CacheManager.invalidate_tags(*tags))
+        
+        results = []
+        for index, name, action, material in actions:
+            result = {
+                'row': index + 2,
+                'name': name,
+                'action': action,
+                'material_id': material.id
+            }
+            self._count_result(result)
+            results.append(result)
+        return results
+    
+    def _count_result(self, result: Dict[str, Any]):
+        self.stats['processed'] += 1
+        if result['action'] == 'created':
+            self.stats['created'] += 1
+        elif result['action'] == 'updated':
+            self.stats['updated'] += 1
+    
+    def _error_result(self, index, name, error) -> Dict[str, Any]:
+        self.stats['errors'] += 1
+        return {
+            'row': index + 2,
+            'name': name,
+            'action': 'error',
+            'error': str(error)
+        }
+    
+    def _create_or_update_material(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Cria ou atualiza um único material (caminho de fallback do upsert em lote)"""
         
-        # Verificar se material já existe
         existing_material = Material.objects.filter(
-            name__iexact=name,
-            laboratory=laboratory
+            name__iexact=data['name'],
+            laboratory=data['laboratory']
         ).first()
         
-        analyzed_data = row.get('analyzed_data', {})
-        
         if existing_material:
             # Atualizar material existente
-            existing_material.description = description
-            existing_material.quantity = quantity
-            existing_material.minimum_stock = minimum_stock
-            existing_material.category = category
-            existing_material.analyzed_data = analyzed_data
+            existing_material.description = data['description']
+            existing_material.quantity = data['quantity']
+            existing_material.minimum_stock = data['minimum_stock']
+            existing_material.category = data['category']
+            existing_material.analyzed_data = data['analyzed_data']
             existing_material.save()
             
             return {
                 'row': None,
-                'name': name,
+                'name': data['name'],
                 'action': 'updated',
                 'material_id': existing_material.id
             }
         else:
             # Criar novo material
-            material = Material.objects.create(
-                name=name,
-                description=description,
-                quantity=quantity,
-                minimum_stock=minimum_stock,
-                category=category,
-                laboratory=laboratory,
-                analyzed_data=analyzed_data
-            )
+            material = Material.objects.create(**data)
             
             return {
                 'row': None,
-                'name': name,
+                'name': data['name'],
                 'action': 'created',
                 'material_id': material.id
             }
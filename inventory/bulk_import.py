@@ -0,0 +1,311 @@
+# inventory/bulk_import.py
+"""
+Importação em lote de materiais a partir de planilhas (CSV/Excel)
+
+A planilha é normalizada com operações vetorizadas do pandas; categorias,
+laboratórios e materiais existentes são resolvidos com uma query cada
+(buscas por nome sem diferenciar maiúsculas) e a gravação usa
+bulk_create/bulk_update em lotes de INVENTORY_AUTOMATION['BATCH_SIZE'].
+"""
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from cache_manager import CacheManager
+from laboratories.models import Laboratory
+from .models import Material, MaterialCategory, docling_service
+from .similarity import assign_features, invalidate_index, refresh_features
+
+logger = logging.getLogger(__name__)
+
+
+def load_pandas():
+    """Importa o pandas sob demanda (None se indisponível no ambiente)"""
+    try:
+        import pandas
+    except Exception as e:
+        logger.warning(f"pandas indisponível para importação: {e}")
+        return None
+    return pandas
+
+
+class MaterialImportError(Exception):
+    """Erro que impede a importação da planilha como um todo"""
+
+
+class MaterialBulkImporter:
+    """Importador de materiais com resolução e gravação em lote"""
+
+    # Mapeamento de colunas (suporte a inglês e português)
+    COLUMN_MAPPING = {
+        'nome': ['nome', 'name', 'material'],
+        'categoria': ['categoria', 'category'],
+        'laboratorio': ['laboratorio', 'laboratório', 'laboratory', 'lab'],
+        'quantidade': ['quantidade', 'quantity', 'qty'],
+        'estoque_minimo': ['estoque_minimo', 'estoque_mínimo', 'minimum_stock', 'min_stock'],
+        'descricao': ['descricao', 'descrição', 'description'],
+    }
+    REQUIRED_COLUMNS = ['nome', 'categoria', 'laboratorio', 'quantidade', 'estoque_minimo']
+
+    # Texto da linha de exemplo do template de importação
+    EXAMPLE_ROW_MARKER = 'Nome do Material'
+
+    # Limite de nomes por query ao buscar materiais existentes
+    LOOKUP_CHUNK_SIZE = 5000
+
+    def __init__(self, create_missing_categories=False, create_missing_labs=False,
+                 update_existing=False, skip_errors=False, batch_size=None):
+        self.create_missing_categories = create_missing_categories
+        self.create_missing_labs = create_missing_labs
+        self.update_existing = update_existing
+        self.skip_errors = skip_errors
+        self.batch_size = batch_size or getattr(settings, 'INVENTORY_AUTOMATION', {}).get('BATCH_SIZE', 100)
+        self.pd = load_pandas()
+        self.errors = []
+        self.stats = {'imported': 0, 'updated': 0, 'skipped': 0}
+
+    @property
+    def available(self):
+        return self.pd is not None
+
+    def read_file(self, file):
+        """Lê o arquivo enviado conforme a extensão"""
+        if file.name.endswith('.csv'):
+            return self.pd.read_csv(file)
+        if file.name.endswith(('.xlsx', '.xls')):
+            return self.pd.read_excel(file)
+        raise MaterialImportError('Formato de arquivo não suportado.')
+
+    def run(self, file):
+        """
+        Importa os materiais da planilha
+
+        Returns:
+            dict: imported, updated, skipped e errors (lista de mensagens)
+
+        Raises:
+            MaterialImportError: formato ou colunas obrigatórias inválidos
+        """
+        if not self.available:
+            raise MaterialImportError(
+                'Funcionalidade de importação não disponível. Entre em contato com o administrador.'
+            )
+
+        df = self.normalize(self.read_file(file))
+        if not df.empty:
+            with transaction.atomic():
+                df = self.resolve_relations(df)
+                if not df.empty:
+                    self.save(df)
+
+        logger.info(
+            f"Importação de materiais: {self.stats['imported']} criados, {self.stats['updated']} atualizados, "
+            f"{self.stats['skipped']} ignorados, {len(self.errors)} erros"
+        )
+        return {**self.stats, 'errors': self.errors}
+
+    def _add_errors(self, rows, template):
+        """Registra uma mensagem de erro por linha (número da linha na planilha)"""
+        for line, value in rows:
+            self.errors.append(template.format(line=line, value=value))
+
+    def normalize(self, df):
+        """Padroniza colunas e valida tipos de forma vetorizada"""
+        pd = self.pd
+
+        # Mapear colunas do arquivo (sem diferenciar maiúsculas/espaços)
+        normalized = {str(column).strip().lower(): column for column in df.columns}
+        rename = {}
+        for standard_col, variations in self.COLUMN_MAPPING.items():
+            for variation in variations:
+                if variation in normalized:
+                    rename[normalized[variation]] = standard_col
+                    break
+
+        missing_cols = [col for col in self.REQUIRED_COLUMNS if col not in rename.values()]
+        if missing_cols:
+            raise MaterialImportError(
+                f'Colunas obrigatórias não encontradas: {", ".join(missing_cols)}. '
+                f'Colunas disponíveis: {", ".join(map(str, df.columns))}'
+            )
+
+        df = df.rename(columns=rename)[list(dict.fromkeys(rename.values()))].copy()
+        # Número da linha na planilha (cabeçalho na linha 1)
+        df['linha'] = df.index + 2
+
+        for column in ('nome', 'categoria', 'laboratorio'):
+            df[column] = df[column].astype('string').str.strip()
+        if 'descricao' in df.columns:
+            df['descricao'] = df['descricao'].astype('string').str.strip().fillna('')
+        else:
+            df['descricao'] = ''
+
+        # Linhas vazias e a linha de exemplo do template
+        empty = df['nome'].isna() | (df['nome'] == '')
+        example = df['nome'].str.contains(self.EXAMPLE_ROW_MARKER, regex=False, na=False)
+        self.stats['skipped'] += int(empty.sum())
+        df = df[~empty & ~example]
+
+        # Quantidade: inteiro não negativo
+        quantity = pd.to_numeric(df['quantidade'], errors='coerce')
+        invalid = quantity.isna() | (quantity < 0)
+        self._add_errors(df.loc[invalid, ['linha', 'quantidade']].itertuples(index=False),
+                         'Linha {line}: Quantidade inválida - {value}')
+        if self.skip_errors:
+            quantity = quantity.mask(invalid, 0)
+        else:
+            df, quantity = df[~invalid], quantity[~invalid]
+        df = df.assign(quantidade=quantity.astype('int64'))
+
+        # Estoque mínimo: inteiro, no mínimo 1
+        minimum_stock = pd.to_numeric(df['estoque_minimo'], errors='coerce')
+        invalid = minimum_stock.isna()
+        self._add_errors(df.loc[invalid, ['linha', 'estoque_minimo']].itertuples(index=False),
+                         'Linha {line}: Estoque mínimo inválido - {value}')
+        if self.skip_errors:
+            minimum_stock = minimum_stock.fillna(1)
+        else:
+            df, minimum_stock = df[~invalid], minimum_stock[~invalid]
+        df = df.assign(
+            estoque_minimo=minimum_stock.clip(lower=1).astype('int64'),
+            categoria_key=df['categoria'].str.lower(),
+            laboratorio_key=df['laboratorio'].str.lower(),
+            nome_key=df['nome'].str.lower(),
+        )
+
+        # A mesma linha repetida na planilha: vale a última ocorrência
+        df = df.drop_duplicates(subset=['nome_key', 'laboratorio_key'], keep='last')
+        return df
+
+    def _resolve_names(self, model, names):
+        """Busca objetos por nome (sem diferenciar maiúsculas) em uma única query"""
+        objects = model.objects.annotate(name_key=Lower('name')).filter(name_key__in=names)
+        resolved = {}
+        for obj in objects:
+            resolved.setdefault(obj.name_key, obj)
+        return resolved
+
+    def resolve_relations(self, df):
+        """Associa categoria e laboratório a cada linha, criando os ausentes se permitido"""
+        category_names = dict(zip(df['categoria_key'].dropna(), df['categoria'].dropna()))
+        lab_names = dict(zip(df['laboratorio_key'].dropna(), df['laboratorio'].dropna()))
+
+        categories = self._resolve_names(MaterialCategory, list(category_names))
+        missing = [key for key in category_names if key not in categories]
+        if missing and self.create_missing_categories:
+            created = MaterialCategory.objects.bulk_create(
+                [MaterialCategory(name=category_names[key], material_type='consumable') for key in missing],
+                batch_size=self.batch_size
+            )
+            categories.update((category.name.lower(), category) for category in created)
+
+        laboratories = self._resolve_names(Laboratory, list(lab_names))
+        missing = [key for key in lab_names if key not in laboratories]
+        if missing and self.create_missing_labs:
+            created = Laboratory.objects.bulk_create(
+                [
+                    Laboratory(
+                        name=lab_names[key],
+                        location=f"Localização {lab_names[key]}",
+                        capacity=30,
+                        is_active=True
+                    )
+                    for key in missing
+                ],
+                batch_size=self.batch_size
+            )
+            laboratories.update((laboratory.name.lower(), laboratory) for laboratory in created)
+
+        df = df.assign(
+            category_id=df['categoria_key'].map({key: obj.pk for key, obj in categories.items()}),
+            laboratory_id=df['laboratorio_key'].map({key: obj.pk for key, obj in laboratories.items()}),
+        )
+
+        missing_category = df['category_id'].isna()
+        self._add_errors(df.loc[missing_category, ['linha', 'categoria']].itertuples(index=False),
+                         "Linha {line}: Categoria '{value}' não encontrada")
+        missing_lab = df['laboratory_id'].isna() & ~missing_category
+        self._add_errors(df.loc[missing_lab, ['linha', 'laboratorio']].itertuples(index=False),
+                         "Linha {line}: Laboratório '{value}' não encontrado")
+
+        unresolved = missing_category | missing_lab
+        if self.skip_errors:
+            self.stats['skipped'] += int(unresolved.sum())
+        df = df[~unresolved]
+        return df.astype({'category_id': 'int64', 'laboratory_id': 'int64'})
+
+    def find_existing(self, df):
+        """
+        Mapeia (nome em minúsculas, laboratório) -> id dos materiais já cadastrados
+
+        Uma query por bloco de LOOKUP_CHUNK_SIZE nomes, restrita aos laboratórios da planilha.
+        """
+        names = df['nome_key'].unique().tolist()
+        laboratory_ids = df['laboratory_id'].unique().tolist()
+        existing = {}
+        for start in range(0, len(names), self.LOOKUP_CHUNK_SIZE):
+            rows = Material.objects.annotate(name_key=Lower('name')).filter(
+                laboratory_id__in=laboratory_ids,
+                name_key__in=names[start:start + self.LOOKUP_CHUNK_SIZE]
+            ).order_by('id').values_list('name_key', 'laboratory_id', 'id')
+            for name_key, laboratory_id, material_id in rows:
+                existing.setdefault((name_key, laboratory_id), material_id)
+        return existing
+
+    def save(self, df):
+        """Cria os materiais novos e atualiza (ou ignora) os existentes, em lotes"""
+        existing = self.find_existing(df)
+        keys = list(zip(df['nome_key'], df['laboratory_id']))
+        existing_ids = [existing.get(key) for key in keys]
+
+        records = df[['nome', 'descricao', 'quantidade', 'estoque_minimo', 'category_id', 'laboratory_id']]
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for material_id, (name, description, quantity, minimum_stock, category_id, laboratory_id) in zip(
+            existing_ids, records.itertuples(index=False, name=None)
+        ):
+            if material_id is None:
+                to_create.append(Material(
+                    name=name,
+                    description=description,
+                    quantity=int(quantity),
+                    minimum_stock=int(minimum_stock),
+                    category_id=int(category_id),
+                    laboratory_id=int(laboratory_id),
+                ))
+            elif self.update_existing:
+                to_update.append(Material(
+                    id=material_id,
+                    description=description,
+                    quantity=int(quantity),
+                    minimum_stock=int(minimum_stock),
+                    category_id=int(category_id),
+                    updated_at=now,
+                ))
+            else:
+                self.stats['skipped'] += 1
+
+        if to_create:
+            # Palavras-chave de similaridade calculadas aqui: bulk_create não passa pelo save
+            if assign_features(to_create, docling_service):
+                invalidate_index()
+            Material.objects.bulk_create(to_create, batch_size=self.batch_size)
+        if to_update:
+            Material.objects.bulk_update(
+                to_update, ['description', 'quantity', 'minimum_stock', 'category', 'updated_at'],
+                batch_size=self.batch_size
+            )
+            # Só os materiais cuja descrição mudou são analisados novamente
+            refresh_features([material.id for material in to_update], docling_service, self.batch_size)
+
+        self.stats['imported'] += len(to_create)
+        self.stats['updated'] += len(to_update)
+
+        # bulk_create/bulk_update não disparam os signals de Material
+        laboratory_ids = set(df['laboratory_id'].tolist())
+        tags = [CacheManager.tag('materials')]
+        tags.extend(CacheManager.tag('materials_lab', laboratory_id) for laboratory_id in laboratory_ids)
+        transaction.on_commit(lambda: CacheManager.invalidate_tags(*tags))
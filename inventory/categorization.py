@@ -0,0 +1,204 @@
+# inventory/categorization.py
+"""
+Motor de categorização compilado do DoclingService
+
+A base de conhecimento (palavras-chave, indicadores e contextos por
+categoria, palavras por tipo de laboratório e indicadores das regras de
+negócio) é compilada uma única vez em um autômato de Aho-Corasick. Cada
+texto é percorrido uma única vez para encontrar todos os termos presentes
+(mesma semântica de substring de 'termo in texto'); os scores saem da soma
+dos pesos pré-calculados de cada termo encontrado.
+"""
+import re
+from collections import defaultdict, deque
+
+# Pesos por tipo de termo da base de conhecimento
+TERM_WEIGHTS = {
+    'keywords': 2.0,
+    'indicators': 1.5,
+    'contexts': 1.0,
+}
+
+# Regras de negócio aplicadas após o score
+EXPENSIVE_INDICATORS = ('microscopio', 'computador', 'impressora', 'balanca')
+PERISHABLE_INDICATORS = ('validade', 'vencimento', 'refrigerar', 'congelar')
+CONSUMABLE_QUANTITY_RE = re.compile(r'\d+\s*(ml|mg|g)\b')
+
+
+class KeywordAutomaton:
+    """Autômato de Aho-Corasick: todos os termos contidos em um texto, em uma passada"""
+
+    def __init__(self, terms):
+        self.terms = list(dict.fromkeys(term for term in terms if term))
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for term_id, term in enumerate(self.terms):
+            state = 0
+            for char in term:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (term_id,)
+
+        # Links de falha em largura; cada estado herda as saídas do seu link
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """Conjunto dos termos (ids) que aparecem no texto"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def find_terms(self, text):
+        return {self.terms[term_id] for term_id in self.find(text)}
+
+
+class CategorizationEngine:
+    """Base de conhecimento compilada: scores de categoria e sugestão de laboratório"""
+
+    def __init__(self, category_knowledge, laboratory_mapping):
+        self.categories = list(category_knowledge)
+        self.laboratories = list(laboratory_mapping)
+
+        # Normalização de cada categoria: keywords e indicadores (contextos não entram)
+        self.max_possible = {
+            category: len(knowledge['keywords']) * TERM_WEIGHTS['keywords'] +
+                       len(knowledge['indicators']) * TERM_WEIGHTS['indicators']
+            for category, knowledge in category_knowledge.items()
+        }
+
+        terms = []
+        for knowledge in category_knowledge.values():
+            for kind in TERM_WEIGHTS:
+                terms.extend(knowledge[kind])
+        for keywords in laboratory_mapping.values():
+            terms.extend(keywords)
+        terms.extend(EXPENSIVE_INDICATORS)
+        terms.extend(PERISHABLE_INDICATORS)
+        self.automaton = KeywordAutomaton(terms)
+        term_ids = {term: term_id for term_id, term in enumerate(self.automaton.terms)}
+
+        # termo -> contribuições (categoria, peso, ordem, motivo); termos repetidos somam como no loop original
+        self.category_terms = defaultdict(list)
+        for category, knowledge in category_knowledge.items():
+            order = 0
+            for kind, label in (('keywords', 'palavra-chave'), ('indicators', 'indicador'), ('contexts', 'contexto')):
+                for term in knowledge[kind]:
+                    self.category_terms[term_ids[term]].append(
+                        (category, TERM_WEIGHTS[kind], order, f"{label}: {term}")
+                    )
+                    order += 1
+
+        # termo -> laboratórios (uma ocorrência por palavra da lista do laboratório)
+        self.laboratory_terms = defaultdict(list)
+        for laboratory, keywords in laboratory_mapping.items():
+            for keyword in keywords:
+                self.laboratory_terms[term_ids[keyword]].append(laboratory)
+
+        self.expensive_ids = frozenset(term_ids[term] for term in EXPENSIVE_INDICATORS)
+        self.perishable_ids = frozenset(term_ids[term] for term in PERISHABLE_INDICATORS)
+
+    def categorize(self, normalized_text):
+        """
+        Categoriza um texto já normalizado (mesmo resultado do cálculo termo a termo)
+
+        Returns:
+            dict: category, confidence, explanation, all_scores, suggested_lab
+        """
+        found = self.automaton.find(normalized_text)
+
+        scores = dict.fromkeys(self.categories, 0.0)
+        laboratory_scores = {}
+        for term_id in found:
+            for category, weight, _, _ in self.category_terms.get(term_id, ()):
+                scores[category] += weight
+            for laboratory in self.laboratory_terms.get(term_id, ()):
+                laboratory_scores[laboratory] = laboratory_scores.get(laboratory, 0) + 1
+
+        category_scores = {}
+        for category in self.categories:
+            max_possible = self.max_possible[category]
+            category_scores[category] = min(scores[category] / max_possible if max_possible > 0 else 0, 1.0)
+
+        # Determinar melhor categoria
+        best_category = max(category_scores, key=category_scores.get)
+        final_category, final_confidence = self._apply_business_rules(
+            best_category, category_scores[best_category], normalized_text, found
+        )
+
+        return {
+            'category': final_category,
+            'confidence': final_confidence,
+            'explanation': self._explain(final_category, category_scores[final_category], found),
+            'all_scores': category_scores,
+            'suggested_lab': self._best_laboratory(laboratory_scores)
+        }
+
+    def _explain(self, category, score, found):
+        """Explicação da categoria: os três primeiros motivos na ordem da base de conhecimento"""
+        reasons = sorted(
+            (order, reason)
+            for term_id in found
+            for term_category, _, order, reason in self.category_terms.get(term_id, ())
+            if term_category == category
+        )
+        return f"Score: {score:.2f} - " + ", ".join(reason for _, reason in reasons[:3])
+
+    def categorize_many(self, normalized_texts):
+        """Categoriza muitos textos; textos repetidos são calculados uma única vez"""
+        results = {}
+        categorized = []
+        for text in normalized_texts:
+            result = results.get(text)
+            if result is None:
+                result = results[text] = self.categorize(text)
+            categorized.append(dict(result, all_scores=dict(result['all_scores'])))
+        return categorized
+
+    def _apply_business_rules(self, category, confidence, text, found):
+        # Regra 1: Equipamentos caros são sempre permanentes
+        if found & self.expensive_ids:
+            return 'permanent', max(confidence, 0.8)
+
+        # Regra 2: Produtos com validade são perecíveis
+        if found & self.perishable_ids:
+            return 'perishable', max(confidence, 0.7)
+
+        # Regra 3: Produtos com quantidade em ml/mg são consumíveis
+        if CONSUMABLE_QUANTITY_RE.search(text):
+            return 'consumable', max(confidence, 0.6)
+
+        return category, confidence
+
+    def _best_laboratory(self, laboratory_scores):
+        # Empate: vale o primeiro laboratório na ordem do mapeamento (como no max original)
+        best = None
+        for laboratory in self.laboratories:
+            score = laboratory_scores.get(laboratory, 0)
+            if score > 0 and (best is None or score > laboratory_scores[best]):
+                best = laboratory
+        return best
@@ -0,0 +1,192 @@
+# inventory/duplicates.py
+"""
+Detecção de materiais duplicados com geração de candidatos (MinHash-LSH)
+
+Em vez de comparar todos os materiais entre si (O(n²)), cada nome é
+normalizado uma única vez e convertido em shingles de caracteres; uma
+assinatura MinHash dividida em bandas agrupa em buckets os nomes com
+provável alta similaridade, e a similaridade exata (Jaccard dos shingles)
+só é calculada para os pares que dividem algum bucket.
+"""
+import random
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+
+# Tamanho dos shingles de caracteres
+SHINGLE_SIZE = 3
+
+# Similaridade mínima (Jaccard dos shingles) para considerar duplicata. O detector
+# anterior usava Jaccard dos conjuntos de caracteres > 0.8, que marca como iguais
+# nomes com as mesmas letras ("Pipeta graduada 50ml" x "Proveta graduada 10ml");
+# com shingles 0.6 a página lista menos pares, e pares diferentes dos de antes.
+SIMILARITY_THRESHOLD = 0.6
+
+# Assinatura MinHash: BANDS x ROWS_PER_BAND funções de hash. Com 24 bandas de 3
+# linhas, pares com similaridade 0.6 viram candidatos com ~99,7% de probabilidade
+# e pares com 0.2 com ~18%; o custo dos falsos candidatos é só um Jaccard a mais.
+BANDS = 24
+ROWS_PER_BAND = 3
+NUM_PERM = BANDS * ROWS_PER_BAND
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Coeficientes fixos (semente constante) para que as assinaturas sejam estáveis entre processos
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+
+def normalize_name(name):
+    """Minúsculas, sem acentos, sem pontuação e com espaços simples"""
+    name = unicodedata.normalize('NFKD', str(name or '').lower())
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    name = re.sub(r'[^\w\s]', ' ', name)
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+def shingles(normalized_name):
+    """Conjunto de shingles de caracteres do nome normalizado (sem espaços: '50 ml' == '50ml')"""
+    normalized_name = normalized_name.replace(' ', '')
+    if len(normalized_name) <= SHINGLE_SIZE:
+        return frozenset([normalized_name]) if normalized_name else frozenset()
+    return frozenset(
+        normalized_name[i:i + SHINGLE_SIZE]
+        for i in range(len(normalized_name) - SHINGLE_SIZE + 1)
+    )
+
+
+def jaccard(set1, set2):
+    if not set1 or not set2:
+        return 0.0
+    intersection = len(set1 & set2)
+    return intersection / (len(set1) + len(set2) - intersection)
+
+
+class MinHasher:
+    """Calcula assinaturas MinHash reaproveitando o hash de cada shingle já visto"""
+
+    def __init__(self):
+        self._shingle_hashes = {}
+
+    def _hash_shingle(self, shingle):
+        hashes = self._shingle_hashes.get(shingle)
+        if hashes is None:
+            value = zlib.crc32(shingle.encode('utf-8'))
+            hashes = tuple(
+                ((a * value + b) % _MERSENNE_PRIME) & _MAX_HASH
+                for a, b in _PERMUTATIONS
+            )
+            self._shingle_hashes[shingle] = hashes
+        return hashes
+
+    def signature(self, shingle_set):
+        return tuple(map(min, zip(*(self._hash_shingle(shingle) for shingle in shingle_set))))
+
+
+def _lsh_buckets(shingle_sets):
+    """Buckets (banda, fatia da assinatura) -> índices dos nomes que caem nele"""
+    hasher = MinHasher()
+    buckets = defaultdict(list)
+    for index, shingle_set in enumerate(shingle_sets):
+        if not shingle_set:
+            continue
+        signature = hasher.signature(shingle_set)
+        for band in range(BANDS):
+            start = band * ROWS_PER_BAND
+            buckets[(band, signature[start:start + ROWS_PER_BAND])].append(index)
+    return [members for members in buckets.values() if len(members) > 1]
+
+
+def candidate_pairs(shingle_sets):
+    """
+    Candidatos por nome (LSH por bandas): {i: {j, ...}} apenas com j > i
+
+    Args:
+        shingle_sets (list): conjuntos de shingles, um por nome distinto
+    """
+    candidates = defaultdict(set)
+    for members in _lsh_buckets(shingle_sets):
+        # Os índices entram nos buckets em ordem crescente
+        for position, first in enumerate(members[:-1]):
+            candidates[first].update(members[position + 1:])
+    return candidates
+
+
+def similar_pairs(shingle_sets, threshold=SIMILARITY_THRESHOLD):
+    """Pares candidatos do LSH confirmados pela similaridade exata: {(i, j): similaridade}"""
+    result = {}
+    for first, others in candidate_pairs(shingle_sets).items():
+        first_set = shingle_sets[first]
+        first_size = len(first_set)
+        for second in others:
+            second_set = shingle_sets[second]
+            second_size = len(second_set)
+            # Jaccard <= menor/maior: descarta pares de tamanhos muito diferentes sem interseção
+            if min(first_size, second_size) < threshold * max(first_size, second_size):
+                continue
+            intersection = len(first_set & second_set)
+            similarity = intersection / (first_size + second_size - intersection)
+            if similarity >= threshold:
+                result[(first, second)] = similarity
+    return result
+
+
+def brute_force_similar_pairs(shingle_sets, threshold=SIMILARITY_THRESHOLD):
+    """Referência O(n²) com a mesma métrica (usada pelo benchmark para medir o recall do LSH)"""
+    result = {}
+    for first, first_set in enumerate(shingle_sets):
+        for second in range(first + 1, len(shingle_sets)):
+            similarity = jaccard(first_set, shingle_sets[second])
+            if similarity >= threshold:
+                result[(first, second)] = similarity
+    return result
+
+
+def find_duplicate_groups(items, threshold=SIMILARITY_THRESHOLD):
+    """
+    Agrupa materiais com nomes similares
+
+    Args:
+        items (list): pares (id, nome) na ordem de exibição (ex.: por nome)
+        threshold (float): similaridade mínima (0 a 1)
+
+    Returns:
+        list: (id principal, [(id similar, similaridade em %), ...]), na ordem de 'items'
+    """
+    # Nomes normalizados idênticos são tratados como um único nó (similaridade 100%)
+    normalized_items = [(material_id, normalize_name(name)) for material_id, name in items]
+    ids_by_name = defaultdict(list)
+    for material_id, name in normalized_items:
+        ids_by_name[name].append(material_id)
+
+    names = list(ids_by_name)
+    index_of = {name: index for index, name in enumerate(names)}
+    shingle_sets = [shingles(name) for name in names]
+
+    similar_names = defaultdict(list)
+    for (first, second), similarity in similar_pairs(shingle_sets, threshold).items():
+        similar_names[first].append((second, similarity))
+        similar_names[second].append((first, similarity))
+
+    groups = []
+    processed = set()
+    for material_id, name in normalized_items:
+        index = index_of[name]
+        if index in processed:
+            continue
+
+        similar = [(other_id, 100.0) for other_id in ids_by_name[name] if other_id != material_id]
+        for other_index, similarity in sorted(similar_names[index], key=lambda pair: -pair[1]):
+            similar.extend((other_id, similarity * 100) for other_id in ids_by_name[names[other_index]])
+
+        if similar:
+            groups.append((material_id, similar))
+            processed.add(index)
+            processed.update(other_index for other_index, _ in similar_names[index])
+
+    return groups
@@ -1,11 +1,11 @@
 # inventory/forms.py
 from django import forms
 from .models import Material, MaterialCategory
-from .services import DoclingService
+from .services import get_docling_service
 from django.conf import settings
 
 
-docling_service = DoclingService() if getattr(settings, 'DOCLING_ENABLED', False) else None
+docling_service = get_docling_service() if getattr(settings, 'DOCLING_ENABLED', False) else None
 
 class MaterialForm(forms.ModelForm):
     class Meta:
@@ -6,15 +6,19 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q, Count, F
 from accounts.views import is_technician
+from cache_manager import CacheManager
 from .models import Material, MaterialCategory
-from .services import DoclingService
+from .services import get_docling_service
+from .similarity import MaterialSimilarityIndex
 import json
 from typing import Dict, Any
 
 # Inicializar serviço inteligente
-docling_service = DoclingService()
+docling_service = get_docling_service()
 
 @login_required
 @user_passes_test(is_technician)
@@ -111,14 +115,8 @@ def material_trends(request):
                 'analysis': analysis
             })
     
-    # Top palavras-chave
-    all_keywords = []
-    for material in Material.objects.exclude(analyzed_data__isnull=True)[:100]:
-        if material.analyzed_data and 'keywords' in material.analyzed_data:
-            all_keywords.extend(material.analyzed_data['keywords'])
-    
-    from collections import Counter
-    top_keywords = Counter(all_keywords).most_common(20)
+    # Top palavras-chave (índice de similaridade compartilhado com find_similar_api)
+    top_keywords = MaterialSimilarityIndex.get().top_keywords(20)
     
     context = {
         'categorization_data': categorization_data,
@@ -303,16 +301,16 @@ def _process_unanalyzed_materials(request):
     """Processar materiais não analisados"""
     try:
         batch_size = int(request.POST.get('batch_size', 50))
-        unanalyzed = Material.objects.filter(analyzed_data__isnull=True)[:batch_size]
+        unanalyzed = list(Material.objects.filter(analyzed_data__isnull=True)[:batch_size])
+        
+        # Análise em lote (nlp.pipe + cache por conteúdo)
+        analyses = docling_service.analyze_texts(
+            f"{material.name} {material.description}" for material in unanalyzed
+        )
         
         processed_count = 0
-        for material in unanalyzed:
+        for material, analysis in zip(unanalyzed, analyses):
             try:
-                # Analisar material
-                analysis = docling_service.analyze_text(
-                    f"{material.name} {material.description}"
-                )
-                
                 # Salvar análise
                 material.analyzed_data = analysis
                 material.save()
@@ -331,34 +329,41 @@ def _process_unanalyzed_materials(request):
 def _recategorize_all_materials(request):
     """Recategorizar todos os materiais"""
     try:
-        materials = Material.objects.all()
-        recategorized_count = 0
+        batch_size = getattr(settings, 'INVENTORY_AUTOMATION', {}).get('BATCH_SIZE', 100)
+        materials = Material.objects.select_related('category').only(
+            'id', 'name', 'description', 'laboratory_id', 'category__material_type'
+        )
         
-        for material in materials:
-            try:
-                # Análise de categoria
-                categorization = docling_service.categorize_material(
-                    material.description, material.name
-                )
-                
-                # Se confiança for alta e categoria diferente, sugerir mudança
-                if (categorization['confidence'] > 0.7 and 
-                    categorization['category'] != material.category.material_type):
-                    
-                    # Buscar ou criar nova categoria
-                    new_category = MaterialCategory.objects.filter(
-                        material_type=categorization['category']
-                    ).first()
-                    
-                    if new_category:
-                        material.category = new_category
-                        material.save()
-                        recategorized_count += 1
-                
-            except Exception as e:
-                continue
+        # Uma categoria por tipo, buscada uma única vez
+        categories_by_type = {}
+        for category in MaterialCategory.objects.order_by('id'):
+            categories_by_type.setdefault(category.material_type, category)
+        
+        # Categorização em lote (textos repetidos são categorizados uma única vez)
+        materials = list(materials.iterator(chunk_size=2000))
+        categorizations = docling_service.categorize_many(
+            (material.description, material.name) for material in materials
+        )
+        to_update = []
+        laboratory_ids = set()
         
-        messages.success(request, f'{recategorized_count} materiais recategorizados!')
+        for material, categorization in zip(materials, categorizations):
+            # Se confiança for alta e categoria diferente, sugerir mudança
+            new_category = categories_by_type.get(categorization['category'])
+            if (new_category and categorization['confidence'] > 0.7 and
+                    categorization['category'] != material.category.material_type):
+                material.category = new_category
+                to_update.append(material)
+                laboratory_ids.add(material.laboratory_id)
+        
+        with transaction.atomic():
+            Material.objects.bulk_update(to_update, ['category'], batch_size=batch_size)
+            # bulk_update não dispara os signals de Material
+            tags = [CacheManager.tag('materials')]
+            tags.extend(CacheManager.tag('materials_lab', laboratory_id) for laboratory_id in laboratory_ids)
+            transaction.on_commit(lambda: CacheManager.invalidate_tags(*tags))
+        
+        messages.success(request, f'{len(to_update)} materiais recategorizados!')
         
     except Exception as e:
         messages.error(request, f'Erro na recategorização: {str(e)}')
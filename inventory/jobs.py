@@ -0,0 +1,347 @@
+# inventory/jobs.py
+"""
+Tarefas longas do inventário executadas em segundo plano (ImportJob)
+
+As views gravam a tarefa e devolvem o id imediatamente; o comando
+process_import_jobs reserva tarefas com SKIP LOCKED e as executa em um pool
+de processos. Cada tarefa avança em blocos: o bloco e o checkpoint (cursor)
+são gravados na mesma transação, então uma tarefa interrompida (deploy,
+worker morto) é retomada do último bloco confirmado.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ImportJob, Material
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_JOB_SETTINGS = {
+    'WORKERS': 2,
+    'CHUNK_SIZE': 200,
+    'MAX_ATTEMPTS': 3,
+    'STALE_AFTER': 10 * 60,
+    'POLL_INTERVAL': 2,
+}
+
+
+def get_job_setting(name):
+    """Lê uma configuração de settings.INVENTORY_JOBS com valor padrão"""
+    return getattr(settings, 'INVENTORY_JOBS', {}).get(name, DEFAULT_JOB_SETTINGS[name])
+
+
+def merge_stats(total, stats):
+    """Soma contadores numéricos de um bloco aos totais da tarefa"""
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+        else:
+            total[key] = value
+    return total
+
+
+class SpreadsheetJobHandler:
+    """Base das tarefas que processam linhas de uma planilha (cursor = posição da linha)"""
+
+    def __init__(self, job):
+        self.job = job
+        self.rows = None
+
+    def prepare(self):
+        """Lê a planilha; retorna o total de linhas"""
+        self.rows = self.load(self.job.file.path)
+        return len(self.rows)
+
+    def next_chunk(self, cursor, size):
+        chunk = self.rows.iloc[cursor:cursor + size]
+        return chunk, cursor + len(chunk)
+
+    def load(self, file_path):
+        raise NotImplementedError
+
+    def process(self, chunk):
+        """Grava um bloco; retorna os contadores do bloco"""
+        raise NotImplementedError
+
+
+class AutomationImportHandler(SpreadsheetJobHandler):
+    """Importação automatizada (InventoryAutomationService)"""
+
+    def __init__(self, job):
+        super().__init__(job)
+        from .automation_service import InventoryAutomationService
+        self.service = InventoryAutomationService()
+
+    def load(self, file_path):
+        return self.service.load_excel_file(file_path)
+
+    def process(self, chunk):
+        self.service.stats = dict.fromkeys(self.service.stats, 0)
+        self.service.process_rows(chunk)
+        return self.service.stats
+
+
+class AIOrganizeHandler(SpreadsheetJobHandler):
+    """Organização de planilhas com IA (AIInventoryOrganizer)"""
+
+    COUNTERS = ('total_processed', 'auto_categorized', 'auto_assigned_lab',
+                'descriptions_generated', 'duplicates_found', 'errors', 'created', 'updated')
+
+    def __init__(self, job):
+        super().__init__(job)
+        from .ai_inventory_organizer import AIInventoryOrganizer
+        self.organizer = AIInventoryOrganizer()
+
+    def load(self, file_path):
+        rows = self.organizer.load_materials(file_path)
+        if rows.empty:
+            raise ValueError('Nenhum material detectado na planilha')
+        return rows
+
+    def process(self, chunk):
+        self.organizer.stats.update(dict.fromkeys(self.COUNTERS, 0))
+        self.organizer.organize_rows(chunk, self.job.options)
+        return {key: self.organizer.stats.get(key, 0) for key in self.COUNTERS}
+
+
+class MaterialBatchHandler:
+    """Base das tarefas sobre materiais existentes (cursor = último id processado)"""
+
+    def __init__(self, job):
+        self.job = job
+        from .ai_inventory_organizer import AIInventoryOrganizer
+        self.organizer = AIInventoryOrganizer()
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def prepare(self):
+        return self.get_queryset().filter(id__gt=self.job.cursor).count() + self.job.processed_items
+
+    def next_chunk(self, cursor, size):
+        chunk = list(self.get_queryset().filter(id__gt=cursor).order_by('id')[:size])
+        return chunk, chunk[-1].id if chunk else cursor
+
+
+class AICategorizeHandler(MaterialBatchHandler):
+    """Recategoriza materiais em categorias genéricas"""
+
+    def get_queryset(self):
+        return Material.objects.select_related('category').filter(
+            category__name__in=['Material Geral', 'Diversos']
+        )
+
+    def process(self, chunk):
+        return {'categorized': self.organizer.categorize_materials(chunk)}
+
+
+class AIDescriptionsHandler(MaterialBatchHandler):
+    """Gera descrições para materiais sem descrição"""
+
+    def get_queryset(self):
+        return Material.objects.select_related('category').filter(
+            Q(description__isnull=True) | Q(description='')
+        )
+
+    def process(self, chunk):
+        return {'generated': self.organizer.describe_materials(chunk)}
+
+
+JOB_HANDLERS = {
+    'automation_import': AutomationImportHandler,
+    'ai_organize': AIOrganizeHandler,
+    'ai_categorize': AICategorizeHandler,
+    'ai_descriptions': AIDescriptionsHandler,
+}
+
+
+class ImportJobService:
+    """Criação, reserva e execução das tarefas em segundo plano"""
+
+    @staticmethod
+    def enqueue(kind, user=None, uploaded_file=None, options=None):
+        """
+        Cria uma tarefa na fila
+
+        Args:
+            kind (str): um dos tipos de ImportJob.KIND_CHOICES
+            user: usuário que solicitou a tarefa
+            uploaded_file: arquivo enviado (planilhas)
+            options (dict): opções repassadas ao processamento
+
+        Returns:
+            ImportJob: a tarefa criada
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Tipo de tarefa desconhecido: {kind}")
+
+        job = ImportJob(kind=kind, created_by=user, options=options or {})
+        if uploaded_file is not None:
+            job.file.save(uploaded_file.name, uploaded_file, save=False)
+        job.save()
+
+        logger.info(f"Tarefa {job.id} ({kind}) enfileirada por {getattr(user, 'username', 'sistema')}")
+        return job
+
+    @staticmethod
+    def claim_batch(limit):
+        """
+        Reserva até 'limit' tarefas para execução
+
+        Usa SKIP LOCKED para que vários workers não peguem a mesma tarefa;
+        tarefas em 'running' sem heartbeat há STALE_AFTER segundos (worker
+        interrompido) são retomadas a partir do checkpoint.
+
+        Returns:
+            list: ids das tarefas reservadas
+        """
+        if limit <= 0:
+            return []
+
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=get_job_setting('STALE_AFTER'))
+
+        with transaction.atomic():
+            # Tarefas que derrubaram o worker MAX_ATTEMPTS vezes não são retomadas
+            ImportJob.objects.filter(
+                status='running',
+                heartbeat_at__lt=stale_before,
+                attempts__gte=get_job_setting('MAX_ATTEMPTS'),
+            ).update(
+                status='failed',
+                error='Worker interrompido repetidamente durante a tarefa',
+                heartbeat_at=None,
+                finished_at=now,
+            )
+
+            job_ids = list(
+                ImportJob.objects.select_for_update(skip_locked=True).filter(
+                    Q(status='pending') |
+                    Q(status='running', heartbeat_at__lt=stale_before)
+                ).order_by('created_at', 'id').values_list('id', flat=True)[:limit]
+            )
+            if job_ids:
+                ImportJob.objects.filter(id__in=job_ids).update(
+                    status='running',
+                    heartbeat_at=now,
+                    attempts=F('attempts') + 1,
+                )
+
+        return job_ids
+
+    @staticmethod
+    def release(job_ids, error):
+        """
+        Devolve à fila tarefas reservadas cujo worker morreu
+
+        O checkpoint é mantido; tarefas que já atingiram MAX_ATTEMPTS falham
+        em vez de derrubar o pool de novo.
+        """
+        if not job_ids:
+            return
+
+        max_attempts = get_job_setting('MAX_ATTEMPTS')
+        jobs = ImportJob.objects.filter(id__in=job_ids, status='running')
+        jobs.filter(attempts__gte=max_attempts).update(
+            status='failed',
+            error=error,
+            heartbeat_at=None,
+            finished_at=timezone.now(),
+        )
+        jobs.filter(attempts__lt=max_attempts).update(
+            status='pending',
+            error=error,
+            heartbeat_at=None,
+        )
+
+    @classmethod
+    def run(cls, job_id):
+        """
+        Executa (ou retoma) uma tarefa reservada até o fim
+
+        Returns:
+            str: status final da tarefa
+        """
+        job = ImportJob.objects.get(pk=job_id)
+        if job.started_at is None:
+            ImportJob.objects.filter(pk=job.pk).update(started_at=timezone.now())
+
+        try:
+            handler = JOB_HANDLERS[job.kind](job)
+            total = handler.prepare()
+            ImportJob.objects.filter(pk=job.pk).update(total_items=total, heartbeat_at=timezone.now())
+
+            chunk_size = job.options.get('chunk_size') or get_job_setting('CHUNK_SIZE')
+            cursor = job.cursor
+            stats = dict(job.result.get('stats', {}))
+
+            while True:
+                chunk, next_cursor = handler.next_chunk(cursor, chunk_size)
+                if len(chunk) == 0:
+                    break
+
+                # Bloco e checkpoint na mesma transação: retomar nunca duplica nem pula linhas
+                with transaction.atomic():
+                    merge_stats(stats, handler.process(chunk))
+                    ImportJob.objects.filter(pk=job.pk).update(
+                        cursor=next_cursor,
+                        processed_items=F('processed_items') + len(chunk),
+                        result={'stats': stats},
+                        heartbeat_at=timezone.now(),
+                    )
+                cursor = next_cursor
+
+        except Exception as e:
+            logger.exception(f"Erro na tarefa {job.id} ({job.kind})")
+            job.refresh_from_db(fields=['attempts'])
+            # Erros inesperados voltam para a fila até MAX_ATTEMPTS; o checkpoint é mantido
+            status = 'pending' if job.attempts < get_job_setting('MAX_ATTEMPTS') else 'failed'
+            ImportJob.objects.filter(pk=job.pk).update(
+                status=status,
+                error=str(e),
+                heartbeat_at=None,
+                finished_at=timezone.now() if status == 'failed' else None,
+            )
+            return status
+
+        ImportJob.objects.filter(pk=job.pk).update(
+            status='completed',
+            error='',
+            heartbeat_at=None,
+            finished_at=timezone.now(),
+        )
+        logger.info(f"Tarefa {job.id} ({job.kind}) concluída: {stats}")
+        return 'completed'
+
+    @staticmethod
+    def to_dict(job):
+        """Representação JSON da tarefa para o endpoint de progresso"""
+        return {
+            'id': job.id,
+            'kind': job.kind,
+            'kind_display': job.get_kind_display(),
+            'status': job.status,
+            'status_display': job.get_status_display(),
+            'total_items': job.total_items,
+            'processed_items': job.processed_items,
+            'progress': job.progress_percent,
+            'stats': job.result.get('stats', {}),
+            'error': job.error,
+            'finished': job.is_finished,
+            'created_at': job.created_at.isoformat() if job.created_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+
+def run_import_job(job_id):
+    """Ponto de entrada dos processos do pool de process_import_jobs"""
+    close_old_connections()
+    try:
+        return ImportJobService.run(job_id)
+    finally:
+        close_old_connections()
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from inventory.services import get_docling_service
+from inventory.similarity import BACKFILL_BATCH_SIZE, backfill_features
+
+
+class Command(BaseCommand):
+    help = 'Calcula as palavras-chave de similaridade dos materiais que ainda não as têm'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BACKFILL_BATCH_SIZE,
+            help='Materiais analisados e gravados por lote'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🔑 PALAVRAS-CHAVE DE SIMILARIDADE')
+        self.stdout.write('=' * 50)
+
+        updated = backfill_features(get_docling_service(), batch_size=options['batch_size'])
+
+        self.stdout.write(f'   📦 Materiais atualizados: {updated}')
+        self.stdout.write(self.style.SUCCESS('\n✅ BACKFILL CONCLUÍDO'))
@@ -0,0 +1,105 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.duplicates import (
+    brute_force_similar_pairs, find_duplicate_groups, normalize_name, shingles, similar_pairs
+)
+
+
+BASE_NAMES = [
+    'Béquer', 'Erlenmeyer', 'Proveta graduada', 'Pipeta volumétrica', 'Pipeta graduada',
+    'Bureta', 'Tubo de ensaio', 'Placa de Petri', 'Microscópio óptico', 'Lâmina de vidro',
+    'Lamínula', 'Balança analítica', 'Estufa de secagem', 'Autoclave vertical', 'Centrífuga',
+    'Luva de procedimento', 'Máscara descartável', 'Ácido clorídrico', 'Hidróxido de sódio',
+    'Cloreto de sódio', 'Álcool etílico', 'Papel filtro', 'Funil de vidro', 'Bastão de vidro',
+    'Termômetro digital', 'Agitador magnético', 'Modelo anatômico', 'Esqueleto humano',
+    'Torso bissexual', 'Seringa descartável', 'Agulha hipodérmica', 'Algodão hidrófilo',
+]
+QUALIFIERS = ['', 'P', 'M', 'G', 'azul', 'branco', 'de vidro', 'de plástico', 'PA', 'reforçado', 'com tampa']
+UNITS = ['', 'ml', 'mL', 'L', 'g', 'kg', 'mm', 'cm', 'un']
+
+
+def _typo(name, rng):
+    """Introduz uma variação de digitação (troca, remoção ou acento removido)"""
+    if len(name) < 4:
+        return name
+    position = rng.randrange(1, len(name) - 1)
+    choice = rng.random()
+    if choice < 0.4:
+        return name[:position] + name[position + 1:]
+    if choice < 0.8:
+        return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+    return normalize_name(name).title()
+
+
+def generate_names(size, seed):
+    """Nomes sintéticos de materiais, com ~10% de variações de nomes já gerados"""
+    rng = random.Random(seed)
+    names = []
+    for index in range(size):
+        if names and rng.random() < 0.1:
+            names.append(_typo(rng.choice(names), rng))
+            continue
+        number = rng.choice([5, 10, 25, 50, 100, 250, 500, 1000]) if rng.random() < 0.7 else index
+        parts = [rng.choice(BASE_NAMES), rng.choice(QUALIFIERS), f"{number}{rng.choice(UNITS)}", f"#{index}"]
+        names.append(' '.join(part for part in parts if part))
+    return names
+
+
+class Command(BaseCommand):
+    help = 'Mede a detecção de duplicatas (MinHash-LSH) com materiais sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10000, 50000],
+            help='Quantidades de materiais a testar'
+        )
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=2000,
+            help='Tamanho da amostra comparada com a força bruta O(n²) para medir o recall'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.stdout.write('⏱️ BENCHMARK DA DETECÇÃO DE DUPLICATAS')
+        self.stdout.write('=' * 50)
+
+        for size in options['sizes']:
+            names = generate_names(size, options['seed'])
+            items = list(enumerate(names, 1))
+
+            started = time.perf_counter()
+            groups = find_duplicate_groups(items)
+            elapsed = time.perf_counter() - started
+
+            self.stdout.write(f'\n📦 {size} materiais')
+            self.stdout.write(f'   ⚡ LSH: {elapsed:.2f}s, {len(groups)} grupos de duplicatas')
+
+            # Recall do LSH em uma amostra, contra a comparação de todos os pares
+            sample = sorted({normalize_name(name) for name in names[:options['sample']]})
+            shingle_sets = [shingles(name) for name in sample]
+
+            started = time.perf_counter()
+            lsh_pairs = similar_pairs(shingle_sets)
+            lsh_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            exact_pairs = brute_force_similar_pairs(shingle_sets)
+            brute_elapsed = time.perf_counter() - started
+
+            recall = len(lsh_pairs.keys() & exact_pairs.keys()) / len(exact_pairs) if exact_pairs else 1.0
+            estimated = brute_elapsed * (size / len(sample)) ** 2 if sample else 0
+            self.stdout.write(
+                f'   🎯 Amostra de {len(sample)} nomes: recall {recall:.1%} '
+                f'({len(lsh_pairs)}/{len(exact_pairs)} pares), LSH {lsh_elapsed:.2f}s x força bruta {brute_elapsed:.2f}s'
+            )
+            self.stdout.write(f'   🐢 Força bruta estimada para {size}: ~{estimated:.0f}s')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ BENCHMARK CONCLUÍDO'))
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from inventory.services import get_docling_metrics, get_docling_service, warm_up_docling_service
+
+
+class Command(BaseCommand):
+    help = 'Mostra o tempo de inicialização e a memória do DoclingService/spaCy neste processo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-load',
+            action='store_true',
+            help='Não carrega o modelo spaCy (mede só a criação do serviço)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🧠 DOCLING SERVICE')
+        self.stdout.write('=' * 50)
+        self.stdout.write(f'   Habilitado: {getattr(settings, "DOCLING_ENABLED", False)}')
+        self.stdout.write(f'   Pré-carregamento: {getattr(settings, "DOCLING_PRELOAD", False)}')
+
+        if options['no_load']:
+            get_docling_service()
+            metrics = get_docling_metrics()
+        else:
+            metrics = warm_up_docling_service()
+
+        self.stdout.write(f'   ⏱️ Criação do serviço: {metrics["service_init_seconds"]}s')
+        if metrics['model_loaded']:
+            self.stdout.write(f'   📦 Modelo: {metrics["model"]}')
+            self.stdout.write(f'   ⏱️ Carregamento do modelo: {metrics["load_seconds"]}s')
+            if metrics['rss_increase_kb'] is not None:
+                self.stdout.write(f'   💾 Memória adicional (pico RSS): {metrics["rss_increase_kb"]} KB')
+        else:
+            self.stdout.write('   ⚠️ Modelo spaCy não carregado (análise baseada em regras)')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ STATUS CONCLUÍDO'))
@@ -0,0 +1,128 @@
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from inventory.jobs import ImportJobService, get_job_setting, run_import_job
+
+
+def _init_worker():
+    """Inicializa o Django em cada processo do pool (contexto spawn)"""
+    # O sinal de parada é tratado pelo processo principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas de importação/IA do inventário em um pool de processos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa as tarefas pendentes e encerra (útil em cron)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Quantidade de processos executando tarefas em paralelo'
+        )
+
+    def handle(self, *args, **options):
+        self._running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        workers = options['workers'] or get_job_setting('WORKERS')
+        poll_interval = get_job_setting('POLL_INTERVAL')
+
+        self.stdout.write(f'⚙️ PROCESSANDO TAREFAS DO INVENTÁRIO ({workers} worker(s))')
+
+        totals = {'completed': 0, 'pending': 0, 'failed': 0}
+        running = {}
+
+        executor = self._build_executor(workers)
+        try:
+            while self._running or running:
+                if self._running:
+                    claimed = ImportJobService.claim_batch(workers - len(running))
+                    for index, job_id in enumerate(claimed):
+                        try:
+                            future = executor.submit(run_import_job, job_id)
+                        except BrokenProcessPool:
+                            # Tarefas reservadas e não submetidas voltam à fila junto com as demais
+                            executor = self._rebuild_executor(executor, running, workers, claimed[index:])
+                            break
+                        running[future] = job_id
+                        self.stdout.write(f'   ▶️ Tarefa {job_id} iniciada')
+                    connections.close_all()
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        status = future.result()
+                    except BrokenProcessPool:
+                        running[future] = job_id
+                        broken = True
+                        continue
+                    except Exception as e:
+                        # Erro ao devolver o resultado: a tarefa é retomada pelo heartbeat expirado
+                        self.stdout.write(self.style.ERROR(f'   ❌ Tarefa {job_id}: worker interrompido ({e})'))
+                        continue
+                    totals[status] += 1
+                    icon = {'completed': '✅', 'pending': '🔁', 'failed': '❌'}[status]
+                    self.stdout.write(f'   {icon} Tarefa {job_id}: {status}')
+
+                if broken:
+                    executor = self._rebuild_executor(executor, running, workers)
+        finally:
+            executor.shutdown(wait=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ WORKER ENCERRADO: {totals['completed']} concluídas, "
+                f"{totals['pending']} reagendadas, {totals['failed']} falharam"
+            )
+        )
+
+    def _build_executor(self, workers):
+        # spawn: os processos filhos não herdam as conexões abertas do processo principal
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+
+    def _rebuild_executor(self, executor, running, workers, unsubmitted=()):
+        """
+        Substitui um pool quebrado (processo filho morto)
+
+        Depois da queda todo submit falha; as tarefas que estavam no pool voltam
+        à fila imediatamente em vez de esperar STALE_AFTER.
+        """
+        job_ids = list(running.values()) + list(unsubmitted)
+        running.clear()
+        executor.shutdown(wait=False, cancel_futures=True)
+        ImportJobService.release(job_ids, 'Worker interrompido durante a tarefa')
+        self.stdout.write(self.style.ERROR(
+            f'   ❌ Pool de processos interrompido; {len(job_ids)} tarefa(s) devolvida(s) à fila'
+        ))
+        return self._build_executor(workers)
+
+    def _stop(self, signum, frame):
+        # Termina as tarefas em andamento; as pendentes ficam para o próximo worker
+        self._running = False
@@ -0,0 +1,43 @@
+# Generated manually for the inventory background jobs
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_material_invoice_material_photo_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('automation_import', 'Importação automatizada'), ('ai_organize', 'Organização com IA'), ('ai_categorize', 'Categorização em lote com IA'), ('ai_descriptions', 'Geração de descrições com IA')], max_length=30, verbose_name='Tipo')),
+                ('status', models.CharField(choices=[('pending', 'Na fila'), ('running', 'Em execução'), ('completed', 'Concluída'), ('failed', 'Falhou')], default='pending', max_length=10)),
+                ('file', models.FileField(blank=True, upload_to='import_jobs/', verbose_name='Arquivo')),
+                ('options', models.JSONField(blank=True, default=dict, verbose_name='Opções')),
+                ('total_items', models.PositiveIntegerField(default=0, verbose_name='Total de itens')),
+                ('processed_items', models.PositiveIntegerField(default=0, verbose_name='Itens processados')),
+                ('cursor', models.BigIntegerField(default=0, verbose_name='Checkpoint')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='Resultado')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Erro')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa de Importação',
+                'verbose_name_plural': 'Tarefas de Importação',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='import_job_queue_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,7 @@
 # inventory/models.py
 from django.db import models
 from laboratories.models import Laboratory
-from .services import DoclingService
+from .services import get_docling_service
 from django.conf import settings
 import json
 try:
@@ -9,7 +9,7 @@ try:
 except ImportError:
     from django.contrib.postgres.fields import JSONField
 
-docling_service = DoclingService() if getattr(settings, 'DOCLING_ENABLED', False) else None
+docling_service = get_docling_service() if getattr(settings, 'DOCLING_ENABLED', False) else None
 
 class MaterialCategory(models.Model):
     CATEGORY_TYPES = (
@@ -127,8 +127,31 @@ class Material(models.Model):
                             self.category = category
                     except:
                         pass
-        
+
+        # Palavras-chave do índice de similaridade: recalculadas só se nome/descrição mudaram
+        from .similarity import ensure_features, features_hash, invalidate_index
+        if docling_service:
+            if ensure_features(self, docling_service) and kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'analyzed_data'}
+
         super().save(*args, **kwargs)
+
+        # O índice só é descartado quando as palavras-chave gravadas mudam
+        current_hash = features_hash(self.analyzed_data)
+        if current_hash != getattr(self, '_loaded_features_hash', None):
+            invalidate_index()
+        self._loaded_features_hash = current_hash
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda o hash das palavras-chave carregadas para só invalidar o índice de similaridade se mudarem
+        loaded = dict(zip(field_names, values))
+        analyzed_data = loaded.get('analyzed_data')
+        if analyzed_data is not models.DEFERRED:
+            from .similarity import features_hash
+            instance._loaded_features_hash = features_hash(analyzed_data)
+        return instance
     
     class Meta:
         indexes = [
@@ -140,4 +163,72 @@ class Material(models.Model):
             models.Index(fields=['expiration_date'], condition=models.Q(expiration_date__isnull=False), name='material_expiration_idx'),  # Para materiais com validade
             models.Index(fields=['created_at']),  # Para ordenação temporal
             models.Index(fields=['laboratory', 'quantity']),  # Para dashboard de materiais por lab
-        ]   
\ No newline at end of file
+        ]   
+
+class ImportJob(models.Model):
+    """
+    Tarefa longa do inventário (importação/organização de planilhas e
+    processamento em lote com IA) executada fora do request
+
+    As views apenas criam o registro; o comando process_import_jobs executa
+    a tarefa em blocos, gravando o checkpoint (cursor) a cada bloco para que
+    uma tarefa interrompida continue de onde parou.
+    """
+    KIND_CHOICES = (
+        ('automation_import', 'Importação automatizada'),
+        ('ai_organize', 'Organização com IA'),
+        ('ai_categorize', 'Categorização em lote com IA'),
+        ('ai_descriptions', 'Geração de descrições com IA'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Na fila'),
+        ('running', 'Em execução'),
+        ('completed', 'Concluída'),
+        ('failed', 'Falhou'),
+    )
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, verbose_name="Tipo")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='import_jobs/', blank=True, verbose_name="Arquivo")
+    options = models.JSONField(default=dict, blank=True, verbose_name="Opções")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='import_jobs'
+    )
+    total_items = models.PositiveIntegerField(default=0, verbose_name="Total de itens")
+    processed_items = models.PositiveIntegerField(default=0, verbose_name="Itens processados")
+    cursor = models.BigIntegerField(default=0, verbose_name="Checkpoint")
+    result = models.JSONField(default=dict, blank=True, verbose_name="Resultado")
+    error = models.TextField(blank=True, default='', verbose_name="Erro")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Tarefa de Importação"
+        verbose_name_plural = "Tarefas de Importação"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='import_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.get_status_display()})"
+
+    @property
+    def progress_percent(self):
+        if self.status == 'completed':
+            return 100
+        if not self.total_items:
+            return 0
+        return min(99, int(self.processed_items * 100 / self.total_items))
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
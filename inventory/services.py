@@ -1,21 +1,105 @@
 # inventory/services.py - Docling Service Avançado para Gestão Inteligente
+import copy
+import hashlib
 import logging
+import os
 import re
-from typing import Dict, List, Optional, Any, Tuple
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Any, Tuple
 from django.conf import settings
 from django.db.models import Q
 import json
-from collections import Counter
+from collections import Counter, OrderedDict
 import unicodedata
 
+from .categorization import CategorizationEngine
+
 logger = logging.getLogger(__name__)
 
+
+DEFAULT_ANALYSIS_SETTINGS = {
+    'BATCH_SIZE': 64,
+    'N_PROCESS': 1,
+    'MEMORY_CACHE_SIZE': 4096,
+    'DISK_CACHE': True,
+}
+
+# Componentes do spaCy que a análise não usa (entidades, POS e lemas continuam ativos)
+UNUSED_PIPES = ('parser', 'senter')
+
+# Versão do formato da análise: alterar invalida o cache em disco
+ANALYSIS_CACHE_VERSION = 1
+
+# Stop words em português
+STOP_WORDS = frozenset({
+    'de', 'da', 'do', 'das', 'dos', 'para', 'com', 'sem', 'por',
+    'em', 'na', 'no', 'nas', 'nos', 'a', 'o', 'as', 'os', 'um',
+    'uma', 'uns', 'umas', 'e', 'ou', 'mas', 'que', 'como', 'quando',
+    'onde', 'porque', 'se', 'isso', 'esse', 'essa', 'este', 'esta'
+})
+
+
+def get_analysis_setting(name):
+    """Lê uma configuração de settings.DOCLING_ANALYSIS com valor padrão"""
+    return getattr(settings, 'DOCLING_ANALYSIS', {}).get(name, DEFAULT_ANALYSIS_SETTINGS[name])
+
 # Tentar importar spacy, mas não falhar se não estiver disponível
 try:
     import spacy
 except ImportError:
     spacy = None
 
+# Métricas de carregamento do processo atual (ver get_docling_metrics)
+_load_metrics = {
+    'model': None,
+    'model_loaded': False,
+    'service_init_seconds': None,
+    'load_seconds': None,
+    'rss_increase_kb': None,
+    'loaded_at': None,
+    'pid': None,
+}
+
+_shared_service = None
+_shared_service_lock = threading.Lock()
+
+
+def get_docling_service():
+    """
+    DoclingService compartilhado pelo processo
+    
+    Criado no primeiro uso (bases de conhecimento e autômato); o modelo spaCy
+    só é carregado na primeira análise, ou antes com warm_up_docling_service.
+    """
+    global _shared_service
+    if _shared_service is None:
+        with _shared_service_lock:
+            if _shared_service is None:
+                started = time.perf_counter()
+                _shared_service = DoclingService()
+                _load_metrics['service_init_seconds'] = round(time.perf_counter() - started, 3)
+    return _shared_service
+
+
+def warm_up_docling_service():
+    """
+    Carrega o modelo spaCy agora
+    
+    Chamado no ready() do app com DOCLING_PRELOAD=True: com 'gunicorn --preload'
+    roda no processo mestre e os workers herdam o modelo por copy-on-write;
+    sem --preload, cada worker carrega o modelo no boot em vez da primeira requisição.
+    """
+    service = get_docling_service()
+    service.nlp
+    return get_docling_metrics()
+
+
+def get_docling_metrics():
+    """Métricas de criação do serviço e carregamento do modelo neste processo"""
+    return dict(_load_metrics, current_pid=os.getpid())
+
+
 class DoclingService:
     """
     Serviço avançado para análise inteligente de materiais
@@ -24,17 +108,17 @@ class DoclingService:
     
     def __init__(self):
         self.enabled = True
-        self.nlp = None
+        self.model_name = getattr(settings, 'DOCLING_MODEL', 'pt_core_news_sm')
         
-        # Tentar carregar spaCy se disponível
-        try:
-            if spacy is not None:
-                self.nlp = spacy.load("pt_core_news_sm")
-                logger.info("SpaCy carregado com sucesso")
-            else:
-                logger.info("SpaCy não está instalado, usando análise baseada em regras")
-        except (ImportError, OSError):
-            logger.warning("SpaCy não disponível, usando análise baseada em regras")
+        # O modelo spaCy só é carregado no primeiro uso (ver propriedade nlp)
+        self._nlp = None
+        self._nlp_loaded = False
+        self._nlp_lock = threading.Lock()
+        
+        # Cache das análises por hash do texto (memória LRU + disco)
+        self._analysis_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_dir = getattr(settings, 'DOCLING_CACHE_DIR', None) if get_analysis_setting('DISK_CACHE') else None
         
         # Base de conhecimento avançada
         self.category_knowledge = self._build_advanced_knowledge_base()
@@ -42,6 +126,70 @@ class DoclingService:
         self.material_patterns = self._build_material_patterns()
         self.brand_indicators = self._build_brand_indicators()
         
+        # Compilados uma única vez: padrões regex e autômato da base de conhecimento
+        self.compiled_patterns = {
+            pattern_name: re.compile(pattern, re.IGNORECASE)
+            for pattern_name, pattern in self.material_patterns.items()
+        }
+        self.categorization_engine = CategorizationEngine(
+            self.category_knowledge, self.laboratory_mapping
+        )
+        
+    @property
+    def nlp(self):
+        """Modelo spaCy, carregado (uma vez por processo) no primeiro acesso"""
+        if not self._nlp_loaded:
+            with self._nlp_lock:
+                if not self._nlp_loaded:
+                    self._nlp = self._load_nlp()
+                    self._nlp_loaded = True
+        return self._nlp
+    
+    @staticmethod
+    def _peak_rss_kb():
+        """Pico de memória (RSS) do processo em KB; None onde o módulo resource não existe (Windows)"""
+        try:
+            import resource
+        except ImportError:
+            return None
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    def _load_nlp(self):
+        """Carrega o modelo spaCy sem os componentes não usados; registra tempo e memória"""
+        if spacy is None:
+            logger.info("SpaCy não está instalado, usando análise baseada em regras")
+            return None
+        
+        started = time.perf_counter()
+        rss_before = self._peak_rss_kb()
+        try:
+            nlp = spacy.load(self.model_name)
+            for pipe in UNUSED_PIPES:
+                if pipe in nlp.pipe_names:
+                    nlp.disable_pipe(pipe)
+        except (ImportError, OSError):
+            logger.warning("SpaCy não disponível, usando análise baseada em regras")
+            return None
+        
+        rss_after = self._peak_rss_kb()
+        _load_metrics.update({
+            'model': self.model_name,
+            'model_loaded': True,
+            'load_seconds': round(time.perf_counter() - started, 3),
+            'rss_increase_kb': rss_after - rss_before if rss_before is not None else None,
+            'loaded_at': time.time(),
+            'pid': os.getpid(),
+        })
+        logger.info(
+            f"SpaCy carregado com sucesso ({self.model_name}, {_load_metrics['load_seconds']}s, "
+            f"+{_load_metrics['rss_increase_kb'] if rss_before is not None else '?'} KB, pid {os.getpid()})"
+        )
+        return nlp
+    
+    @property
+    def model_loaded(self) -> bool:
+        return self._nlp_loaded and self._nlp is not None
+    
     def _build_advanced_knowledge_base(self) -> Dict[str, Dict]:
         """Constrói base de conhecimento avançada por categoria"""
         return {
@@ -165,14 +313,50 @@ class DoclingService:
         """
         Análise avançada de texto usando múltiplas técnicas
         """
-        if not text:
-            return self._empty_analysis()
+        return self.analyze_texts([text])[0]
+    
+    def analyze_texts(self, texts: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Analisa vários textos de uma vez, na mesma ordem
+        
+        Textos já analisados (mesmo conteúdo) vêm do cache em memória ou em
+        DOCLING_CACHE_DIR; os demais passam pelo spaCy em lote (nlp.pipe).
+        """
+        texts = list(texts)
+        results = [None] * len(texts)
+        pending = OrderedDict()
         
+        for position, text in enumerate(texts):
+            if not text:
+                results[position] = self._empty_analysis()
+                continue
+            key = self._analysis_cache_key(text)
+            cached = self._get_cached_analysis(key)
+            if cached is not None:
+                results[position] = cached
+            else:
+                pending.setdefault(key, (text, []))[1].append(position)
+        
+        if pending:
+            pending_texts = [text for text, _ in pending.values()]
+            docs = self._pipe(pending_texts) if self.nlp else [None] * len(pending_texts)
+            
+            for (key, (text, positions)), doc in zip(pending.items(), docs):
+                analysis = self._analyze_single(text, doc)
+                # A chave pode mudar se o modelo não pôde ser carregado (somente regras)
+                self._set_cached_analysis(self._analysis_cache_key(text), analysis)
+                for position in positions:
+                    results[position] = analysis
+        
+        # Cópias: os chamadores costumam alterar a análise antes de gravá-la
+        return [copy.deepcopy(result) for result in results]
+    
+    def _analyze_single(self, text: str, doc=None) -> Dict[str, Any]:
         # Normalizar texto
         normalized_text = self._normalize_text(text)
         
         # Análise com spaCy se disponível
-        nlp_analysis = self._analyze_with_spacy(text) if self.nlp else {}
+        nlp_analysis = self._analyze_with_spacy(doc) if doc is not None else {}
         
         # Análise baseada em regras
         rule_analysis = self._analyze_with_rules(normalized_text)
@@ -181,17 +365,75 @@ class DoclingService:
         pattern_analysis = self._analyze_patterns(text)
         
         # Combinar resultados
-        combined_analysis = self._combine_analyses(
+        return self._combine_analyses(
             nlp_analysis, rule_analysis, pattern_analysis
         )
-        
-        return combined_analysis
     
-    def _analyze_with_spacy(self, text: str) -> Dict[str, Any]:
-        """Análise usando spaCy para extração de entidades"""
+    def _pipe(self, texts: List[str]) -> List[Any]:
+        """Processa os textos no spaCy em lote; em caso de erro, sem análise spaCy"""
+        try:
+            return list(self.nlp.pipe(
+                texts,
+                batch_size=get_analysis_setting('BATCH_SIZE'),
+                n_process=get_analysis_setting('N_PROCESS'),
+            ))
+        except Exception as e:
+            logger.error(f"Erro na análise spaCy em lote: {e}")
+            return [None] * len(texts)
+    
+    # === CACHE DE ANÁLISES ===
+    def _analysis_cache_key(self, text: str) -> str:
+        # Não força o carregamento do modelo: antes dele, vale o modelo configurado
+        use_model = spacy is not None and (not self._nlp_loaded or self._nlp is not None)
+        model = self.model_name if use_model else 'rules'
+        content = f"{ANALYSIS_CACHE_VERSION}:{model}:{text}"
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+    
+    def _analysis_cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, 'analysis', key[:2], f"{key}.json")
+    
+    def _get_cached_analysis(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            analysis = self._analysis_cache.get(key)
+            if analysis is not None:
+                self._analysis_cache.move_to_end(key)
+                return analysis
+        
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._analysis_cache_path(key), encoding='utf-8') as cache_file:
+                analysis = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        self._remember_analysis(key, analysis)
+        return analysis
+    
+    def _set_cached_analysis(self, key: str, analysis: Dict[str, Any]) -> None:
+        self._remember_analysis(key, analysis)
+        if not self.cache_dir:
+            return
+        path = self._analysis_cache_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Escrita atômica: outro processo nunca lê um arquivo pela metade
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump(analysis, cache_file, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar a análise em cache ({path}): {e}")
+    
+    def _remember_analysis(self, key: str, analysis: Dict[str, Any]) -> None:
+        with self._cache_lock:
+            self._analysis_cache[key] = analysis
+            self._analysis_cache.move_to_end(key)
+            while len(self._analysis_cache) > get_analysis_setting('MEMORY_CACHE_SIZE'):
+                self._analysis_cache.popitem(last=False)
+    
+    def _analyze_with_spacy(self, doc) -> Dict[str, Any]:
+        """Análise usando spaCy para extração de entidades (doc já processado)"""
         try:
-            doc = self.nlp(text)
-            
             entities = []
             for ent in doc.ents:
                 entities.append({
@@ -224,7 +466,7 @@ class DoclingService:
         # Extrair palavras-chave relevantes
         keywords = []
         for word in words:
-            if len(word) > 2 and word not in self._get_stop_words():
+            if len(word) > 2 and word not in STOP_WORDS:
                 keywords.append(word)
         
         # Análise de sentimento básico
@@ -244,8 +486,8 @@ class DoclingService:
         """Análise usando padrões regex específicos"""
         patterns_found = {}
         
-        for pattern_name, pattern in self.material_patterns.items():
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for pattern_name, pattern in self.compiled_patterns.items():
+            matches = pattern.findall(text)
             if matches:
                 patterns_found[pattern_name] = matches
         
@@ -263,101 +505,24 @@ class DoclingService:
             return self._default_categorization()
         
         full_text = f"{name} {description}".strip()
-        normalized_text = self._normalize_text(full_text)
-        
-        # Calcular scores por categoria
-        category_scores = {}
-        explanations = {}
-        
-        for category, knowledge in self.category_knowledge.items():
-            score, explanation = self._calculate_category_score(
-                normalized_text, knowledge
-            )
-            category_scores[category] = score
-            explanations[category] = explanation
-        
-        # Determinar melhor categoria
-        best_category = max(category_scores, key=category_scores.get)
-        confidence = category_scores[best_category]
-        
-        # Aplicar regras de negócio
-        final_category, final_confidence = self._apply_business_rules(
-            best_category, confidence, normalized_text
-        )
-        
-        return {
-            'category': final_category,
-            'confidence': final_confidence,
-            'explanation': explanations[final_category],
-            'all_scores': category_scores,
-            'suggested_lab': self._suggest_laboratory(normalized_text)
-        }
-    
-    def _calculate_category_score(self, text: str, knowledge: Dict) -> Tuple[float, str]:
-        """Calcula score de uma categoria específica"""
-        score = 0.0
-        reasons = []
-        
-        # Score por palavras-chave
-        keyword_hits = 0
-        for keyword in knowledge['keywords']:
-            if keyword in text:
-                keyword_hits += 1
-                score += 2.0
-                reasons.append(f"palavra-chave: {keyword}")
-        
-        # Score por indicadores
-        for indicator in knowledge['indicators']:
-            if indicator in text:
-                score += 1.5
-                reasons.append(f"indicador: {indicator}")
-        
-        # Score por contexto
-        for context in knowledge['contexts']:
-            if context in text:
-                score += 1.0
-                reasons.append(f"contexto: {context}")
-        
-        # Normalizar score
-        max_possible = len(knowledge['keywords']) * 2.0 + len(knowledge['indicators']) * 1.5
-        normalized_score = min(score / max_possible if max_possible > 0 else 0, 1.0)
-        
-        explanation = f"Score: {normalized_score:.2f} - " + ", ".join(reasons[:3])
-        
-        return normalized_score, explanation
-    
-    def _apply_business_rules(self, category: str, confidence: float, text: str) -> Tuple[str, float]:
-        """Aplica regras de negócio específicas"""
-        
-        # Regra 1: Equipamentos caros são sempre permanentes
-        expensive_indicators = ['microscopio', 'computador', 'impressora', 'balanca']
-        if any(indicator in text for indicator in expensive_indicators):
-            return 'permanent', max(confidence, 0.8)
-        
-        # Regra 2: Produtos com validade são perecíveis
-        perishable_indicators = ['validade', 'vencimento', 'refrigerar', 'congelar']
-        if any(indicator in text for indicator in perishable_indicators):
-            return 'perishable', max(confidence, 0.7)
-        
-        # Regra 3: Produtos com quantidade em ml/mg são consumíveis
-        if re.search(r'\d+\s*(ml|mg|g)\b', text):
-            return 'consumable', max(confidence, 0.6)
-        
-        return category, confidence
+        return self.categorization_engine.categorize(self._normalize_text(full_text))
     
-    def _suggest_laboratory(self, text: str) -> Optional[str]:
-        """Sugere laboratório baseado no contexto do material"""
-        lab_scores = {}
-        
-        for lab_type, keywords in self.laboratory_mapping.items():
-            score = sum(1 for keyword in keywords if keyword in text)
-            if score > 0:
-                lab_scores[lab_type] = score
-        
-        if lab_scores:
-            return max(lab_scores, key=lab_scores.get)
+    def categorize_many(self, items: Iterable[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Categoriza vários materiais de uma vez: pares (descrição, nome), na mesma ordem
         
-        return None
+        Textos que normalizam para o mesmo conteúdo são categorizados uma única vez.
+        """
+        items = list(items)
+        texts = [
+            self._normalize_text(f"{name} {description}".strip())
+            for description, name in items if description or name
+        ]
+        categorized = iter(self.categorization_engine.categorize_many(texts))
+        return [
+            next(categorized) if description or name else self._default_categorization()
+            for description, name in items
+        ]
     
     def suggest_material_improvements(self, material_id: int) -> Dict[str, Any]:
         """
@@ -416,46 +581,29 @@ class DoclingService:
     
     def find_similar_materials(self, material_id: int, limit: int = 5) -> List[Dict]:
         """
-        Encontra materiais similares usando análise semântica
+        Encontra materiais similares usando o índice de palavras-chave (TF-IDF)
         """
         from .models import Material
+        from .similarity import MaterialSimilarityIndex
         
-        try:
-            target_material = Material.objects.get(id=material_id)
-        except Material.DoesNotExist:
+        if not Material.objects.filter(id=material_id).exists():
             return []
         
-        # Analisar material alvo
-        target_analysis = self.analyze_text(
-            f"{target_material.name} {target_material.description}"
+        index = MaterialSimilarityIndex.get()
+        matches = index.similar_to(material_id, limit)
+        materials = Material.objects.select_related('category').in_bulk(
+            [other_id for other_id, _, _ in matches]
         )
-        target_keywords = set(target_analysis.get('keywords', []))
-        
-        # Buscar materiais similares
-        similar_materials = []
-        other_materials = Material.objects.exclude(id=material_id).select_related('category')
         
-        for material in other_materials:
-            material_text = f"{material.name} {material.description}"
-            material_analysis = self.analyze_text(material_text)
-            material_keywords = set(material_analysis.get('keywords', []))
-            
-            # Calcular similaridade (Jaccard)
-            intersection = len(target_keywords & material_keywords)
-            union = len(target_keywords | material_keywords)
-            similarity = intersection / union if union > 0 else 0
-            
-            if similarity > 0.2:  # Limiar de similaridade
-                similar_materials.append({
-                    'material': material,
-                    'similarity': similarity,
-                    'common_keywords': list(target_keywords & material_keywords)
-                })
-        
-        # Ordenar por similaridade
-        similar_materials.sort(key=lambda x: x['similarity'], reverse=True)
-        
-        return similar_materials[:limit]
+        return [
+            {
+                'material': materials[other_id],
+                'similarity': similarity,
+                'common_keywords': common_keywords
+            }
+            for other_id, similarity, common_keywords in matches
+            if other_id in materials
+        ]
     
     def generate_inventory_insights(self) -> Dict[str, Any]:
         """
@@ -471,25 +619,26 @@ class DoclingService:
             'trends': {}
         }
         
-        materials = Material.objects.all().select_related('category')
+        materials = list(Material.objects.all().select_related('category'))
         
         # Análise de distribuição por categoria
         category_counts = Counter()
         quality_scores = []
         
-        for material in materials:
+        # Descrições analisadas em lote (nlp.pipe + cache)
+        analyses = self.analyze_texts(material.description for material in materials)
+        categorizations = self.categorize_many(
+            (material.description, material.name) for material in materials
+        )
+        
+        for material, desc_analysis, category_analysis in zip(materials, analyses, categorizations):
             category_counts[material.category.material_type] += 1
             
             # Avaliar qualidade da descrição
-            desc_analysis = self.analyze_text(material.description)
             quality_score = len(desc_analysis.get('keywords', [])) / 10.0
             quality_scores.append(quality_score)
             
             # Detectar anomalias
-            category_analysis = self.categorize_material(
-                material.description, material.name
-            )
-            
             if (category_analysis['confidence'] > 0.7 and 
                 category_analysis['category'] != material.category.material_type):
                 insights['anomalies'].append({
@@ -524,12 +673,7 @@ class DoclingService:
     
     def _get_stop_words(self) -> set:
         """Lista de stop words em português"""
-        return {
-            'de', 'da', 'do', 'das', 'dos', 'para', 'com', 'sem', 'por',
-            'em', 'na', 'no', 'nas', 'nos', 'a', 'o', 'as', 'os', 'um',
-            'uma', 'uns', 'umas', 'e', 'ou', 'mas', 'que', 'como', 'quando',
-            'onde', 'porque', 'se', 'isso', 'esse', 'essa', 'este', 'esta'
-        }
+        return STOP_WORDS
     
     def _analyze_sentiment(self, text: str) -> str:
         """Análise básica de sentimento"""
@@ -0,0 +1,266 @@
+# inventory/similarity.py
+"""
+Índice de similaridade entre materiais (palavras-chave + TF-IDF)
+
+As palavras-chave de cada material (analyze_text de "nome descrição") são
+calculadas na gravação (Material.save e importações em lote) e guardadas em
+analyzed_data['similarity'] junto com o hash do texto analisado; materiais
+antigos são preenchidos pelo comando backfill_similarity_features. O índice
+invertido (palavra-chave -> materiais) é montado só a partir desses dados,
+sem nenhuma análise NLP, e fica no cache até que as palavras-chave de algum
+material mudem ou um material seja removido; uma consulta só pontua os
+materiais que compartilham alguma palavra-chave com o material alvo.
+"""
+import hashlib
+import logging
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from cache_manager import CacheManager
+
+logger = logging.getLogger(__name__)
+
+# Chave em Material.analyzed_data com as palavras-chave usadas na similaridade
+FEATURES_KEY = 'similarity'
+
+# Similaridade mínima (cosseno TF-IDF) para considerar dois materiais similares
+MIN_SIMILARITY = 0.2
+
+# Tamanho dos lotes ao calcular palavras-chave ausentes
+BACKFILL_BATCH_SIZE = 500
+
+# Tipo de cache (e tag) do índice montado
+INDEX_CACHE = 'similarity_index'
+
+
+def material_text(name, description):
+    return f"{name} {description or ''}"
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def features_from_analysis(text, analysis):
+    """Palavras-chave do material para o índice (dict gravado em analyzed_data)"""
+    return {'keywords': sorted(set(analysis.get('keywords', []))), 'text_hash': text_hash(text)}
+
+
+def compute_features(analyzer, name, description):
+    text = material_text(name, description)
+    return features_from_analysis(text, analyzer.analyze_text(text))
+
+
+def features_hash(analyzed_data):
+    """Hash do texto das palavras-chave gravadas (None se o material não as tem)"""
+    features = (analyzed_data or {}).get(FEATURES_KEY)
+    return features.get('text_hash') if features else None
+
+
+def has_current_features(analyzed_data, name, description):
+    current = features_hash(analyzed_data)
+    return current is not None and current == text_hash(material_text(name, description))
+
+
+def invalidate_index():
+    """Descarta o índice em cache após o commit (palavras-chave alteradas ou material removido)"""
+    transaction.on_commit(lambda: CacheManager.invalidate_tags(INDEX_CACHE))
+
+
+def ensure_features(material, analyzer):
+    """
+    Atualiza as palavras-chave do material se nome/descrição mudaram
+
+    Returns:
+        bool: True se analyzed_data foi alterado
+    """
+    if has_current_features(material.analyzed_data, material.name, material.description):
+        return False
+    material.analyzed_data = material.analyzed_data or {}
+    material.analyzed_data[FEATURES_KEY] = compute_features(analyzer, material.name, material.description)
+    return True
+
+
+def assign_features(materials, analyzer):
+    """
+    Calcula, em uma única chamada a analyze_texts, as palavras-chave dos
+    materiais cujo nome/descrição mudou (sem gravar)
+
+    Usado antes de bulk_create/bulk_update, que não passam pelo save.
+
+    Returns:
+        list: materiais cujo analyzed_data foi alterado
+    """
+    if analyzer is None:
+        return []
+    outdated = [
+        material for material in materials
+        if not has_current_features(material.analyzed_data, material.name, material.description)
+    ]
+    if not outdated:
+        return []
+    texts = [material_text(material.name, material.description) for material in outdated]
+    for material, text, analysis in zip(outdated, texts, analyzer.analyze_texts(texts)):
+        material.analyzed_data = material.analyzed_data or {}
+        material.analyzed_data[FEATURES_KEY] = features_from_analysis(text, analysis)
+    return outdated
+
+
+def refresh_features(material_ids, analyzer, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Atualiza as palavras-chave de materiais já gravados por bulk_update
+
+    Returns:
+        int: materiais cujas palavras-chave mudaram
+    """
+    from .models import Material
+
+    if analyzer is None:
+        return 0
+    material_ids = list(material_ids)
+    updated = 0
+    for start in range(0, len(material_ids), batch_size):
+        batch = list(Material.objects.filter(id__in=material_ids[start:start + batch_size]).only(
+            'id', 'name', 'description', 'analyzed_data'
+        ))
+        changed = assign_features(batch, analyzer)
+        if changed:
+            Material.objects.bulk_update(changed, ['analyzed_data'])
+            updated += len(changed)
+    if updated:
+        invalidate_index()
+    return updated
+
+
+def backfill_features(analyzer, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Calcula as palavras-chave dos materiais que ainda não as têm
+
+    Executado pelo comando backfill_similarity_features (materiais gravados
+    antes do índice ou por caminhos que não passam pelo save); nunca em
+    requisições web. Cada material é analisado uma única vez e gravado em lote.
+
+    Returns:
+        int: materiais atualizados
+    """
+    from .models import Material
+
+    missing = Material.objects.filter(
+        Q(analyzed_data__isnull=True) | ~Q(analyzed_data__has_key=FEATURES_KEY)
+    ).only('id', 'name', 'description', 'analyzed_data').order_by('id')
+
+    updated = 0
+    last_id = 0
+    while True:
+        batch = list(missing.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        changed = assign_features(batch, analyzer)
+        # bulk_update não dispara os signals de Material
+        with transaction.atomic():
+            Material.objects.bulk_update(changed, ['analyzed_data'])
+            if changed:
+                invalidate_index()
+        updated += len(changed)
+        last_id = batch[-1].id
+
+    if updated:
+        logger.info(f"Palavras-chave de similaridade calculadas para {updated} materiais")
+    return updated
+
+
+class MaterialSimilarityIndex:
+    """Índice invertido de palavras-chave com pesos TF-IDF e normas pré-calculadas"""
+
+    def __init__(self, documents):
+        """
+        Args:
+            documents (dict): id do material -> lista de palavras-chave
+        """
+        self.keywords = {material_id: frozenset(keywords) for material_id, keywords in documents.items()}
+        self.postings = defaultdict(list)
+        for material_id, keywords in self.keywords.items():
+            for keyword in keywords:
+                self.postings[keyword].append(material_id)
+        self.postings = dict(self.postings)
+
+        total = len(self.keywords)
+        # Palavras-chave raras pesam mais (idf suavizado, sempre positivo)
+        self.idf = {
+            keyword: math.log((1 + total) / (1 + len(material_ids))) + 1
+            for keyword, material_ids in self.postings.items()
+        }
+        self.norms = {
+            material_id: math.sqrt(sum(self.idf[keyword] ** 2 for keyword in keywords))
+            for material_id, keywords in self.keywords.items()
+        }
+
+    def __len__(self):
+        return len(self.keywords)
+
+    @classmethod
+    def build(cls):
+        """Monta o índice só a partir das palavras-chave já gravadas em analyzed_data"""
+        from .models import Material
+
+        documents = {}
+        rows = Material.objects.filter(analyzed_data__has_key=FEATURES_KEY).values_list(
+            'id', f'analyzed_data__{FEATURES_KEY}__keywords'
+        )
+        for material_id, keywords in rows.iterator(chunk_size=2000):
+            if keywords:
+                documents[material_id] = keywords
+        return cls(documents)
+
+    @classmethod
+    def get(cls):
+        """
+        Índice em cache, reconstruído só quando palavras-chave mudam
+
+        Alterações em estoque, categoria, laboratório etc. não invalidam o
+        índice: apenas invalidate_index (nome/descrição alterados ou material
+        removido).
+        """
+        return CacheManager.get_or_compute(INDEX_CACHE, compute=cls.build)
+
+    def similar_to(self, material_id, limit=5, min_similarity=MIN_SIMILARITY):
+        """
+        Materiais mais similares a um material do índice
+
+        Returns:
+            list: (id, similaridade de 0 a 1, palavras-chave em comum), da maior para a menor
+        """
+        keywords = self.keywords.get(material_id)
+        if not keywords:
+            return []
+
+        scores = defaultdict(float)
+        for keyword in keywords:
+            weight = self.idf[keyword] ** 2
+            for other_id in self.postings[keyword]:
+                scores[other_id] += weight
+        scores.pop(material_id, None)
+
+        norm = self.norms[material_id]
+        ranked = []
+        for other_id, score in scores.items():
+            similarity = score / (norm * self.norms[other_id])
+            if similarity >= min_similarity:
+                ranked.append((similarity, other_id))
+        ranked.sort(key=lambda pair: (-pair[0], pair[1]))
+
+        return [
+            (other_id, similarity, sorted(keywords & self.keywords[other_id]))
+            for similarity, other_id in ranked[:limit]
+        ]
+
+    def top_keywords(self, limit=20):
+        """Palavras-chave presentes em mais materiais: [(palavra, quantidade)]"""
+        counts = sorted(
+            ((keyword, len(material_ids)) for keyword, material_ids in self.postings.items()),
+            key=lambda pair: (-pair[1], pair[0])
+        )
+        return counts[:limit]
@@ -102,10 +102,12 @@ urlpatterns = [
     path('ai/duplicates/', ai_views.ai_duplicate_detector, name='ai_duplicate_detector'),
     path('ai/suggestions/', ai_views.ai_smart_suggestions, name='ai_smart_suggestions'),
     path('ai/batch/', ai_views.ai_batch_processor, name='ai_batch_processor'),
+    path('ai/jobs/<int:job_id>/', ai_views.ai_job_detail, name='ai_job_detail'),
 
     # APIs para IA
     path('ai/api/preview/', ai_views.ai_preview_organization, name='ai_preview_organization'),
     path('ai/api/categorize/', ai_views.ai_apply_categorization, name='ai_apply_categorization'),
     path('ai/api/merge/', ai_views.ai_merge_duplicates, name='ai_merge_duplicates'),
+    path('ai/api/jobs/<int:job_id>/', ai_views.ai_job_status_api, name='ai_job_status'),
 ]
 
@@ -8,15 +8,14 @@ from django.db.models import Q
 from accounts.views import is_technician, is_professor
 from .models import Material, MaterialCategory
 from .forms import MaterialForm, MaterialCategoryForm, ImportMaterialsForm
+from .bulk_import import MaterialBulkImporter, MaterialImportError
+from .similarity import FEATURES_KEY, MaterialSimilarityIndex, features_from_analysis, material_text
 from laboratories.models import Laboratory
+import logging
 
-# Importações condicionais para funcionalidades de importação
-# Temporariamente desabilitado devido a erro de importação
-pd = None
-# try:
-#     import pandas as pd
-# except ImportError:
-#     pd = None
+logger = logging.getLogger(__name__)
+
+# O pandas da importação é carregado sob demanda em bulk_import.load_pandas()
 
 try:
     import openpyxl
@@ -25,12 +24,11 @@ except ImportError:
     openpyxl = None
     Font = Alignment = PatternFill = None
 import csv
-import io
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 import json
-from .services import DoclingService
+from .services import get_docling_service
 from django.conf import settings
 from django.core.paginator import Paginator
 from django.contrib import messages
@@ -43,7 +41,7 @@ import os
 import tempfile
 
 
-docling_service = DoclingService() if getattr(settings, 'DOCLING_ENABLED', False) else None
+docling_service = get_docling_service() if getattr(settings, 'DOCLING_ENABLED', False) else None
 
 
 @login_required
@@ -265,7 +263,7 @@ def category_delete(request, pk):
 @login_required
 @user_passes_test(is_technician)
 def import_materials(request):
-    """Importar materiais em lote - VERSÃO FINAL CORRIGIDA"""
+    """Importar materiais em lote (ver MaterialBulkImporter)"""
     
     if request.method == 'POST':
         form = ImportMaterialsForm(request.POST, request.FILES)
@@ -273,309 +271,45 @@ def import_materials(request):
             file = request.FILES['file']
             
             # Opções de importação
-            create_missing_categories = request.POST.get('create_missing_categories', False)
-            create_missing_labs = request.POST.get('create_missing_labs', False)
-            update_existing = request.POST.get('update_existing', False)
-            skip_errors = request.POST.get('skip_errors', False)
+            importer = MaterialBulkImporter(
+                create_missing_categories=bool(request.POST.get('create_missing_categories', False)),
+                create_missing_labs=bool(request.POST.get('create_missing_labs', False)),
+                update_existing=bool(request.POST.get('update_existing', False)),
+                skip_errors=bool(request.POST.get('skip_errors', False)),
+            )
             
             try:
-                # Verificar se pandas está disponível
-                if pd is None:
-                    messages.error(request, 'Funcionalidade de importação não disponível. Entre em contato com o administrador.')
-                    return redirect('import_materials')
-                
-                # Ler arquivo baseado na extensão
-                if file.name.endswith('.csv'):
-                    df = pd.read_csv(file)
-                elif file.name.endswith(('.xlsx', '.xls')):
-                    df = pd.read_excel(file)
-                else:
-                    messages.error(request, 'Formato de arquivo não suportado.')
-                    return redirect('import_materials')
-                
-                # Debug: mostrar estrutura inicial
-                print(f"DEBUG: Arquivo carregado com {len(df)} linhas")
-                print(f"DEBUG: Colunas encontradas: {list(df.columns)}")
-                if len(df) > 0:
-                    print(f"DEBUG: Primeira linha: {df.iloc[0].tolist()}")
-                if len(df) > 1:
-                    print(f"DEBUG: Segunda linha: {df.iloc[1].tolist()}")
-                
-                # Verificar se a segunda linha contém cabeçalhos em português (linha de exemplo)
-                if len(df) > 1:
-                    second_row = df.iloc[1]
-                    # Verificar se a segunda linha parece ser uma linha de exemplo/cabeçalho
-                    if (pd.notna(second_row.iloc[0]) and 
-                        isinstance(second_row.iloc[0], str) and 
-                        ('Nome do Material' in str(second_row.iloc[0]) or 
-                         'Descrição' in str(second_row.iloc[1]) if len(second_row) > 1 else False)):
-                        print("DEBUG: Removendo linha de exemplo (linha 2)")
-                        df = df.drop(df.index[1]).reset_index(drop=True)
-                
-                # Mapeamento de colunas (suporte a inglês e português)
-                column_mapping = {
-                    'nome': ['nome', 'name', 'material', 'NAME'],
-                    'categoria': ['categoria', 'category', 'CATEGORY'],
-                    'laboratorio': ['laboratorio', 'laboratório', 'laboratory', 'lab', 'LABORATORY'],
-                    'quantidade': ['quantidade', 'quantity', 'qty', 'QUANTITY'],
-                    'estoque_minimo': ['estoque_minimo', 'estoque_mínimo', 'minimum_stock', 'min_stock', 'MINIMUM_STOCK'],
-                    'descricao': ['descricao', 'descrição', 'description', 'DESCRIPTION']
-                }
-                
-                # Mapear colunas do arquivo
-                df_columns = list(df.columns)
-                mapped_columns = {}
-                
-                for standard_col, variations in column_mapping.items():
-                    for variation in variations:
-                        if variation in df_columns:
-                            mapped_columns[standard_col] = variation
-                            break
-                
-                print(f"DEBUG: Mapeamento de colunas: {mapped_columns}")
-                
-                # Verificar colunas obrigatórias
-                required_columns = ['nome', 'categoria', 'laboratorio', 'quantidade', 'estoque_minimo']
-                missing_cols = [col for col in required_columns if col not in mapped_columns]
-                
-                if missing_cols:
-                    messages.error(request, f'Colunas obrigatórias não encontradas: {", ".join(missing_cols)}')
-                    messages.error(request, f'Colunas disponíveis: {", ".join(df_columns)}')
-                    return redirect('import_materials')
-                
-                # Renomear colunas para padronizar
-                rename_dict = {v: k for k, v in mapped_columns.items()}
-                df = df.rename(columns=rename_dict)
-                
-                print(f"DEBUG: Dados após renomeação: {df.columns.tolist()}")
-                
-                # Estatísticas
-                imported_count = 0
-                updated_count = 0
-                skipped_count = 0
-                errors = []
-                
-                # Processar cada linha
-                # 🚀 OTIMIZADO: Importação em lote com bulk operations
-                
-                # 1. Preparar caches para categorias e laboratórios existentes
-                existing_categories = {cat.name.lower(): cat for cat in MaterialCategory.objects.all()}
-                existing_labs = {lab.name.lower(): lab for lab in Laboratory.objects.all()}
-                
-                # 2. Coletar dados válidos para bulk operations
-                materials_to_create = []
-                materials_to_update = []
-                categories_to_create = []
-                labs_to_create = []
-                
-                for idx, row in df.iterrows():
-                    try:
-                        # Pular linhas vazias
-                        if pd.isna(row.get('nome')) or str(row.get('nome')).strip() == '':
-                            skipped_count += 1
-                            continue
-                        
-                        # Extrair e validar dados
-                        nome = str(row['nome']).strip()
-                        categoria_nome = str(row['categoria']).strip()
-                        laboratorio_nome = str(row['laboratorio']).strip()
-                        
-                        # Validar quantidade
-                        try:
-                            quantidade = int(float(row['quantidade']))
-                            if quantidade < 0:
-                                raise ValueError("Quantidade não pode ser negativa")
-                        except (ValueError, TypeError):
-                            error_msg = f"Linha {idx + 1}: Quantidade inválida - {row['quantidade']}"
-                            errors.append(error_msg)
-                            if not skip_errors:
-                                continue
-                            quantidade = 0
-                        
-                        # Validar estoque mínimo
-                        try:
-                            estoque_minimo = int(float(row['estoque_minimo']))
-                            if estoque_minimo < 1:
-                                estoque_minimo = 1
-                        except (ValueError, TypeError):
-                            error_msg = f"Linha {idx + 1}: Estoque mínimo inválido - {row['estoque_minimo']}"
-                            errors.append(error_msg)
-                            if not skip_errors:
-                                continue
-                            estoque_minimo = 1
-                        
-                        # Descrição opcional
-                        descricao = ''
-                        if 'descricao' in row and pd.notna(row['descricao']):
-                            descricao = str(row['descricao']).strip()
-                        
-                        # Preparar categoria
-                        categoria = existing_categories.get(categoria_nome.lower())
-                        if not categoria:
-                            if create_missing_categories:
-                                categoria = MaterialCategory(name=categoria_nome, material_type='consumable')
-                                categories_to_create.append(categoria)
-                                existing_categories[categoria_nome.lower()] = categoria
-                            else:
-                                error_msg = f"Linha {idx + 1}: Categoria '{categoria_nome}' não encontrada"
-                                errors.append(error_msg)
-                                if not skip_errors:
-                                    continue
-                        
-                        # Preparar laboratório
-                        laboratorio = existing_labs.get(laboratorio_nome.lower())
-                        if not laboratorio:
-                            if create_missing_labs:
-                                laboratorio = Laboratory(
-                                    name=laboratorio_nome,
-                                    location=f"Localização {laboratorio_nome}",
-                                    capacity=30,
-                                    is_active=True
-                                )
-                                labs_to_create.append(laboratorio)
-                                existing_labs[laboratorio_nome.lower()] = laboratorio
-                            else:
-                                error_msg = f"Linha {idx + 1}: Laboratório '{laboratorio_nome}' não encontrado"
-                                errors.append(error_msg)
-                                if not skip_errors:
-                                    continue
-                        
-                        # Preparar material para criação em lote
-                        if categoria and laboratorio:
-                            material_data = {
-                                'nome': nome,
-                                'categoria': categoria,
-                                'laboratorio': laboratorio,
-                                'descricao': descricao,
-                                'quantidade': quantidade,
-                                'estoque_minimo': estoque_minimo,
-                                'linha': idx + 1
-                            }
-                            materials_to_create.append(material_data)
-                        else:
-                            skipped_count += 1
-                            
-                    except Exception as e:
-                        error_msg = f"Linha {idx + 1}: Erro inesperado - {str(e)}"
-                        errors.append(error_msg)
-                        if not skip_errors:
-                            continue
-                
-                # 3. Executar bulk operations
-                try:
-                    # Criar categorias em lote
-                    if categories_to_create:
-                        MaterialCategory.objects.bulk_create(categories_to_create, batch_size=100)
-                        print(f"DEBUG: {len(categories_to_create)} categorias criadas em lote")
-                    
-                    # Criar laboratórios em lote
-                    if labs_to_create:
-                        Laboratory.objects.bulk_create(labs_to_create, batch_size=100)
-                        print(f"DEBUG: {len(labs_to_create)} laboratórios criados em lote")
-                    
-                    # Atualizar referências para objetos criados
-                    if categories_to_create or labs_to_create:
-                        existing_categories = {cat.name.lower(): cat for cat in MaterialCategory.objects.all()}
-                        existing_labs = {lab.name.lower(): lab for lab in Laboratory.objects.all()}
-                    
-                    # Preparar materiais para bulk_create
-                    final_materials = []
-                    for material_data in materials_to_create:
-                        try:
-                            categoria = existing_categories.get(material_data['categoria'].name.lower())
-                            laboratorio = existing_labs.get(material_data['laboratorio'].name.lower())
-                            
-                            if categoria and laboratorio:
-                                if update_existing:
-                                    # Para update_existing, usar get_or_create individual (mais lento mas necessário)
-                                    material, created = Material.objects.update_or_create(
-                                        name=material_data['nome'],
-                                        laboratory=laboratorio,
-                                        defaults={
-                                            'category': categoria,
-                                            'description': material_data['descricao'],
-                                            'quantity': material_data['quantidade'],
-                                            'minimum_stock': material_data['estoque_minimo'],
-                                        }
-                                    )
-                                    if created:
-                                        imported_count += 1
-                                        print(f"DEBUG: Material criado: {material.name}")
-                                    else:
-                                        updated_count += 1
-                                        print(f"DEBUG: Material atualizado: {material.name}")
-                                else:
-                                    # Para bulk_create (modo mais rápido)
-                                    material = Material(
-                                        name=material_data['nome'],
-                                        category=categoria,
-                                        description=material_data['descricao'],
-                                        quantity=material_data['quantidade'],
-                                        minimum_stock=material_data['estoque_minimo'],
-                                        laboratory=laboratorio,
-                                    )
-                                    final_materials.append(material)
-                            else:
-                                error_msg = f"Linha {material_data['linha']}: Erro ao encontrar categoria ou laboratório"
-                                errors.append(error_msg)
-                                
-                        except Exception as e:
-                            error_msg = f"Linha {material_data['linha']}: Erro ao processar material - {str(e)}"
-                            errors.append(error_msg)
-                    
-                    # 4. Executar bulk_create para novos materiais
-                    if final_materials and not update_existing:
-                        try:
-                            # Bulk create em lotes para melhor performance
-                            batch_size = 100
-                            for i in range(0, len(final_materials), batch_size):
-                                batch = final_materials[i:i + batch_size]
-                                Material.objects.bulk_create(batch, batch_size=batch_size, ignore_conflicts=True)
-                                imported_count += len(batch)
-                                print(f"DEBUG: Lote de {len(batch)} materiais criados")
-                        except Exception as e:
-                            error_msg = f"Erro durante bulk_create: {str(e)}"
-                            errors.append(error_msg)
-                            print(f"DEBUG: {error_msg}")
-                    
-                except Exception as e:
-                    error_msg = f"Erro durante bulk operations: {str(e)}"
-                    errors.append(error_msg)
-                    print(f"DEBUG: {error_msg}")
-                    
-                # CONTINUAR COM O RESTO DA FUNÇÃO ORIGINAL...
-                
-                # Mostrar resultados
-                print(f"DEBUG: Resultado final - Importados: {imported_count}, Atualizados: {updated_count}, Pulados: {skipped_count}, Erros: {len(errors)}")
-                
-                success_messages = []
-                if imported_count > 0:
-                    success_messages.append(f"{imported_count} materiais importados")
-                if updated_count > 0:
-                    success_messages.append(f"{updated_count} materiais atualizados")
-                
-                if success_messages:
-                    messages.success(request, f"Importação concluída: {', '.join(success_messages)}.")
-                
-                if skipped_count > 0:
-                    messages.warning(request, f"{skipped_count} linhas foram ignoradas.")
-                
-                if errors:
-                    messages.error(request, f"Encontrados {len(errors)} erros:")
-                    for error in errors[:5]:  # Mostrar apenas os primeiros 5 erros
-                        messages.error(request, error)
-                    if len(errors) > 5:
-                        messages.error(request, f"... e mais {len(errors) - 5} erros.")
-                
-                return redirect('material_list')
-                
+                result = importer.run(file)
+            except MaterialImportError as e:
+                messages.error(request, str(e))
+                return redirect('import_materials')
             except Exception as e:
-                error_msg = f'Erro ao processar arquivo: {str(e)}'
-                messages.error(request, error_msg)
-                print(f"DEBUG: {error_msg}")
-                import traceback
-                traceback.print_exc()
+                logger.exception(f"Erro ao importar materiais de {file.name}")
+                messages.error(request, f'Erro ao processar arquivo: {str(e)}')
                 return redirect('import_materials')
+            
+            # Mostrar resultados
+            success_messages = []
+            if result['imported'] > 0:
+                success_messages.append(f"{result['imported']} materiais importados")
+            if result['updated'] > 0:
+                success_messages.append(f"{result['updated']} materiais atualizados")
+            
+            if success_messages:
+                messages.success(request, f"Importação concluída: {', '.join(success_messages)}.")
+            
+            if result['skipped'] > 0:
+                messages.warning(request, f"{result['skipped']} linhas foram ignoradas.")
+            
+            errors = result['errors']
+            if errors:
+                messages.error(request, f"Encontrados {len(errors)} erros:")
+                for error in errors[:5]:  # Mostrar apenas os primeiros 5 erros
+                    messages.error(request, error)
+                if len(errors) > 5:
+                    messages.error(request, f"... e mais {len(errors) - 5} erros.")
+            
+            return redirect('material_list')
     
     else:
         form = ImportMaterialsForm()
@@ -593,58 +327,105 @@ def import_materials(request):
     
     return render(request, 'import_materials.html', context)
 
+# Cabeçalhos da exportação de materiais
+MATERIAL_EXPORT_HEADERS = [
+    'Nome', 'Categoria', 'Tipo', 'Descrição',
+    'Quantidade', 'Estoque Mínimo', 'Laboratório', 'Status'
+]
+
+# Linhas lidas do banco por vez durante a exportação
+MATERIAL_EXPORT_CHUNK_SIZE = 2000
+
+# Acima deste tamanho o arquivo Excel temporário vai para o disco
+MATERIAL_EXPORT_SPOOL_SIZE = 5 * 1024 * 1024
+
+
+def _iter_material_export_rows(request):
+    """
+    Gera as linhas da exportação de materiais sem carregar o queryset inteiro
+
+    Lê apenas as colunas exportadas via values_list().iterator(), em blocos de
+    MATERIAL_EXPORT_CHUNK_SIZE linhas.
+    """
+    materials = Material.objects.all()
+    if request.GET.get('stock_status') == 'low':
+        materials = materials.filter(quantity__lt=models.F('minimum_stock'))
+
+    type_display = dict(MaterialCategory.CATEGORY_TYPES)
+    rows = materials.order_by('name', 'id').values_list(
+        'name', 'category__name', 'category__material_type', 'description',
+        'quantity', 'minimum_stock', 'laboratory__name'
+    ).iterator(chunk_size=MATERIAL_EXPORT_CHUNK_SIZE)
+
+    for name, category, material_type, description, quantity, minimum_stock, laboratory in rows:
+        stock_status = 'Estoque Baixo' if quantity < minimum_stock else 'OK'
+        yield [
+            name, category, type_display.get(material_type, material_type), description,
+            quantity, minimum_stock, laboratory, stock_status
+        ]
+
+
+class _Echo:
+    """Pseudo-buffer para o csv.writer: devolve a linha em vez de guardá-la"""
+
+    def write(self, value):
+        return value
+
+
 @login_required
 @user_passes_test(is_technician)
 def export_materials(request):
-    """Exportar materiais para Excel"""
-    materials = Material.objects.select_related('category', 'laboratory').all()
-    
+    """Exportar materiais para Excel (workbook write-only gravado em arquivo temporário)"""
     # Verificar se openpyxl está disponível
-    if openpyxl is None:
+    if openpyxl is None or request.GET.get('format') == 'csv':
         # Fallback para CSV
         return export_materials_csv(request)
-    
-    # Criar workbook
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = 'Materiais'
-    
+
+    from openpyxl.cell import WriteOnlyCell
+
+    # Workbook write-only: as linhas vão direto para o arquivo, sem objetos de célula em memória
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Materiais')
+
     # Cabeçalhos
-    headers = [
-        'Nome', 'Categoria', 'Tipo', 'Descrição', 
-        'Quantidade', 'Estoque Mínimo', 'Laboratório', 'Status'
-    ]
-    
-    for col_num, header in enumerate(headers, 1):
-        cell = worksheet.cell(row=1, column=col_num)
-        cell.value = header
+    header_cells = []
+    for header in MATERIAL_EXPORT_HEADERS:
+        cell = WriteOnlyCell(worksheet, value=header)
         cell.font = Font(bold=True)
-    
+        header_cells.append(cell)
+    worksheet.append(header_cells)
+
     # Adicionar dados
-    for row_num, material in enumerate(materials, 2):
-        worksheet.cell(row=row_num, column=1).value = material.name
-        worksheet.cell(row=row_num, column=2).value = material.category.name
-        worksheet.cell(row=row_num, column=3).value = material.category.get_material_type_display()
-        worksheet.cell(row=row_num, column=4).value = material.description
-        worksheet.cell(row=row_num, column=5).value = material.quantity
-        worksheet.cell(row=row_num, column=6).value = material.minimum_stock
-        worksheet.cell(row=row_num, column=7).value = material.laboratory.name
-        
-        stock_status = 'Estoque Baixo' if material.is_low_stock else 'OK'
-        worksheet.cell(row=row_num, column=8).value = stock_status
-    
-    # Salvar em BytesIO
-    output = io.BytesIO()
+    for row in _iter_material_export_rows(request):
+        worksheet.append(row)
+
+    # O arquivo só fica em memória enquanto for pequeno; depois vai para o disco
+    output = tempfile.SpooledTemporaryFile(max_size=MATERIAL_EXPORT_SPOOL_SIZE)
     workbook.save(output)
     output.seek(0)
-    
-    # Criar resposta
-    response = HttpResponse(
-        output.read(),
+
+    # FileResponse envia o arquivo em blocos e o fecha ao final
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename='materiais_labconnect.xlsx',
         content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     )
-    response['Content-Disposition'] = 'attachment; filename=materiais_labconnect.xlsx'
-    
+
+
+@login_required
+@user_passes_test(is_technician)
+def export_materials_csv(request):
+    """Exportar materiais para CSV em streaming (cada linha é enviada assim que lida)"""
+    writer = csv.writer(_Echo())
+
+    def stream():
+        yield writer.writerow(MATERIAL_EXPORT_HEADERS)
+        for row in _iter_material_export_rows(request):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename=materiais_labconnect.csv'
     return response
 
 @require_POST
@@ -835,18 +616,29 @@ def analyze_materials_batch(request):
         # Análise em lote
         batch_size = int(request.POST.get('batch_size', 50))
         
-        materials = Material.objects.filter(
-            analyzed_data__isnull=True
-        )[:batch_size]
+        materials = [
+            material for material in Material.objects.filter(analyzed_data__isnull=True)[:batch_size]
+            if material.description
+        ]
+        
+        # Analisar em lote (nlp.pipe + cache por conteúdo): descrições e textos das
+        # palavras-chave de similaridade no mesmo lote, para o save não chamar o spaCy
+        feature_texts = [material_text(material.name, material.description) for material in materials]
+        analyses = docling_service.analyze_texts(
+            [material.description for material in materials] + feature_texts
+        )
+        feature_analyses = analyses[len(materials):]
+        categories = docling_service.categorize_many((material.description, '') for material in materials)
         
         analyzed_count = 0
-        for material in materials:
-            if material.description:
-                # Analisar
-                material.analyzed_data = docling_service.analyze_text(material.description)
-                material.suggested_category = docling_service.categorize_material(material.description)
-                material.save()
-                analyzed_count += 1
+        for material, analysis, feature_text, feature_analysis, category in zip(
+            materials, analyses, feature_texts, feature_analyses, categories
+        ):
+            material.analyzed_data = analysis
+            material.analyzed_data[FEATURES_KEY] = features_from_analysis(feature_text, feature_analysis)
+            material.suggested_category = category
+            material.save()
+            analyzed_count += 1
         
         if analyzed_count > 0:
             messages.success(request, f'{analyzed_count} materiais foram analisados com sucesso.')
@@ -917,61 +709,27 @@ def material_trends(request):
         count=Count('id')
     ).order_by('-count')
 
-    # Extrair palavras-chave comuns
-    common_keywords = {}
-    materials_with_keywords = Material.objects.exclude(
-        analyzed_data__isnull=True
-    )[:100]  # Limitar para não sobrecarregar
-
-    for material in materials_with_keywords:
-        if material.analyzed_data and 'keywords' in material.analyzed_data:
-            for keyword in material.analyzed_data['keywords']:
-                if keyword in common_keywords:
-                    common_keywords[keyword] += 1
-                else:
-                    common_keywords[keyword] = 1
-
-    # Ordenar as palavras-chave pela frequência
-    sorted_keywords = sorted(common_keywords.items(), key=lambda x: x[1], reverse=True)[:20]
+    # Palavras-chave comuns e materiais similares vêm do índice de similaridade
+    similarity_index = MaterialSimilarityIndex.get()
+    sorted_keywords = similarity_index.top_keywords(20)
 
     # Encontrar materiais similares
     if 'material_id' in request.GET:
         try:
             material_id = int(request.GET['material_id'])
-            source_material = Material.objects.get(id=material_id)
-
-            if source_material.analyzed_data and 'keywords' in source_material.analyzed_data:
-                source_keywords = set(source_material.analyzed_data['keywords'])
-
-                # Encontrar materiais com palavras-chave em comum
-                other_materials = Material.objects.exclude(id=material_id).exclude(
-                    analyzed_data__isnull=True
-                )[:50]  # Limitar para desempenho
-
-                for material in other_materials:
-                    if material.analyzed_data and 'keywords' in material.analyzed_data:
-                        material_keywords = set(material.analyzed_data['keywords'])
-                        common = source_keywords.intersection(material_keywords)
-
-                        if len(common) > 0:
-                            similarity = len(common) / max(len(source_keywords), len(material_keywords))
-
-                            similar_materials.append({
-                                'material': material,
-                                'similarity': similarity,
-                                'common_keywords': list(common)
-                            })
-
-                # Adicionar materiais para o formulário de materiais similares
-                materials_with_analysis = Material.objects.exclude(
-                    analyzed_data__isnull=True
-                ).values('id', 'name')[:100]  # Limitar para desempenho
-
-                # Ordenar por similaridade
-                similar_materials = sorted(similar_materials, key=lambda x: x['similarity'], reverse=True)[:5]
-        except Exception as e:
-            # Adicione um log de erro ou tratamento de exceção mais específico
-            print(f"Erro ao processar materiais similares: {e}")
+            matches = similarity_index.similar_to(material_id, limit=5)
+            materials = Material.objects.in_bulk([other_id for other_id, _, _ in matches])
+            similar_materials = [
+                {
+                    'material': materials[other_id],
+                    'similarity': similarity,
+                    'common_keywords': common_keywords
+                }
+                for other_id, similarity, common_keywords in matches
+                if other_id in materials
+            ]
+        except ValueError:
+            logger.warning(f"material_id inválido em material_trends: {request.GET['material_id']}")
 
     context = {
         'analyzed_count': analyzed_count,
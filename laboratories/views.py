@@ -7,6 +7,7 @@ from laboratories.models import Laboratory
 from .forms import LaboratoryForm
 from inventory.models import Material
 from scheduling.models import ScheduleRequest
+from scheduling.availability import AvailabilityMatrix, MIN_FREE_MINUTES
 from django.utils import timezone
 from datetime import timedelta
 
@@ -23,52 +24,34 @@ def laboratory_list(request):
         # Check if today is a scheduling day (Thursday or Friday)
         is_scheduling_day = today.weekday() in [3, 4]
         
-        # Get approved schedules for next week
-        next_week_schedules = ScheduleRequest.objects.filter(
-            scheduled_date__range=[next_week_start, next_week_end],
-            status='approved'
-        )
+        # Approved bookings of next week for every lab, loaded in a single query
+        laboratories = list(laboratories)
+        matrix = AvailabilityMatrix.get(next_week_start, next_week_end)
+        has_free_window = matrix.has_free_window(MIN_FREE_MINUTES)
         
         # Create a dict with lab availability
         lab_availability = {}
         
         for lab in laboratories:
-            # Get schedules for this lab
-            lab_schedules = next_week_schedules.filter(laboratory=lab)
+            daily_availability = []
             
-            # Create a dict for each day
-            daily_availability = {}
-            
-            for i in range(5):  # Monday to Friday
-                day = next_week_start + timedelta(days=i)
-                day_name = day.strftime('%A')
-                
-                # Get schedules for this day
-                day_schedules = lab_schedules.filter(scheduled_date=day)
-                
-                if day_schedules.exists():
-                    # Lab has some bookings this day
-                    time_slots = []
-                    for schedule in day_schedules:
-                        time_slots.append({
-                            'start': schedule.start_time,
-                            'end': schedule.end_time,
-                            'professor': schedule.professor.get_full_name()
-                        })
-                    
-                    daily_availability[day_name] = {
-                        'date': day,
-                        'available': True,  # Some time slots might still be available
-                        'time_slots': time_slots
-                    }
+            for day in matrix.dates:
+                busy = matrix.windows(lab.id, day, free=False)
+                if not busy:
+                    status = 'available'
+                elif matrix.cell(has_free_window, lab.id, day):
+                    status = 'partial'  # Some time slots are still available
                 else:
-                    # Lab is fully available this day
-                    daily_availability[day_name] = {
-                        'date': day,
-                        'available': True,
-                        'time_slots': []
-                    }
+                    status = 'full'
+                
+                daily_availability.append({
+                    'date': day,
+                    'available': status != 'full',
+                    'status': status,
+                    'time_slots': [{'start': start, 'end': end} for start, end in busy]
+                })
             
+            lab.week_availability = daily_availability
             lab_availability[lab.id] = daily_availability
         
         context = {
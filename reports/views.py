@@ -7,13 +7,14 @@ from django.http import HttpResponse
 from django.utils import timezone
 from django.core.cache import cache
 from django.db.models import Count, Sum, Avg, F, Q
+from django.db.models.functions import ExtractIsoWeekDay
 from django.template.loader import render_to_string
 from accounts.views import is_technician
 from .forms import ReportFilterForm
 from .models import Report
 from laboratories.models import Laboratory
 from inventory.models import Material, MaterialCategory
-from scheduling.models import ScheduleRequest
+from scheduling.models import LabDailyUsage, ScheduleRequest
 from accounts.models import User
 # Importações condicionais para relatórios avançados
 try:
@@ -165,25 +166,38 @@ def scheduling_report(request, report_id, format='pdf'):
     # Get data
     schedule_data = query.order_by('scheduled_date', 'start_time')
     
+    # Contagens agregadas a partir do rollup diário (LabDailyUsage)
+    usage = LabDailyUsage.objects.filter(date__range=[date_start, date_end])
+    if laboratory_id:
+        usage = usage.filter(laboratory_id=laboratory_id)
+    
     # Prepare statistics - INCLUINDO DIFERENCIAÇÃO DE AGENDAMENTOS DE EXCEÇÃO
-    total_requests = schedule_data.count()
-    approved_requests = schedule_data.filter(status='approved').count()
-    rejected_requests = schedule_data.filter(status='rejected').count()
-    pending_requests = schedule_data.filter(status='pending').count()
+    totals = usage.aggregate(
+        total=Sum('request_count'),
+        approved=Sum('request_count', filter=Q(status='approved')),
+        rejected=Sum('request_count', filter=Q(status='rejected')),
+        pending=Sum('request_count', filter=Q(status='pending')),
+        exception=Sum('request_count', filter=Q(is_exception=True)),
+        normal=Sum('request_count', filter=Q(is_exception=False)),
+    )
+    total_requests = totals['total'] or 0
+    approved_requests = totals['approved'] or 0
+    rejected_requests = totals['rejected'] or 0
+    pending_requests = totals['pending'] or 0
     
     # Estatísticas de agendamentos de exceção
-    exception_requests = schedule_data.filter(is_exception=True).count()
-    normal_requests = schedule_data.filter(is_exception=False).count()
+    exception_requests = totals['exception'] or 0
+    normal_requests = totals['normal'] or 0
     
     # Separação por tipo de agendamento
     exception_data = schedule_data.filter(is_exception=True).order_by('scheduled_date', 'start_time')
     normal_data = schedule_data.filter(is_exception=False).order_by('scheduled_date', 'start_time')
     
     # Labs usage statistics - SEPARANDO NORMAL E EXCEÇÃO
-    lab_usage = schedule_data.filter(status='approved').values('laboratory__name').annotate(
-        count=Count('id'),
-        exception_count=Count('id', filter=Q(is_exception=True)),
-        normal_count=Count('id', filter=Q(is_exception=False))
+    lab_usage = usage.filter(status='approved').values('laboratory__name').annotate(
+        count=Sum('request_count'),
+        exception_count=Sum('request_count', filter=Q(is_exception=True), default=0),
+        normal_count=Sum('request_count', filter=Q(is_exception=False), default=0)
     ).order_by('-count')
     
     # Professor statistics - SEPARANDO NORMAL E EXCEÇÃO
@@ -193,19 +207,19 @@ def scheduling_report(request, report_id, format='pdf'):
         normal_count=Count('id', filter=Q(is_exception=False))
     ).order_by('-count')
     
-    # Data by weekday
-    weekday_data = schedule_data.filter(status='approved').extra(
-        select={'weekday': "EXTRACT(DOW FROM scheduled_date)"}
-    ).values('weekday').annotate(count=Count('id')).order_by('weekday')
+    # Data by weekday (ISO: 1 = segunda ... 7 = domingo)
+    weekday_data = usage.filter(status='approved').annotate(
+        weekday=ExtractIsoWeekDay('date')
+    ).values('weekday').annotate(count=Sum('request_count')).order_by('weekday')
     
     weekday_mapping = {
-        0: 'Segunda',
-        1: 'Terça',
-        2: 'Quarta',
-        3: 'Quinta',
-        4: 'Sexta',
-        5: 'Sábado',
-        6: 'Domingo'
+        1: 'Segunda',
+        2: 'Terça',
+        3: 'Quarta',
+        4: 'Quinta',
+        5: 'Sexta',
+        6: 'Sábado',
+        7: 'Domingo'
     }
     
     weekday_data = [
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ScheduleRequest, Laboratory, DraftScheduleRequest
+from .models import ScheduleRequest, Laboratory, DraftScheduleRequest, LabDailyUsage
 import logging
 
 logger = logging.getLogger(__name__)
@@ -60,3 +60,16 @@ class ScheduleRequestAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 # Register your models here.
+
+
+@admin.register(LabDailyUsage)
+class LabDailyUsageAdmin(admin.ModelAdmin):
+    list_display = ['date', 'laboratory', 'status', 'is_exception', 'request_count', 'booked_minutes', 'updated_at']
+    list_filter = ['status', 'is_exception', 'laboratory']
+    date_hierarchy = 'date'
+    # Mantido pelos signals de ScheduleRequest; edição manual quebraria os totais
+    readonly_fields = ['laboratory', 'date', 'status', 'is_exception', 'request_count',
+                       'booked_minutes', 'student_minutes', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
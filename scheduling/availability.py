@@ -0,0 +1,407 @@
+# scheduling/availability.py
+"""
+Matriz de disponibilidade dos laboratórios (bitmap por laboratório e dia)
+
+Os agendamentos aprovados de um intervalo de datas são carregados com uma
+única query e convertidos em uma máscara de 64 bits por (laboratório, dia):
+cada bit é um slot de 15 minutos entre 07:00 e 23:00 (a mesma janela dos
+agendamentos de dia inteiro). Perguntas como "este horário está livre?" ou
+"quais laboratórios têm uma janela livre de 1 hora?" viram operações de bits
+sobre a matriz inteira; com numpy a matriz é um ndarray uint64 e as operações
+são vetorizadas, sem numpy são inteiros Python com a mesma semântica.
+"""
+import logging
+from datetime import time, timedelta
+
+from cache_manager import CacheManager
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DAY_START = time(7, 0)
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 64  # 07:00 às 23:00
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+# Menor janela livre para um laboratório contar como disponível no dia
+MIN_FREE_MINUTES = 60
+
+
+def _minutes(value):
+    return (value.hour - DAY_START.hour) * 60 + value.minute - DAY_START.minute
+
+
+def slot_floor(value):
+    return min(max(_minutes(value) // SLOT_MINUTES, 0), SLOTS_PER_DAY)
+
+
+def slot_ceil(value):
+    return min(max(-(-_minutes(value) // SLOT_MINUTES), 0), SLOTS_PER_DAY)
+
+
+def slot_time(slot):
+    """Horário de início do slot (o slot 64 é o fim da janela, 23:00)"""
+    minutes = DAY_START.hour * 60 + DAY_START.minute + slot * SLOT_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def interval_mask(start_time, end_time):
+    """
+    Máscara dos slots que [start_time, end_time) toca
+
+    Slots parcialmente cobertos entram na máscara: um agendamento das 08:10
+    ocupa o slot das 08:00, e uma consulta das 08:10 exige esse slot livre.
+    """
+    first, last = slot_floor(start_time), slot_ceil(end_time)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def slots_for_minutes(minutes):
+    return max(1, -(-minutes // SLOT_MINUTES))
+
+
+def mask_runs(mask):
+    """Sequências de bits ligados da máscara: [(primeiro slot, slot após o último)]"""
+    runs = []
+    slot = 0
+    while mask:
+        if mask & 1:
+            start = slot
+            while mask & 1:
+                mask >>= 1
+                slot += 1
+            runs.append((start, slot))
+        else:
+            # Pula de uma vez os zeros à direita
+            skip = (mask & -mask).bit_length() - 1
+            mask >>= skip
+            slot += skip
+    return runs
+
+
+class AvailabilityMatrix:
+    """Ocupação dos laboratórios (linhas) por dia (colunas) em máscaras de 64 bits"""
+
+    def __init__(self, laboratory_ids, dates, bookings=()):
+        """
+        Args:
+            laboratory_ids: ids dos laboratórios (ordem das linhas)
+            dates: datas (ordem das colunas)
+            bookings: tuplas (laboratory_id, scheduled_date, start_time, end_time)
+        """
+        self.laboratory_ids = list(laboratory_ids)
+        self.dates = list(dates)
+        self.lab_index = {laboratory_id: row for row, laboratory_id in enumerate(self.laboratory_ids)}
+        self.date_index = {day: column for column, day in enumerate(self.dates)}
+
+        rows, columns, masks = [], [], []
+        for laboratory_id, scheduled_date, start_time, end_time in bookings:
+            row = self.lab_index.get(laboratory_id)
+            column = self.date_index.get(scheduled_date)
+            if row is None or column is None or not start_time or not end_time:
+                continue
+            mask = interval_mask(start_time, end_time)
+            if mask:
+                rows.append(row)
+                columns.append(column)
+                masks.append(mask)
+
+        shape = (len(self.laboratory_ids), len(self.dates))
+        if np is not None:
+            self.occupied = np.zeros(shape, dtype=np.uint64)
+            if masks:
+                np.bitwise_or.at(self.occupied, (rows, columns), np.array(masks, dtype=np.uint64))
+        else:
+            self.occupied = [[0] * shape[1] for _ in range(shape[0])]
+            for row, column, mask in zip(rows, columns, masks):
+                self.occupied[row][column] |= mask
+
+    @staticmethod
+    def date_range(start_date, end_date):
+        return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+    @classmethod
+    def build(cls, start_date, end_date, laboratory_ids=None):
+        """Carrega os agendamentos aprovados do intervalo com uma única query"""
+        from laboratories.models import Laboratory
+        from .models import ScheduleRequest
+
+        if laboratory_ids is None:
+            laboratory_ids = Laboratory.objects.order_by('id').values_list('id', flat=True)
+        laboratory_ids = list(laboratory_ids)
+
+        bookings = ScheduleRequest.objects.filter(
+            scheduled_date__range=[start_date, end_date],
+            laboratory_id__in=laboratory_ids,
+            status='approved',
+            start_time__isnull=False,
+            end_time__isnull=False,
+        ).values_list('laboratory_id', 'scheduled_date', 'start_time', 'end_time')
+
+        return cls(laboratory_ids, cls.date_range(start_date, end_date), bookings)
+
+    @classmethod
+    def get(cls, start_date, end_date, laboratory_ids=None):
+        """Matriz em cache, invalidada por mudanças em agendamentos aprovados e laboratórios"""
+        key_labs = 'all' if laboratory_ids is None else ','.join(str(i) for i in sorted(set(laboratory_ids)))
+        return CacheManager.get_or_compute(
+            'availability_matrix', start_date, end_date, key_labs,
+            compute=lambda: cls.build(start_date, end_date, laboratory_ids),
+            tags=[CacheManager.tag('status', 'approved'), CacheManager.tag('laboratories')]
+        )
+
+    # === Consultas por célula ===
+
+    def occupied_mask(self, laboratory_id, day):
+        row = self.lab_index.get(laboratory_id)
+        column = self.date_index.get(day)
+        if row is None or column is None:
+            return 0
+        return int(self.occupied[row][column])
+
+    def is_free(self, laboratory_id, day, start_time, end_time):
+        return not self.occupied_mask(laboratory_id, day) & interval_mask(start_time, end_time)
+
+    def windows(self, laboratory_id, day, free=True, start_time=DAY_START, end_time=None, min_minutes=SLOT_MINUTES):
+        """
+        Janelas livres (ou ocupadas) do laboratório no dia
+
+        Returns:
+            list: (início, fim) em datetime.time, em ordem
+        """
+        limit = interval_mask(start_time, end_time or slot_time(SLOTS_PER_DAY))
+        mask = self.occupied_mask(laboratory_id, day)
+        mask = ((FULL_DAY ^ mask) if free else mask) & limit
+        min_slots = slots_for_minutes(min_minutes)
+        return [
+            (slot_time(first), slot_time(last))
+            for first, last in mask_runs(mask)
+            if last - first >= min_slots
+        ]
+
+    # === Consultas vetorizadas sobre a matriz ===
+
+    def _free_masks(self, start_time=None, end_time=None):
+        """Máscaras livres de todas as células, restritas à janela [start_time, end_time)"""
+        limit = interval_mask(start_time or DAY_START, end_time or slot_time(SLOTS_PER_DAY))
+        if np is not None:
+            return (self.occupied ^ np.uint64(FULL_DAY)) & np.uint64(limit)
+        return [[(FULL_DAY ^ mask) & limit for mask in row] for row in self.occupied]
+
+    @staticmethod
+    def _runs_of(masks, slots):
+        """Bits que iniciam 'slots' bits livres consecutivos (x & x>>1 & ... & x>>(n-1))"""
+        if np is not None:
+            runs = masks.copy()
+            shift = 1
+            # Duplicação do passo: log2(slots) operações em vez de slots-1
+            while shift < slots:
+                step = min(shift, slots - shift)
+                runs &= runs >> np.uint64(step)
+                shift += step
+            return runs
+
+        def row_runs(mask):
+            runs = mask
+            shift = 1
+            while shift < slots:
+                step = min(shift, slots - shift)
+                runs &= runs >> step
+                shift += step
+            return runs
+        return [[row_runs(mask) for mask in row] for row in masks]
+
+    def free_grid(self, start_time, end_time):
+        """
+        Células em que [start_time, end_time) está totalmente livre
+
+        Returns:
+            matriz booleana laboratórios x dias (ndarray com numpy, listas sem)
+        """
+        window = interval_mask(start_time, end_time)
+        if np is not None:
+            return (self.occupied & np.uint64(window)) == 0
+        return [[not mask & window for mask in row] for row in self.occupied]
+
+    def has_free_window(self, min_minutes=MIN_FREE_MINUTES, start_time=None, end_time=None):
+        """
+        Células com alguma janela livre de min_minutes dentro de [start_time, end_time)
+
+        Returns:
+            matriz booleana laboratórios x dias (ndarray com numpy, listas sem)
+        """
+        runs = self._runs_of(self._free_masks(start_time, end_time), slots_for_minutes(min_minutes))
+        if np is not None:
+            return runs != 0
+        return [[bool(mask) for mask in row] for row in runs]
+
+    def free_minutes(self, start_time=None, end_time=None):
+        """Minutos livres de cada célula dentro da janela (popcount das máscaras livres)"""
+        masks = self._free_masks(start_time, end_time)
+        if np is not None:
+            bits = np.unpackbits(masks.view(np.uint8).reshape(masks.shape + (8,)), axis=-1)
+            return bits.sum(axis=-1, dtype=np.int64) * SLOT_MINUTES
+        return [[bin(mask).count('1') * SLOT_MINUTES for mask in row] for row in masks]
+
+    def count_by_date(self, cells):
+        """Quantidade de laboratórios com a célula verdadeira em cada data"""
+        if np is not None:
+            totals = np.asarray(cells).sum(axis=0)
+            return {day: int(total) for day, total in zip(self.dates, totals)}
+        return {
+            day: sum(1 for row in cells if row[column])
+            for column, day in enumerate(self.dates)
+        }
+
+    def cell(self, cells, laboratory_id, day):
+        """Valor de uma matriz de resultados para (laboratório, dia)"""
+        row = self.lab_index.get(laboratory_id)
+        column = self.date_index.get(day)
+        if row is None or column is None:
+            return None
+        value = cells[row][column]
+        return value.item() if hasattr(value, 'item') else value
+
+
+class LabFinder:
+    """
+    Busca de laboratórios livres (capacidade, departamentos, datas e janela)
+
+    Usa dois valores em cache: os dados dos laboratórios ativos (capacidade e
+    códigos de departamento, na ordem das linhas da matriz) e a matriz de
+    ocupação do intervalo de datas. Os filtros e a verificação de janela livre
+    são operações sobre a matriz inteira; as janelas só são decodificadas para
+    as células que atendem à busca.
+    """
+
+    # Maior intervalo de datas de uma busca
+    MAX_DAYS = 31
+
+    @staticmethod
+    def load_laboratories():
+        """
+        Laboratórios ativos (sem os de estoque) com os códigos de departamento
+
+        Mesma regra de Laboratory.get_departments_codes: departamentos
+        múltiplos quando houver, senão o campo antigo.
+        """
+        from laboratories.models import Laboratory
+
+        laboratories = list(
+            Laboratory.objects.filter(is_active=True, is_storage=False)
+            .order_by('id').values('id', 'name', 'capacity', 'location', 'department')
+        )
+        codes = {}
+        rows = Laboratory.departments.through.objects.filter(
+            laboratory__is_active=True, laboratory__is_storage=False
+        ).values_list('laboratory_id', 'department__code')
+        for laboratory_id, code in rows:
+            codes.setdefault(laboratory_id, []).append(code)
+
+        for laboratory in laboratories:
+            legacy = [laboratory['department']] if laboratory['department'] else []
+            laboratory['departments'] = sorted(codes.get(laboratory['id'], legacy))
+            del laboratory['department']
+        return laboratories
+
+    @classmethod
+    def get_laboratories(cls):
+        return CacheManager.get_or_compute(
+            'laboratory_data', 'lab_finder',
+            compute=cls.load_laboratories,
+            tags=[CacheManager.tag('laboratories')]
+        )
+
+    @classmethod
+    def search(cls, dates, start_time=DAY_START, end_time=None, duration=None,
+               min_capacity=0, department_codes=None, limit=None):
+        """
+        Laboratórios com uma janela livre de 'duration' minutos em [start_time, end_time)
+
+        Args:
+            dates: datas da busca (até MAX_DAYS entre a primeira e a última)
+            start_time, end_time: janela do dia (padrão 07:00 às 23:00)
+            duration (int): minutos livres necessários (padrão: a janela inteira)
+            min_capacity (int): capacidade mínima do laboratório
+            department_codes: códigos de departamento aceitos (qualquer um)
+            limit (int): máximo de laboratórios no resultado
+
+        Returns:
+            list: laboratórios ordenados por mais dias atendidos, menor
+                capacidade suficiente e mais minutos livres na janela, cada um
+                com 'matches' ([{date, windows}]) e 'free_minutes'
+        """
+        dates = sorted(set(dates))
+        if not dates:
+            return []
+        if (dates[-1] - dates[0]).days >= cls.MAX_DAYS:
+            raise ValueError(f"Intervalo máximo de {cls.MAX_DAYS} dias")
+
+        end_time = end_time or slot_time(SLOTS_PER_DAY)
+        if interval_mask(start_time, end_time) == 0:
+            raise ValueError("Janela de horário inválida")
+        window_minutes = (slot_ceil(end_time) - slot_floor(start_time)) * SLOT_MINUTES
+        duration = min(duration or window_minutes, window_minutes)
+
+        laboratories = cls.get_laboratories()
+        department_codes = set(department_codes or ())
+        selected_rows = [
+            row for row, laboratory in enumerate(laboratories)
+            if laboratory['capacity'] >= min_capacity
+            and (not department_codes or department_codes.intersection(laboratory['departments']))
+        ]
+        if not selected_rows:
+            return []
+
+        matrix = AvailabilityMatrix.get(dates[0], dates[-1], [laboratory['id'] for laboratory in laboratories])
+        columns = [matrix.date_index[day] for day in dates]
+
+        fits = matrix.has_free_window(duration, start_time, end_time)
+        free_minutes = matrix.free_minutes(start_time, end_time)
+        if np is not None:
+            fits = fits[np.ix_(selected_rows, columns)]
+            free_minutes = free_minutes[np.ix_(selected_rows, columns)]
+            fit_days = fits.sum(axis=1).tolist()
+            free_totals = np.where(fits, free_minutes, 0).sum(axis=1).tolist()
+            fits = fits.tolist()
+        else:
+            fits = [[fits[row][column] for column in columns] for row in selected_rows]
+            free_minutes = [[free_minutes[row][column] for column in columns] for row in selected_rows]
+            fit_days = [sum(row) for row in fits]
+            free_totals = [
+                sum(minutes for fit, minutes in zip(fit_row, minutes_row) if fit)
+                for fit_row, minutes_row in zip(fits, free_minutes)
+            ]
+
+        ranked = sorted(
+            (position for position, days in enumerate(fit_days) if days),
+            key=lambda position: (
+                -fit_days[position],
+                laboratories[selected_rows[position]]['capacity'],
+                -free_totals[position],
+                laboratories[selected_rows[position]]['name'],
+            )
+        )
+        if limit:
+            ranked = ranked[:limit]
+
+        results = []
+        for position in ranked:
+            laboratory = laboratories[selected_rows[position]]
+            matches = [
+                {
+                    'date': day,
+                    'windows': matrix.windows(
+                        laboratory['id'], day, start_time=start_time, end_time=end_time, min_minutes=duration
+                    ),
+                }
+                for day, fit in zip(dates, fits[position]) if fit
+            ]
+            results.append(dict(laboratory, matches=matches, free_minutes=int(free_totals[position])))
+        return results
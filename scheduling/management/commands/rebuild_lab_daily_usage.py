@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduling.services import LabUsageRollupService
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o rollup diário de uso dos laboratórios (LabDailyUsage)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            default=None,
+            help='Reconstrói apenas a partir desta data (AAAA-MM-DD)'
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Data inválida para --since. Use o formato AAAA-MM-DD.')
+
+        self.stdout.write('📊 RECONSTRUINDO USO DIÁRIO DOS LABORATÓRIOS')
+        if since:
+            self.stdout.write(f'   📅 A partir de {since.strftime("%d/%m/%Y")}')
+
+        rows = LabUsageRollupService.rebuild(since=since)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ ROLLUP RECONSTRUÍDO: {rows} linha(s)'))
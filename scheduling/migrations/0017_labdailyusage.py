@@ -0,0 +1,75 @@
+# Generated manually for the daily laboratory usage rollup
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_lab_daily_usage(apps, schema_editor):
+    """Preenche o rollup a partir das solicitações existentes"""
+    ScheduleRequest = apps.get_model('scheduling', 'ScheduleRequest')
+    LabDailyUsage = apps.get_model('scheduling', 'LabDailyUsage')
+
+    totals = {}
+    rows = ScheduleRequest.objects.filter(
+        laboratory__isnull=False, scheduled_date__isnull=False
+    ).values_list(
+        'laboratory_id', 'scheduled_date', 'status', 'is_exception',
+        'start_time', 'end_time', 'number_of_students'
+    ).order_by().iterator(chunk_size=1000)
+
+    for laboratory_id, scheduled_date, status, is_exception, start_time, end_time, students in rows:
+        minutes = 0
+        if start_time and end_time:
+            minutes = (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+            if minutes < 0:
+                minutes += 24 * 60
+        bucket = totals.setdefault((laboratory_id, scheduled_date, status, is_exception), [0, 0, 0])
+        bucket[0] += 1
+        bucket[1] += minutes
+        bucket[2] += minutes * (students or 0)
+
+    LabDailyUsage.objects.bulk_create([
+        LabDailyUsage(
+            laboratory_id=laboratory_id,
+            date=usage_date,
+            status=status,
+            is_exception=is_exception,
+            request_count=count,
+            booked_minutes=minutes,
+            student_minutes=student_minutes,
+        )
+        for (laboratory_id, usage_date, status, is_exception), (count, minutes, student_minutes) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laboratories', '0011_laboratory_is_storage'),
+        ('scheduling', '0016_add_exception_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabDailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('approved', 'Aprovado'), ('rejected', 'Rejeitado'), ('cancelled', 'Cancelado')], max_length=15)),
+                ('is_exception', models.BooleanField(default=False)),
+                ('request_count', models.PositiveIntegerField(default=0, verbose_name='Agendamentos')),
+                ('booked_minutes', models.PositiveIntegerField(default=0, verbose_name='Minutos reservados')),
+                ('student_minutes', models.PositiveBigIntegerField(default=0, verbose_name='Aluno-minutos')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('laboratory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usage', to='laboratories.laboratory')),
+            ],
+            options={
+                'verbose_name': 'Uso Diário do Laboratório',
+                'verbose_name_plural': 'Uso Diário dos Laboratórios',
+                'ordering': ['-date', 'laboratory'],
+                'indexes': [models.Index(fields=['date', 'status'], name='lab_daily_usage_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('laboratory', 'date', 'status', 'is_exception'), name='lab_daily_usage_unique')],
+            },
+        ),
+        migrations.RunPython(populate_lab_daily_usage, migrations.RunPython.noop),
+    ]
@@ -73,6 +73,18 @@ class ScheduleRequest(models.Model):
     def __str__(self):
         return f"{self.professor.get_full_name()} - {self.laboratory.name} - {self.scheduled_date}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda laboratório/data/status carregados para invalidar o índice de conflitos e as tags de cache antigas
+        loaded = dict(zip(field_names, values))
+        instance._loaded_slot = (
+            loaded.get('laboratory_id') if loaded.get('laboratory_id') is not models.DEFERRED else None,
+            loaded.get('scheduled_date') if loaded.get('scheduled_date') is not models.DEFERRED else None,
+        )
+        instance._loaded_status = loaded.get('status') if loaded.get('status') is not models.DEFERRED else None
+        return instance
+    
     @property
     def duration(self):
         """Calcula a duração da reserva em horas"""
@@ -109,26 +121,23 @@ class ScheduleRequest(models.Model):
     
     def is_conflicting(self):
         """Verifica se há conflito de horário com outros agendamentos aprovados"""
-        # Busca agendamentos no mesmo laboratório, na mesma data, com status aprovado
-        conflicting_schedules = ScheduleRequest.objects.filter(
-            laboratory=self.laboratory,
-            scheduled_date=self.scheduled_date,
-            status='approved'
-        ).exclude(id=self.id)
+        return bool(self.get_conflicting_ids())
+    
+    def get_conflicting_ids(self):
+        """Retorna os ids dos agendamentos aprovados que se sobrepõem a este horário"""
+        from .services import ScheduleConflictIndex
         
-        # Verifica se há sobreposição de horários
-        for schedule in conflicting_schedules:
-            # Se o início da nova reserva está dentro do período de uma existente
-            if schedule.start_time <= self.start_time < schedule.end_time:
-                return True
-            # Se o término da nova reserva está dentro do período de uma existente
-            if schedule.start_time < self.end_time <= schedule.end_time:
-                return True
-            # Se a nova reserva engloba completamente uma existente
-            if self.start_time <= schedule.start_time and self.end_time >= schedule.end_time:
-                return True
+        if not (self.laboratory_id and self.scheduled_date and self.start_time and self.end_time):
+            return []
         
-        return False
+        # Consulta o índice de intervalos do laboratório/dia (cache), sem varrer os agendamentos
+        return ScheduleConflictIndex.find_conflicts(
+            self.laboratory_id,
+            self.scheduled_date,
+            self.start_time,
+            self.end_time,
+            exclude_id=self.id
+        )
     
     def get_approval_deadline(self):
         """
@@ -213,13 +222,6 @@ class ScheduleRequest(models.Model):
         
         # Log após salvar
         logger.info(f"AGENDAMENTO SALVO COM SUCESSO - ID: {self.pk}")
-        
-        # Debug adicional para verificar se está sendo salvo no DB
-        try:
-            saved_obj = ScheduleRequest.objects.get(pk=self.pk)
-            logger.info(f"CONFIRMADO NO DB - ID: {saved_obj.pk}, Status: {saved_obj.status}")
-        except ScheduleRequest.DoesNotExist:
-            logger.error(f"ERRO: Agendamento não encontrado no DB após salvar!")
 
     
 class ScheduleRequestComment(models.Model):
@@ -353,4 +355,46 @@ class FileAttachment(models.Model):
     @property
     def is_document(self):
         doc_extensions = ['doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'txt']
-        return self.get_file_extension() in doc_extensions
\ No newline at end of file
+        return self.get_file_extension() in doc_extensions
+
+class LabDailyUsage(models.Model):
+    """
+    Uso diário agregado de cada laboratório (rollup de ScheduleRequest)
+
+    Uma linha por (laboratório, data, status, exceção). Mantida pelos signals
+    de ScheduleRequest via LabUsageRollupService e reconstruível com o comando
+    rebuild_lab_daily_usage.
+    """
+    laboratory = models.ForeignKey(Laboratory, on_delete=models.CASCADE, related_name='daily_usage')
+    date = models.DateField(verbose_name="Data")
+    status = models.CharField(max_length=15, choices=ScheduleRequest.STATUS_CHOICES)
+    is_exception = models.BooleanField(default=False)
+    request_count = models.PositiveIntegerField(default=0, verbose_name="Agendamentos")
+    booked_minutes = models.PositiveIntegerField(default=0, verbose_name="Minutos reservados")
+    student_minutes = models.PositiveBigIntegerField(default=0, verbose_name="Aluno-minutos")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Uso Diário do Laboratório"
+        verbose_name_plural = "Uso Diário dos Laboratórios"
+        ordering = ['-date', 'laboratory']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['laboratory', 'date', 'status', 'is_exception'],
+                name='lab_daily_usage_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'status'], name='lab_daily_usage_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.laboratory_id} - {self.date} ({self.status}): {self.request_count}"
+
+    @property
+    def booked_hours(self):
+        return self.booked_minutes / 60
+
+    @property
+    def student_hours(self):
+        return self.student_minutes / 60
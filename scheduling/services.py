@@ -0,0 +1,667 @@
+# scheduling/services.py
+"""
+Serviços de domínio para agendamentos de laboratórios
+"""
+import bisect
+import logging
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleConflictIndex:
+    """
+    Índice de intervalos dos agendamentos aprovados por (laboratório, data).
+
+    Cada entrada do cache guarda os intervalos ordenados pelo início e o maior
+    término acumulado até cada posição. Com isso uma consulta de sobreposição
+    faz duas buscas binárias e só percorre os intervalos que realmente colidem.
+    As entradas são descartadas pelos signals de ScheduleRequest e reconstruídas
+    com uma única query na próxima consulta.
+    """
+
+    CACHE_PREFIX = 'sched_conflict_index'
+    CACHE_TTL = 60 * 60  # 1 hora
+
+    @classmethod
+    def get_cache_key(cls, laboratory_id, scheduled_date):
+        return f'{cls.CACHE_PREFIX}_{laboratory_id}_{scheduled_date}'
+
+    @staticmethod
+    def build_entry(slots):
+        """
+        Monta a entrada do índice a partir de tuplas (start_time, end_time, id)
+
+        Returns:
+            tuple: (intervalos ordenados, maior término acumulado)
+        """
+        slots = sorted(slots)
+        max_ends = []
+        current_max = None
+        for _, end_time, _ in slots:
+            if current_max is None or end_time > current_max:
+                current_max = end_time
+            max_ends.append(current_max)
+        return slots, max_ends
+
+    @classmethod
+    def get_entry(cls, laboratory_id, scheduled_date):
+        """Obtém a entrada do índice, reconstruindo-a a partir do banco se necessário"""
+        cache_key = cls.get_cache_key(laboratory_id, scheduled_date)
+        entry = cache.get(cache_key)
+
+        if entry is None:
+            from .models import ScheduleRequest
+
+            slots = ScheduleRequest.objects.filter(
+                laboratory_id=laboratory_id,
+                scheduled_date=scheduled_date,
+                status='approved',
+                start_time__isnull=False,
+                end_time__isnull=False,
+            ).values_list('start_time', 'end_time', 'id')
+
+            entry = cls.build_entry(slots)
+            cache.set(cache_key, entry, cls.CACHE_TTL)
+            logger.debug(f"Conflict index BUILD: {cache_key} ({len(entry[0])} intervalos)")
+
+        return entry
+
+    @staticmethod
+    def overlapping_ids(entry, start_time, end_time, exclude_id=None):
+        """Retorna os ids da entrada cujo intervalo se sobrepõe a [start_time, end_time)"""
+        slots, max_ends = entry
+
+        # Intervalos a partir de 'upper' começam depois do fim solicitado
+        upper = bisect.bisect_left(slots, (end_time,))
+        # Intervalos antes de 'lower' terminam antes (ou exatamente no) início solicitado
+        lower = bisect.bisect_right(max_ends, start_time, 0, upper)
+
+        return [
+            schedule_id
+            for slot_start, slot_end, schedule_id in slots[lower:upper]
+            if slot_end > start_time and schedule_id != exclude_id
+        ]
+
+    @classmethod
+    def find_conflicts(cls, laboratory_id, scheduled_date, start_time, end_time, exclude_id=None):
+        """
+        Verifica se [start_time, end_time) se sobrepõe a algum agendamento aprovado
+
+        Returns:
+            list: ids dos agendamentos aprovados em conflito
+        """
+        entry = cls.get_entry(laboratory_id, scheduled_date)
+        return cls.overlapping_ids(entry, start_time, end_time, exclude_id=exclude_id)
+
+    @classmethod
+    def get_conflicting_requests(cls, laboratory_id, scheduled_date, start_time, end_time, exclude_id=None):
+        """Retorna o queryset dos agendamentos aprovados em conflito"""
+        from .models import ScheduleRequest
+
+        conflict_ids = cls.find_conflicts(
+            laboratory_id, scheduled_date, start_time, end_time, exclude_id=exclude_id
+        )
+        if not conflict_ids:
+            return ScheduleRequest.objects.none()
+        return ScheduleRequest.objects.filter(id__in=conflict_ids).order_by('start_time')
+
+    @classmethod
+    def invalidate(cls, *slots):
+        """Remove as entradas do índice para os pares (laboratory_id, scheduled_date)"""
+        cache_keys = {
+            cls.get_cache_key(laboratory_id, scheduled_date)
+            for laboratory_id, scheduled_date in slots
+            if laboratory_id and scheduled_date
+        }
+        if cache_keys:
+            cache.delete_many(list(cache_keys))
+            logger.debug(f"Conflict index INVALIDATE: {sorted(cache_keys)}")
+
+
+class ScheduleReviewService:
+    """Aprovação e rejeição de solicitações de agendamento em lote"""
+
+    BULK_UPDATE_FIELDS = ['status', 'review_date', 'reviewed_by', 'rejection_reason']
+    MAX_BATCH_SIZE = 500
+
+    @classmethod
+    def review(cls, schedule_ids, action, reviewer, rejection_reason=''):
+        """
+        Aprova ou rejeita várias solicitações pendentes em uma única transação
+
+        As solicitações são bloqueadas com select_for_update e, na aprovação,
+        verificadas contra os agendamentos já aprovados e entre si (por ordem de
+        solicitação) usando uma única query para todos os laboratórios/dias.
+
+        Args:
+            schedule_ids: ids das solicitações
+            action (str): 'approve' ou 'reject'
+            reviewer: técnico responsável pela revisão
+            rejection_reason (str): motivo aplicado às rejeições
+
+        Returns:
+            dict: ids 'approved', 'rejected', 'skipped' e lista de 'conflicts'
+        """
+        from django.db import transaction
+        from django.utils import timezone
+        from .models import ScheduleRequest
+
+        if action not in ('approve', 'reject'):
+            raise ValueError(f"Ação inválida: {action}")
+
+        schedule_ids = list(dict.fromkeys(int(schedule_id) for schedule_id in schedule_ids))
+        if len(schedule_ids) > cls.MAX_BATCH_SIZE:
+            raise ValueError(f"Máximo de {cls.MAX_BATCH_SIZE} solicitações por lote")
+
+        result = {'approved': [], 'rejected': [], 'conflicts': [], 'skipped': []}
+        reviewed = []
+        now = timezone.now()
+
+        with transaction.atomic():
+            pending = list(
+                ScheduleRequest.objects.select_for_update(of=('self',)).filter(
+                    id__in=schedule_ids, status='pending'
+                ).select_related('professor', 'laboratory').order_by('request_date', 'id')
+            )
+            found_ids = {schedule.id for schedule in pending}
+            result['skipped'] = [schedule_id for schedule_id in schedule_ids if schedule_id not in found_ids]
+
+            if action == 'approve':
+                accepted, conflicts = cls._resolve_conflicts(pending)
+                result['conflicts'] = conflicts
+            else:
+                accepted = pending
+
+            for schedule in accepted:
+                schedule.review_date = now
+                schedule.reviewed_by = reviewer
+                if action == 'approve':
+                    schedule.status = 'approved'
+                else:
+                    schedule.status = 'rejected'
+                    if rejection_reason:
+                        schedule.rejection_reason = rejection_reason
+                reviewed.append(schedule)
+
+            if reviewed:
+                ScheduleRequest.objects.bulk_update(reviewed, cls.BULK_UPDATE_FIELDS, batch_size=100)
+
+            result['approved' if action == 'approve' else 'rejected'] = [s.id for s in reviewed]
+
+            # bulk_update não dispara signals: invalidar caches e notificar uma única vez após o commit
+            if reviewed:
+                transaction.on_commit(lambda: cls._after_commit(reviewed, action))
+
+        logger.info(
+            f"Revisão em lote ({action}) por {reviewer.id}: "
+            f"{len(reviewed)} processadas, {len(result['conflicts'])} conflitos, "
+            f"{len(result['skipped'])} ignoradas"
+        )
+        return result
+
+    @staticmethod
+    def _resolve_conflicts(pending):
+        """
+        Separa as solicitações que podem ser aprovadas das que conflitam
+
+        Returns:
+            tuple: (solicitações aceitas, lista de conflitos)
+        """
+        from django.db.models import Q
+        from functools import reduce
+        from operator import or_
+        from .models import ScheduleRequest
+
+        candidates = []
+        accepted = []
+        conflicts = []
+        for schedule in pending:
+            if schedule.laboratory_id and schedule.scheduled_date and schedule.start_time and schedule.end_time:
+                candidates.append(schedule)
+            else:
+                # Sem horário definido não há como conflitar (mesmo critério de is_conflicting)
+                accepted.append(schedule)
+
+        if not candidates:
+            return accepted, conflicts
+
+        # Uma única query com os agendamentos já aprovados de todos os laboratórios/dias envolvidos
+        slot_keys = {(schedule.laboratory_id, schedule.scheduled_date) for schedule in candidates}
+        slot_filter = reduce(or_, (
+            Q(laboratory_id=laboratory_id, scheduled_date=scheduled_date)
+            for laboratory_id, scheduled_date in slot_keys
+        ))
+        slots_by_key = {key: [] for key in slot_keys}
+        approved_rows = ScheduleRequest.objects.filter(
+            slot_filter,
+            status='approved',
+            start_time__isnull=False,
+            end_time__isnull=False,
+        ).values_list('laboratory_id', 'scheduled_date', 'start_time', 'end_time', 'id')
+        for laboratory_id, scheduled_date, start_time, end_time, schedule_id in approved_rows:
+            slots_by_key[(laboratory_id, scheduled_date)].append((start_time, end_time, schedule_id))
+
+        entries = {key: ScheduleConflictIndex.build_entry(slots) for key, slots in slots_by_key.items()}
+
+        for schedule in candidates:
+            key = (schedule.laboratory_id, schedule.scheduled_date)
+            conflicting_ids = ScheduleConflictIndex.overlapping_ids(
+                entries[key], schedule.start_time, schedule.end_time, exclude_id=schedule.id
+            )
+            if conflicting_ids:
+                conflicts.append({'id': schedule.id, 'conflicting_ids': conflicting_ids})
+                continue
+
+            # Solicitações aceitas neste lote passam a bloquear as seguintes
+            accepted.append(schedule)
+            slots_by_key[key].append((schedule.start_time, schedule.end_time, schedule.id))
+            entries[key] = ScheduleConflictIndex.build_entry(slots_by_key[key])
+
+        return accepted, conflicts
+
+    @staticmethod
+    def _after_commit(reviewed, action):
+        """Invalida caches e dispara as notificações do lote"""
+        from accounts.notifications import NotificationCounterService
+        from accounts.realtime import NotificationPushService
+        from cache_manager import CacheManager
+        from whatsapp.services import WhatsAppNotificationService
+
+        slots = {(schedule.laboratory_id, schedule.scheduled_date) for schedule in reviewed}
+        ScheduleConflictIndex.invalidate(*slots)
+        LabUsageRollupService.refresh(*slots)
+        CacheManager.invalidate_schedules(*reviewed)
+        NotificationCounterService.invalidate(
+            {schedule.professor_id for schedule in reviewed}, technicians=True
+        )
+        # Todas as solicitações do lote estavam pendentes (select_for_update com status='pending')
+        NotificationPushService.publish_schedule_changes(
+            [(schedule, 'pending', False) for schedule in reviewed]
+        )
+
+        try:
+            if action == 'approve':
+                WhatsAppNotificationService.notify_schedule_reviews(approved_requests=reviewed)
+            else:
+                WhatsAppNotificationService.notify_schedule_reviews(rejected_requests=reviewed)
+        except Exception as e:
+            logger.warning(f"Erro ao enviar notificações da revisão em lote: {str(e)}")
+
+
+class LabUsageRollupService:
+    """
+    Manutenção do rollup diário LabDailyUsage
+
+    Cada mudança em um agendamento reagrega apenas os pares (laboratório, data)
+    afetados, a partir das solicitações daquele dia. Isso mantém o rollup correto
+    mesmo com campos adiados, edições concorrentes e atualizações em lote.
+    """
+
+    ROLLUP_FIELDS = ['request_count', 'booked_minutes', 'student_minutes']
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def duration_minutes(start_time, end_time):
+        """Duração em minutos (término antes do início = dia seguinte, como em ScheduleRequest.duration)"""
+        if not start_time or not end_time:
+            return 0
+        minutes = (end_time.hour * 60 + end_time.minute) - (start_time.hour * 60 + start_time.minute)
+        if minutes < 0:
+            minutes += 24 * 60
+        return minutes
+
+    @classmethod
+    def aggregate_rows(cls, rows, totals=None):
+        """
+        Soma linhas (laboratory_id, scheduled_date, status, is_exception,
+        start_time, end_time, number_of_students) por chave do rollup
+
+        Returns:
+            dict: {(laboratory_id, date, status, is_exception): [count, minutes, student_minutes]}
+        """
+        totals = {} if totals is None else totals
+        for laboratory_id, scheduled_date, status, is_exception, start_time, end_time, students in rows:
+            minutes = cls.duration_minutes(start_time, end_time)
+            bucket = totals.setdefault((laboratory_id, scheduled_date, status, is_exception), [0, 0, 0])
+            bucket[0] += 1
+            bucket[1] += minutes
+            bucket[2] += minutes * (students or 0)
+        return totals
+
+    @classmethod
+    def _build_objects(cls, totals):
+        from .models import LabDailyUsage
+
+        return [
+            LabDailyUsage(
+                laboratory_id=laboratory_id,
+                date=usage_date,
+                status=status,
+                is_exception=is_exception,
+                request_count=count,
+                booked_minutes=minutes,
+                student_minutes=student_minutes,
+            )
+            for (laboratory_id, usage_date, status, is_exception), (count, minutes, student_minutes) in totals.items()
+        ]
+
+    @classmethod
+    def refresh(cls, *slots):
+        """Reagrega o rollup dos pares (laboratory_id, date) informados"""
+        from django.db import transaction
+        from django.db.models import Q
+        from functools import reduce
+        from operator import or_
+        from .models import LabDailyUsage, ScheduleRequest
+
+        slots = {(laboratory_id, usage_date) for laboratory_id, usage_date in slots if laboratory_id and usage_date}
+        if not slots:
+            return
+
+        request_filter = reduce(or_, (
+            Q(laboratory_id=laboratory_id, scheduled_date=usage_date) for laboratory_id, usage_date in slots
+        ))
+        usage_filter = reduce(or_, (
+            Q(laboratory_id=laboratory_id, date=usage_date) for laboratory_id, usage_date in slots
+        ))
+
+        rows = ScheduleRequest.objects.filter(request_filter).values_list(
+            'laboratory_id', 'scheduled_date', 'status', 'is_exception',
+            'start_time', 'end_time', 'number_of_students'
+        )
+        totals = cls.aggregate_rows(rows)
+
+        with transaction.atomic():
+            LabDailyUsage.objects.filter(usage_filter).delete()
+            # Upsert: outra atualização concorrente do mesmo dia pode ter inserido as mesmas chaves
+            LabDailyUsage.objects.bulk_create(
+                cls._build_objects(totals),
+                update_conflicts=True,
+                unique_fields=['laboratory', 'date', 'status', 'is_exception'],
+                update_fields=cls.ROLLUP_FIELDS,
+            )
+
+        logger.debug(f"Rollup diário atualizado: {len(slots)} laboratório(s)/dia(s), {len(totals)} linha(s)")
+
+    @classmethod
+    def rebuild(cls, since=None):
+        """
+        Reconstrói o rollup a partir de todas as solicitações (ou a partir de 'since')
+
+        Returns:
+            int: quantidade de linhas gravadas
+        """
+        from django.db import transaction
+        from .models import LabDailyUsage, ScheduleRequest
+
+        requests = ScheduleRequest.objects.filter(
+            laboratory__isnull=False, scheduled_date__isnull=False
+        )
+        usage = LabDailyUsage.objects.all()
+        if since:
+            requests = requests.filter(scheduled_date__gte=since)
+            usage = usage.filter(date__gte=since)
+
+        rows = requests.values_list(
+            'laboratory_id', 'scheduled_date', 'status', 'is_exception',
+            'start_time', 'end_time', 'number_of_students'
+        ).order_by().iterator(chunk_size=cls.BATCH_SIZE)
+        totals = cls.aggregate_rows(rows)
+
+        with transaction.atomic():
+            usage.delete()
+            LabDailyUsage.objects.bulk_create(cls._build_objects(totals), batch_size=cls.BATCH_SIZE)
+
+        logger.info(f"Rollup diário reconstruído: {len(totals)} linha(s)")
+        return len(totals)
+
+
+class CalendarEventService:
+    """
+    Eventos do calendário de agendamentos
+
+    Uma única query com values() (sem instâncias, prefetches ou anotações)
+    serializa todos os agendamentos da janela; o resultado fica no cache por
+    escopo (professor ou todos) e janela, invalidado pelas tags dos agendamentos.
+    """
+
+    EVENT_FIELDS = (
+        'id', 'scheduled_date', 'start_time', 'end_time', 'laboratory_id', 'laboratory__name',
+        'professor_id', 'professor__first_name', 'professor__last_name', 'subject', 'status',
+        'description', 'number_of_students', 'is_exception',
+    )
+
+    @staticmethod
+    def get_scope(user):
+        """Professores veem apenas os próprios agendamentos; os demais, todos"""
+        return f'professor_{user.id}' if user.user_type == 'professor' else 'all'
+
+    @classmethod
+    def serialize_events(cls, start_date, end_date, professor_id=None, status=None, laboratory_ids=None):
+        """Eventos da janela no formato usado pelo calendário (JSON), filtrados no banco"""
+        from .models import ScheduleRequest
+
+        queryset = ScheduleRequest.objects.filter(scheduled_date__range=[start_date, end_date])
+        if professor_id is not None:
+            queryset = queryset.filter(professor_id=professor_id)
+        if status:
+            queryset = queryset.filter(status=status)
+        if laboratory_ids:
+            queryset = queryset.filter(laboratory_id__in=laboratory_ids)
+        rows = queryset.order_by('scheduled_date', 'start_time', 'id').values_list(*cls.EVENT_FIELDS)
+
+        events = []
+        for (schedule_id, scheduled_date, start_time, end_time, laboratory_id, laboratory_name, event_professor_id,
+             first_name, last_name, subject, event_status, description, number_of_students, is_exception) in rows:
+            events.append({
+                'id': schedule_id,
+                'date': scheduled_date.strftime('%Y-%m-%d'),
+                'start_time': start_time.strftime('%H:%M'),
+                'end_time': end_time.strftime('%H:%M'),
+                'laboratory_id': laboratory_id,
+                'laboratory_name': laboratory_name,
+                'professor_id': event_professor_id,
+                'professor_name': f'{first_name} {last_name}'.strip(),
+                'subject': subject or 'Não informado',
+                'status': event_status,
+                'description': description or '',
+                'number_of_students': number_of_students or 0,
+                'is_exception': is_exception,
+            })
+        return events
+
+    @classmethod
+    def get_events(cls, user, start_date, end_date, status=None, laboratory_ids=None):
+        """Eventos da janela visíveis ao usuário (cache por escopo, janela e filtros)"""
+        from cache_manager import CacheManager
+
+        scope = cls.get_scope(user)
+        professor_id = user.id if scope != 'all' else None
+        laboratory_ids = sorted(set(laboratory_ids or []))
+        # Mudanças em agendamentos invalidam 'user' (do professor) e 'scheduling';
+        # nomes de laboratórios vêm da tag 'laboratories'
+        tags = [CacheManager.tag('laboratories')]
+        tags.append(CacheManager.tag('user', user.id) if professor_id else CacheManager.tag('scheduling'))
+
+        return CacheManager.get_or_compute(
+            'calendar_events', scope, start_date.isoformat(), end_date.isoformat(),
+            status or 'all', '-'.join(map(str, laboratory_ids)) or 'all',
+            compute=lambda: cls.serialize_events(start_date, end_date, professor_id, status, laboratory_ids),
+            tags=tags
+        )
+
+    @staticmethod
+    def group_by_date(events):
+        """Eventos agrupados por data ('AAAA-MM-DD'), mantendo a ordem"""
+        by_date = {}
+        for event in events:
+            by_date.setdefault(event['date'], []).append(event)
+        return by_date
+
+    @staticmethod
+    def compact(events):
+        """
+        Formato compacto: nomes de laboratórios e professores em dicionários por id
+
+        Returns:
+            tuple: (eventos sem os nomes, {id: laboratório}, {id: professor})
+        """
+        laboratories = {}
+        professors = {}
+        compact_events = []
+        for event in events:
+            laboratories[event['laboratory_id']] = event['laboratory_name']
+            professors[event['professor_id']] = event['professor_name']
+            compact_events.append({
+                key: value for key, value in event.items()
+                if key not in ('laboratory_name', 'professor_name')
+            })
+        return compact_events, laboratories, professors
+
+
+class CommentSyncService:
+    """
+    Sincronização incremental dos comentários de uma solicitação
+
+    O cliente envia o id do último comentário que já tem (cursor) e recebe só
+    os mais novos, em ordem, com o novo cursor. A leitura avança com um único
+    UPDATE limitado ao intervalo entregue, executado apenas quando esse
+    intervalo tem mensagens não lidas de outros autores.
+    """
+
+    COMMENT_FIELDS = (
+        'id', 'author_id', 'author__first_name', 'author__last_name', 'author__user_type',
+        'message', 'created_at', 'is_read',
+    )
+    PAGE_SIZE = 100
+
+    @classmethod
+    def sync(cls, schedule_request, user, since=0, limit=None):
+        """
+        Comentários posteriores ao cursor, marcando como lidos os de outros autores
+
+        Args:
+            schedule_request: solicitação da conversa
+            user: usuário que está lendo
+            since (int): id do último comentário já recebido (0 para o início)
+            limit (int): máximo de comentários (até PAGE_SIZE)
+
+        Returns:
+            dict: comments (mais antigos primeiro), cursor e has_more
+        """
+        from accounts.notifications import NotificationCounterService
+        from .models import ScheduleRequestComment
+
+        limit = min(limit or cls.PAGE_SIZE, cls.PAGE_SIZE)
+        thread = ScheduleRequestComment.objects.filter(schedule_request_id=schedule_request.id)
+        rows = list(thread.filter(id__gt=since).order_by('id').values_list(*cls.COMMENT_FIELDS)[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        cursor = rows[-1][0] if rows else since
+
+        comments = []
+        has_unread = False
+        for comment_id, author_id, first_name, last_name, user_type, message, created_at, is_read in rows:
+            is_own = author_id == user.id
+            has_unread = has_unread or (not is_read and not is_own)
+            comments.append({
+                'id': comment_id,
+                'author_name': f'{first_name} {last_name}'.strip(),
+                'author_type': user_type,
+                'message': message,
+                'created_at': created_at.strftime('%d/%m/%Y %H:%M'),
+                'is_own': is_own,
+            })
+
+        if has_unread:
+            marked = thread.filter(
+                id__gt=since, id__lte=cursor, is_read=False
+            ).exclude(author_id=user.id).update(is_read=True)
+            if marked:
+                # update() não dispara signals
+                NotificationCounterService.invalidate([schedule_request.professor_id], technicians=True)
+                ProfessorStatsService.invalidate([schedule_request.professor_id])
+
+        return {'comments': comments, 'cursor': cursor, 'has_more': has_more}
+
+
+class ProfessorStatsService:
+    """
+    Contagens do professor: solicitações por status, aulas aprovadas na semana
+    (e na anterior) e mensagens não lidas, em uma única query agregada
+
+    O resultado fica no cache por professor e semana, com a tag do professor,
+    que é invalidada pelos signals de ScheduleRequest e ScheduleRequestComment;
+    as marcações de leitura feitas com update() chamam invalidate.
+    """
+
+    STATUSES = ('pending', 'approved', 'rejected')
+
+    @staticmethod
+    def get_week_start(day):
+        from datetime import timedelta
+        return day - timedelta(days=day.weekday())
+
+    @classmethod
+    def compute(cls, professor_id, week_start):
+        """
+        Returns:
+            dict: total, pending, approved, rejected, this_week, previous_week,
+                week_change (%) e unread_messages
+        """
+        from datetime import timedelta
+        from django.db.models import Count, Q
+        from .models import ScheduleRequest
+
+        # Semana de segunda a sexta, como no calendário do dashboard
+        week_end = week_start + timedelta(days=4)
+        previous_start = week_start - timedelta(weeks=1)
+        previous_end = week_end - timedelta(weeks=1)
+
+        # O join com os comentários repete as solicitações: contagens de solicitações com distinct
+        aggregates = {
+            'total': Count('id', distinct=True),
+            'this_week': Count('id', distinct=True, filter=Q(
+                status='approved', scheduled_date__range=[week_start, week_end]
+            )),
+            'previous_week': Count('id', distinct=True, filter=Q(
+                status='approved', scheduled_date__range=[previous_start, previous_end]
+            )),
+            'unread_messages': Count('comments', filter=Q(
+                comments__is_read=False
+            ) & ~Q(comments__author_id=professor_id)),
+        }
+        for status in cls.STATUSES:
+            aggregates[status] = Count('id', distinct=True, filter=Q(status=status))
+
+        stats = ScheduleRequest.objects.filter(professor_id=professor_id).aggregate(**aggregates)
+
+        if stats['previous_week'] > 0:
+            stats['week_change'] = (stats['this_week'] - stats['previous_week']) / stats['previous_week'] * 100
+        else:
+            stats['week_change'] = 100 if stats['this_week'] > 0 else 0
+        return stats
+
+    @classmethod
+    def get_stats(cls, professor, week_start=None):
+        """Contagens em cache do professor para a semana (padrão: a semana atual)"""
+        from django.utils import timezone
+        from cache_manager import CacheManager
+
+        week_start = week_start or cls.get_week_start(timezone.now().date())
+        return CacheManager.get_or_compute(
+            'professor_stats', professor.id, week_start,
+            compute=lambda: cls.compute(professor.id, week_start),
+            tags=[CacheManager.tag('user', professor.id)]
+        )
+
+    @staticmethod
+    def invalidate(professor_ids):
+        """Descarta as contagens após o commit (mensagens marcadas como lidas com update())"""
+        from django.db import transaction
+        from cache_manager import CacheManager
+
+        tags = [CacheManager.tag('user', professor_id) for professor_id in set(professor_ids) if professor_id]
+        if tags:
+            transaction.on_commit(lambda: CacheManager.invalidate_tags(*tags))
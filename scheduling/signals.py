@@ -1,29 +1,74 @@
 # scheduling/signals.py
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
-from .models import ScheduleRequest, DraftScheduleRequest
+from accounts.notifications import NotificationCounterService
+from accounts.realtime import NotificationPushService
+from .models import ScheduleRequest, DraftScheduleRequest, ScheduleRequestComment
+from .services import ScheduleConflictIndex, LabUsageRollupService
+from cache_manager import CacheManager
 
 
-def invalidate_schedule_caches():
-    """Invalida todos os caches relacionados a agendamentos"""
-    cache_keys = [
-        'pending_requests_list',
-        'pending_appointments_count',
-    ]
-    cache.delete_many(cache_keys)
+def get_affected_slots(instance):
+    """Pares (laboratório, data) atual e anteriormente carregado do agendamento"""
+    slots = {(instance.laboratory_id, instance.scheduled_date)}
+    loaded_slot = getattr(instance, '_loaded_slot', None)
+    if loaded_slot:
+        slots.add(loaded_slot)
+    return slots
+
+
+def refresh_slot_data(instance):
+    """Invalida o índice de conflitos e reagrega o rollup diário dos dias afetados"""
+    slots = get_affected_slots(instance)
+    
+    # Só após o commit, para que a reconstrução leia o estado gravado
+    transaction.on_commit(lambda: ScheduleConflictIndex.invalidate(*slots))
+    transaction.on_commit(lambda: LabUsageRollupService.refresh(*slots))
+
+
+def invalidate_schedule_tags(instance):
+    """Invalida as tags de cache do agendamento (estado atual e o carregado do banco)"""
+    # Registrado depois do rollup: caches recalculados já leem o rollup atualizado
+    CacheManager.invalidate_schedules(instance)
+    instance._loaded_slot = (instance.laboratory_id, instance.scheduled_date)
+    instance._loaded_status = instance.status
 
 
 @receiver(post_save, sender=ScheduleRequest)
 def schedule_request_saved(sender, instance, created, **kwargs):
     """Invalida cache quando uma solicitação é salva"""
-    invalidate_schedule_caches()
+    # Status carregado do banco: lido antes de invalidate_schedule_tags, que o atualiza
+    previous_status = None if created else getattr(instance, '_loaded_status', None)
+    refresh_slot_data(instance)
+    invalidate_schedule_tags(instance)
+    NotificationCounterService.invalidate([instance.professor_id], technicians=True)
+    NotificationPushService.publish_schedule_changes([(instance, previous_status, False)])
 
 
 @receiver(post_delete, sender=ScheduleRequest)
 def schedule_request_deleted(sender, instance, **kwargs):
     """Invalida cache quando uma solicitação é deletada"""
-    invalidate_schedule_caches()
+    previous_status = getattr(instance, '_loaded_status', instance.status)
+    refresh_slot_data(instance)
+    invalidate_schedule_tags(instance)
+    NotificationCounterService.invalidate([instance.professor_id], technicians=True)
+    NotificationPushService.publish_schedule_changes([(instance, previous_status, True)])
+
+
+@receiver(post_save, sender=ScheduleRequestComment)
+@receiver(post_delete, sender=ScheduleRequestComment)
+def schedule_request_comment_changed(sender, instance, created=False, **kwargs):
+    """Atualiza os contadores de mensagens não lidas e os caches com contagem de comentários"""
+    professor_id, schedule_status = ScheduleRequest.objects.filter(
+        pk=instance.schedule_request_id
+    ).values_list('professor_id', 'status').first() or (None, None)
+    NotificationCounterService.invalidate([professor_id], technicians=True)
+    transaction.on_commit(lambda: CacheManager.invalidate_tags(
+        CacheManager.tag('comments'), CacheManager.tag('user', professor_id)
+    ))
+    if created and professor_id:
+        NotificationPushService.publish_comment(instance, professor_id, schedule_status)
 
 
 @receiver(post_save, sender=DraftScheduleRequest)
@@ -9,6 +9,7 @@ urlpatterns = [
     path('request/<int:pk>/edit/', views.edit_schedule_request, name='edit_schedule_request'),
     path('request/<int:pk>/cancel/', views.cancel_schedule_request, name='cancel_schedule_request'),
     path('pending/', views.pending_requests_list, name='pending_requests'),
+    path('api/requests/bulk-review/', views.bulk_review_requests_api, name='bulk_review_requests_api'),
     path('requests/<int:pk>/approve/', views.approve_schedule_request, name='approve_schedule_request'),
     path('requests/<int:pk>/reject/', views.reject_schedule_request, name='reject_schedule_request'),
     path('drafts/', views.list_draft_schedule_requests, name='list_draft_schedule_requests'),
@@ -25,6 +26,7 @@ urlpatterns = [
     path('my-requests/', views.my_schedule_requests, name='my_schedule_requests'),
     path('api/mark-notifications-read/', views.mark_all_notifications_read, name='mark_notifications_read'),
     path('notifications/', views.all_notifications, name='all_notifications'),
+    path('api/notifications/recent/', views.recent_notifications_api, name='recent_notifications_api'),
     path('technician-edit/<int:pk>/', views.technician_edit_schedule, name='technician_edit_schedule'),
     path('create-exception/', views.create_exception_schedule, name='create_exception_schedule'),
     path('api/storage-materials/', views.storage_materials_api, name='storage_materials_api'),
@@ -7,6 +7,9 @@ from datetime import datetime, timedelta, time
 from accounts.models import User
 from accounts.views import is_technician, is_professor
 from .models import Laboratory, ScheduleRequest, DraftScheduleRequest, FileAttachment, ScheduleRequestComment
+from .services import CalendarEventService, CommentSyncService, ProfessorStatsService, ScheduleReviewService
+from accounts.notifications import NotificationCounterService
+from accounts.realtime import NotificationPushService
 from laboratories.models import Department
 from .forms import ScheduleRequestForm, ExceptionScheduleRequestForm
 from django.conf import settings
@@ -14,25 +17,19 @@ from django.urls import reverse
 from django.http import JsonResponse, HttpResponseRedirect
 from whatsapp.services import WhatsAppNotificationService
 from inventory.models import Material
-from django.core.cache import cache
 from cache_manager import CacheManager
 from django.core.paginator import Paginator
 from django.http import HttpResponse, Http404, FileResponse
+from django.utils.cache import get_conditional_response
 from django.db.models import Count, Q
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+import hashlib
+import json
 import os
 import mimetypes
 
 
-def invalidate_schedule_caches():
-    """Invalida todos os caches relacionados a agendamentos"""
-    cache_keys = [
-        'pending_requests_list',
-        'pending_appointments_count',
-    ]
-    cache.delete_many(cache_keys)
-
-
 @login_required
 def schedule_calendar(request):
     """Exibe calendário de agendamentos de laboratórios"""
@@ -44,28 +41,9 @@ def schedule_calendar(request):
     end_date = today.replace(day=1) + timedelta(days=62)    # Próximos 2 meses
     
     # Buscar TODOS os status de agendamentos
-    # 🚀 OTIMIZADO: Query unificada com todas as relações necessárias
-    schedule_requests_base = ScheduleRequest.objects.select_related(
-        'professor', 
-        'laboratory',
-        'reviewed_by'
-    ).prefetch_related(
-        'comments__author',
-        'attachments'
-    ).annotate(
-        comments_count=Count('comments'),
-        unread_comments_count=Count(
-            'comments', 
-            filter=Q(comments__is_read=False) & ~Q(comments__author=user)
-        )
-    ).filter(scheduled_date__range=[start_date, end_date])
-    
-    if user.user_type == 'professor':
-        # Para professores, mostrar apenas seus próprios agendamentos
-        schedule_requests = schedule_requests_base.filter(professor=user)
-    else:
-        # Para laboratoristas, mostrar todos os agendamentos
-        schedule_requests = schedule_requests_base
+    # 🚀 OTIMIZADO: uma única query serializada com values(), em cache por escopo e janela
+    events = CalendarEventService.get_events(user, start_date, end_date)
+    events_by_date = CalendarEventService.group_by_date(events)
     
     # Obtém todos os laboratórios disponíveis para os filtros
     laboratories = Laboratory.objects.filter(is_active=True).prefetch_related('departments')
@@ -74,24 +52,6 @@ def schedule_calendar(request):
     from laboratories.models import Department
     departments = Department.objects.filter(is_active=True).order_by('name')
     
-    # Converter agendamentos para formato JSON - CAMPOS CORRETOS
-    events = []
-    for schedule in schedule_requests:
-        events.append({
-            'id': schedule.id,
-            'date': schedule.scheduled_date.strftime('%Y-%m-%d'),
-            'start_time': schedule.start_time.strftime('%H:%M'),
-            'end_time': schedule.end_time.strftime('%H:%M'),
-            'laboratory_id': schedule.laboratory.id,
-            'laboratory_name': schedule.laboratory.name,
-            'professor_name': schedule.professor.get_full_name(),
-            'subject': schedule.subject or 'Não informado',
-            'status': schedule.status,  # pending, approved, rejected
-            'description': schedule.description or '',
-            'number_of_students': schedule.number_of_students or 0,  # CAMPO CORRETO
-            'is_exception': schedule.is_exception,  # CAMPO PARA AGENDAMENTOS DE EXCEÇÃO
-        })
-    
     # Organiza as datas para o calendário (manter compatibilidade)
     calendar_weeks = []
     week_start = start_date
@@ -102,15 +62,12 @@ def schedule_calendar(request):
             if current_date > end_date:
                 break
             
-            # Filtra agendamentos para este dia
-            day_schedules = schedule_requests.filter(scheduled_date=current_date)
-            
             week_days.append({
                 'date': current_date,
                 'is_today': current_date == today,
                 'is_past': current_date < today,
                 'day_name': current_date.strftime('%a'),
-                'schedules': day_schedules
+                'schedules': events_by_date.get(current_date.strftime('%Y-%m-%d'), [])
             })
         
         if week_days:
@@ -308,7 +265,6 @@ def create_schedule_request(request):
                 # Salvar o agendamento
                 logger.info(f" SALVANDO AGENDAMENTO...")
                 schedule_request.save()
-                invalidate_schedule_caches()  # Invalidar cache
                 logger.info(f" AGENDAMENTO SALVO COM SUCESSO - ID: {schedule_request.pk}")
                 
                 # Processar materiais selecionados
@@ -513,8 +469,6 @@ def confirm_draft_schedule_request(request, draft_id):
         guide_file=draft_request.guide_file,
     )
     
-    invalidate_schedule_caches()  # Invalidar cache
-    
     # Verifica conflitos de horário
     if schedule_request.is_conflicting():
         # Se houver conflito, deleta a solicitação e mantém o rascunho
@@ -591,7 +545,10 @@ def schedule_request_detail(request, pk):
     
     # Marcar comentários como lidos para o usuário atual
     unread_comments = comments.filter(is_read=False).exclude(author=request.user)
-    unread_comments.update(is_read=True)
+    if unread_comments.update(is_read=True):
+        # update() não dispara signals
+        NotificationCounterService.invalidate([schedule_request.professor_id], technicians=True)
+        ProfessorStatsService.invalidate([schedule_request.professor_id])
     
     # Informações sobre o prazo
     schedule_request.approval_deadline = schedule_request.get_approval_deadline()
@@ -710,9 +667,7 @@ def approve_schedule_request(request, pk):
         # Aprova a solicitação
         schedule_request.approve(request.user)
         
-        # FORÇA INVALIDAÇÃO IMEDIATA E COMPLETA DO CACHE
-        CacheManager.force_invalidate_all_scheduling_cache()
-        invalidate_schedule_caches()
+        # Caches dependentes são invalidados pelos signals (tags de lab/status/usuário)
 
         # Adicionar: Enviar notificação WhatsApp
         WhatsAppNotificationService.notify_schedule_approval(schedule_request)
@@ -742,9 +697,7 @@ def reject_schedule_request(request, pk):
         # Rejeita a solicitação
         schedule_request.reject(request.user, rejection_reason)
         
-        # FORÇA INVALIDAÇÃO IMEDIATA E COMPLETA DO CACHE
-        CacheManager.force_invalidate_all_scheduling_cache()
-        invalidate_schedule_caches()
+        # Caches dependentes são invalidados pelos signals (tags de lab/status/usuário)
 
         # Adicionar: Enviar notificação WhatsApp
         WhatsAppNotificationService.notify_schedule_rejection(schedule_request)
@@ -929,8 +882,15 @@ def edit_draft_schedule_request(request, draft_id):
     return render(request, 'create_request.html', context)
 
 
+@login_required
 def calendar_data_api(request):
-    """API para dados do calendário via AJAX"""
+    """
+    API para dados do calendário via AJAX
+    
+    Resposta compacta: eventos com ids de laboratório/professor e os nomes em
+    dicionários; os dias trazem apenas os ids dos eventos. Suporta ETag /
+    If-None-Match para que o polling receba 304 quando nada mudou.
+    """
     # Obter parâmetros da requisição
     week_offset = int(request.GET.get('week_offset', 0))
     month_offset = int(request.GET.get('month_offset', 0))
@@ -950,85 +910,54 @@ def calendar_data_api(request):
         start_date = start_date + timedelta(weeks=week_offset)
         end_date = start_date + timedelta(days=27)
     
-    # Construir filtro para laboratórios
-    lab_filter = {}
+    # Filtros de status e laboratórios aplicados na query
+    laboratory_ids = []
     if filter_labs and 'all' not in filter_labs:
-        lab_filter['laboratory__id__in'] = filter_labs
-    
-    # Buscar todos os agendamentos
-    schedule_requests = ScheduleRequest.objects.filter(
-        scheduled_date__range=[start_date, end_date],
-        **lab_filter
-    ).select_related('professor', 'laboratory')
-    
-    # Se o usuário for professor, mostrar apenas seus agendamentos
-    if request.user.user_type == 'professor':
-        schedule_requests = schedule_requests.filter(professor=request.user)
-    
-    # Converter para formato JSON - CAMPOS CORRETOS
-    events = []
-    for schedule in schedule_requests:
-        # Aplicar filtro de status no frontend se necessário
-        if filter_status != 'all' and schedule.status != filter_status:
-            continue
-            
-        events.append({
-            'id': schedule.id,
-            'date': schedule.scheduled_date.strftime('%Y-%m-%d'),
-            'start_time': schedule.start_time.strftime('%H:%M'),
-            'end_time': schedule.end_time.strftime('%H:%M'),
-            'laboratory_id': schedule.laboratory.id,
-            'laboratory_name': schedule.laboratory.name,
-            'professor_name': schedule.professor.get_full_name(),
-            'subject': schedule.subject or 'Não informado',
-            'status': schedule.status,
-            'description': schedule.description or '',
-            'number_of_students': schedule.number_of_students or 0,  # CAMPO CORRETO
-            'is_exception': schedule.is_exception,  # CAMPO PARA AGENDAMENTOS DE EXCEÇÃO
-        })
+        laboratory_ids = [int(lab_id) for lab_id in filter_labs if lab_id.isdigit()]
+        if not laboratory_ids:
+            laboratory_ids = [0]  # nenhum laboratório válido: nenhum evento
+    
+    events = CalendarEventService.get_events(
+        request.user, start_date, end_date,
+        status=None if filter_status == 'all' else filter_status,
+        laboratory_ids=laboratory_ids
+    )
+    events_by_date = CalendarEventService.group_by_date(events)
+    events, laboratories, professors = CalendarEventService.compact(events)
     
-    # Organizar dados por semanas e dias
+    # Organizar ids dos eventos por semanas e dias (uma passada)
     calendar_data = []
-    
     current_date = start_date
     for week in range(4):
         week_data = []
-        
         for day in range(7):
-            day_schedules = []
-            
-            # Filtrar agendamentos para este dia
-            day_requests = [e for e in events if e['date'] == current_date.strftime('%Y-%m-%d')]
-            
-            for request in day_requests:
-                day_schedules.append({
-                    'id': request['id'],
-                    'start_time': request['start_time'],
-                    'end_time': request['end_time'],
-                    'laboratory_name': request['laboratory_name'],
-                    'professor_name': request['professor_name'],
-                    'subject': request['subject'],
-                    'status': request['status'],
-                })
-            
+            date_key = current_date.isoformat()
             week_data.append({
-                'date': current_date.strftime('%Y-%m-%d'),
+                'date': date_key,
                 'day_name': current_date.strftime('%a'),
                 'is_today': current_date == today,
-                'schedules': day_schedules
+                'schedule_ids': [event['id'] for event in events_by_date.get(date_key, ())],
             })
-            
             current_date += timedelta(days=1)
-        
         calendar_data.append(week_data)
     
-    return JsonResponse({
+    body = json.dumps({
         'success': True,
         'events': events,
+        'laboratories': laboratories,
+        'professors': professors,
         'calendar_data': calendar_data,
-        'start_date': start_date.strftime('%Y-%m-%d'),
-        'end_date': end_date.strftime('%Y-%m-%d'),
-    })
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+    }, ensure_ascii=False, separators=(',', ':'))
+    
+    etag = f'"{hashlib.md5(body.encode("utf-8")).hexdigest()}"'
+    response = HttpResponse(body, content_type='application/json; charset=utf-8')
+    response['ETag'] = etag
+    # Sempre revalidar com o servidor (If-None-Match)
+    response['Cache-Control'] = 'private, no-cache'
+    # 304 sem corpo quando o cliente já tem esta versão
+    return get_conditional_response(request, etag=etag, response=response)
 
 
 def schedule_detail_api(request, schedule_id):
@@ -1126,64 +1055,27 @@ def pending_requests_list(request):
         schedule_id = request.POST.get('schedule_id')
         action = request.POST.get('action')
         
-        if schedule_id and action:
+        if schedule_id and action in ('approve', 'reject'):
             try:
-                schedule_request = ScheduleRequest.objects.select_related('professor', 'laboratory').get(
-                    id=schedule_id, status='pending'
+                result = ScheduleReviewService.review(
+                    [schedule_id],
+                    action,
+                    request.user,
+                    rejection_reason=request.POST.get('rejection_reason', '')
                 )
-                
+            except ValueError:
+                result = {'skipped': [schedule_id]}
+            
+            if result.get('conflicts'):
+                messages.error(request, 'Existe conflito de horário com outro agendamento já aprovado.')
+            elif result.get('skipped'):
+                messages.error(request, 'Solicitação não encontrada ou já foi processada.')
+            else:
+                schedule_request = ScheduleRequest.objects.select_related('professor').get(id=schedule_id)
                 if action == 'approve':
-                    if schedule_request.is_conflicting():
-                        messages.error(request, 'Existe conflito de horário com outro agendamento já aprovado.')
-                    else:
-                        schedule_request.approve(request.user)
-                        WhatsAppNotificationService.notify_schedule_approval(schedule_request)
-                        
-                        # FORÇA INVALIDAÇÃO IMEDIATA DO CACHE
-                        invalidate_schedule_caches()
-                        CacheManager.invalidate_scheduling_cache()
-                        CacheManager.invalidate_dashboard_cache()
-                        
-                        # Limpar cache específico do pending_requests_list
-                        cache_key = f'pending_requests_list_{request.user.id}'
-                        cache.delete(cache_key)
-                        
-                        # Limpar todos os caches relacionados manualmente
-                        cache.delete_many([
-                            'pending_requests_list',
-                            'pending_appointments_count',
-                            'dashboard_stats_technician',
-                            'dashboard_stats_professor'
-                        ])
-                        
-                        messages.success(request, f'Solicitação de {schedule_request.professor.get_full_name()} aprovada com sucesso.')
-                
-                elif action == 'reject':
-                    rejection_reason = request.POST.get('rejection_reason', '')
-                    schedule_request.reject(request.user, rejection_reason)
-                    WhatsAppNotificationService.notify_schedule_rejection(schedule_request)
-                    
-                    # FORÇA INVALIDAÇÃO IMEDIATA DO CACHE
-                    invalidate_schedule_caches()
-                    CacheManager.invalidate_scheduling_cache()
-                    CacheManager.invalidate_dashboard_cache()
-                    
-                    # Limpar cache específico do pending_requests_list
-                    cache_key = f'pending_requests_list_{request.user.id}'
-                    cache.delete(cache_key)
-                    
-                    # Limpar todos os caches relacionados manualmente
-                    cache.delete_many([
-                        'pending_requests_list',
-                        'pending_appointments_count',
-                        'dashboard_stats_technician',
-                        'dashboard_stats_professor'
-                    ])
-                    
+                    messages.success(request, f'Solicitação de {schedule_request.professor.get_full_name()} aprovada com sucesso.')
+                else:
                     messages.success(request, f'Solicitação de {schedule_request.professor.get_full_name()} rejeitada.')
-                    
-            except ScheduleRequest.DoesNotExist:
-                messages.error(request, 'Solicitação não encontrada ou já foi processada.')
         
         return HttpResponseRedirect(reverse('pending_requests') + '?fresh=1')
     
@@ -1192,14 +1084,8 @@ def pending_requests_list(request):
     force_fresh = request.GET.get('fresh', '0') == '1'
     cache_key = f'pending_requests_list_{request.user.id}'
     
-    if force_fresh:
-        pending_requests = None
-        CacheManager.delete_cache('pending_requests', cache_key)
-    else:
-        pending_requests = CacheManager.get_cache('pending_requests', cache_key)
-    
-    if pending_requests is None:
-        pending_requests = list(ScheduleRequest.objects.filter(
+    def compute_pending_requests():
+        return list(ScheduleRequest.objects.filter(
             status='pending'
         ).select_related(
             'professor', 
@@ -1213,9 +1099,17 @@ def pending_requests_list(request):
                 filter=Q(comments__is_read=False) & ~Q(comments__author=request.user)
             )
         ).order_by('-request_date')[:50])  # Limitar a 50 mais recentes
-        
-        # Cache por 2 minutos
-        CacheManager.set_cache('pending_requests', pending_requests, cache_key, ttl=120)
+    
+    if force_fresh:
+        CacheManager.delete_cache('pending_requests', cache_key)
+    
+    # Cache por 2 minutos (invalidado por mudanças em pendentes e comentários);
+    # um único worker recalcula enquanto os demais recebem o último valor
+    pending_requests = CacheManager.get_or_compute(
+        'pending_requests', cache_key,
+        compute=compute_pending_requests, ttl=120,
+        tags=(CacheManager.tag('status', 'pending'), CacheManager.tag('comments'))
+    )
     
     # Adicionar informações sobre prazo (sem queries adicionais)
     today = timezone.localtime().date()
@@ -1239,6 +1133,50 @@ def pending_requests_list(request):
     return render(request, 'pending_requests.html', context)
 
 
+@login_required
+@user_passes_test(is_technician)
+@require_POST
+def bulk_review_requests_api(request):
+    """
+    API para aprovar ou rejeitar várias solicitações pendentes de uma só vez
+    
+    Aceita JSON ({"ids": [...], "action": "approve"|"reject", "rejection_reason": "..."})
+    ou formulário com 'schedule_ids' repetido, 'action' e 'rejection_reason'.
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or '{}')
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'error': 'JSON inválido'}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({'success': False, 'error': 'O corpo deve ser um objeto JSON'}, status=400)
+        schedule_ids = data.get('ids') or []
+        action = data.get('action')
+        rejection_reason = data.get('rejection_reason', '')
+        if not isinstance(schedule_ids, list) or not isinstance(rejection_reason, str):
+            return JsonResponse({
+                'success': False,
+                'error': "'ids' deve ser uma lista e 'rejection_reason' um texto"
+            }, status=400)
+    else:
+        schedule_ids = request.POST.getlist('schedule_ids')
+        action = request.POST.get('action')
+        rejection_reason = request.POST.get('rejection_reason', '')
+    
+    if not schedule_ids or action not in ('approve', 'reject'):
+        return JsonResponse({'success': False, 'error': 'Informe os ids e uma ação válida'}, status=400)
+    
+    if action == 'reject' and not rejection_reason.strip():
+        return JsonResponse({'success': False, 'error': 'O motivo da rejeição é obrigatório'}, status=400)
+    
+    try:
+        result = ScheduleReviewService.review(schedule_ids, action, request.user, rejection_reason=rejection_reason)
+    except (TypeError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({'success': True, **result})
+
+
 @login_required
 def add_comment_to_request(request, pk):
     """API endpoint para adicionar comentário via AJAX"""
@@ -1291,32 +1229,26 @@ def add_comment_to_request(request, pk):
 
 @login_required  
 def get_request_comments(request, pk):
-    """API endpoint para obter comentários via AJAX"""
+    """
+    API endpoint para obter comentários via AJAX
+
+    Sincronização incremental: ?since=<id do último comentário recebido>
+    devolve só os comentários mais novos e o novo cursor; sem since, a
+    conversa desde o início (em páginas, seguindo has_more).
+    """
     schedule_request = get_object_or_404(ScheduleRequest, pk=pk)
     
     # Verificar permissões
-    if (request.user.user_type == 'professor' and schedule_request.professor != request.user) and \
+    if (request.user.user_type == 'professor' and schedule_request.professor_id != request.user.id) and \
        request.user.user_type != 'technician':
         return JsonResponse({'error': 'Sem permissão'}, status=403)
     
-    comments = schedule_request.comments.select_related('author').all()
-    
-    # Marcar como lidas
-    unread_comments = comments.filter(is_read=False).exclude(author=request.user)
-    unread_comments.update(is_read=True)
-    
-    comments_data = []
-    for comment in comments:
-        comments_data.append({
-            'id': comment.id,
-            'author_name': comment.author.get_full_name(),
-            'author_type': comment.author.user_type,
-            'message': comment.message,
-            'created_at': comment.created_at.strftime('%d/%m/%Y %H:%M'),
-            'is_own': comment.author == request.user
-        })
+    try:
+        since = max(int(request.GET.get('since', 0)), 0)
+    except ValueError:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
     
-    return JsonResponse({'comments': comments_data})
+    return JsonResponse(CommentSyncService.sync(schedule_request, request.user, since=since))
 
 
 @login_required
@@ -1335,24 +1267,17 @@ def my_schedule_requests(request):
     if status_filter and status_filter != 'all':
         requests_query = requests_query.filter(status=status_filter)
     
-    # Buscar solicitações com relacionamentos
+    # Buscar solicitações com relacionamentos e contagens de comentários (uma única query)
     schedule_requests = requests_query.select_related(
         'laboratory', 'reviewed_by'
-    ).prefetch_related(
-        'comments__author'
+    ).annotate(
+        comments_count=Count('comments'),
+        unread_comments=Count('comments', filter=Q(comments__is_read=False) & ~Q(comments__author=professor)),
     ).order_by('-request_date')
     
     # Adicionar informações extras para cada solicitação
     for schedule_req in schedule_requests:
-        # Informações sobre comentários
-        comments_count = schedule_req.comments.count()
-        unread_count = schedule_req.comments.filter(
-            is_read=False
-        ).exclude(author=request.user).count()
-        
-        schedule_req.comments_count = comments_count
-        schedule_req.unread_comments = unread_count
-        schedule_req.has_conversation = comments_count > 0
+        schedule_req.has_conversation = schedule_req.comments_count > 0
         
         # Informações sobre prazo (se pendente)
         if schedule_req.status == 'pending':
@@ -1361,11 +1286,12 @@ def my_schedule_requests(request):
             schedule_req.is_overdue = schedule_req.is_approval_overdue()
     
     # Contar por status
+    stats = ProfessorStatsService.get_stats(professor)
     status_counts = {
-        'all': ScheduleRequest.objects.filter(professor=professor).count(),
-        'pending': ScheduleRequest.objects.filter(professor=professor, status='pending').count(),
-        'approved': ScheduleRequest.objects.filter(professor=professor, status='approved').count(),
-        'rejected': ScheduleRequest.objects.filter(professor=professor, status='rejected').count(),
+        'all': stats['total'],
+        'pending': stats['pending'],
+        'approved': stats['approved'],
+        'rejected': stats['rejected'],
     }
     
     context = {
@@ -1389,14 +1315,21 @@ def mark_all_notifications_read(request):
                 schedule_request__professor=request.user,
                 is_read=False
             ).exclude(author=request.user).update(is_read=True)
+            NotificationCounterService.invalidate([request.user.id], technicians=True)
+            ProfessorStatsService.invalidate([request.user.id])
         
         elif request.user.user_type == 'technician':
             # Marcar mensagens de professores como lidas
-            ScheduleRequestComment.objects.filter(
+            unread_comments = ScheduleRequestComment.objects.filter(
                 schedule_request__status='pending',
                 is_read=False
-            ).exclude(author=request.user).update(is_read=True)
+            ).exclude(author=request.user)
+            professor_ids = set(unread_comments.values_list('schedule_request__professor_id', flat=True))
+            unread_comments.update(is_read=True)
+            NotificationCounterService.invalidate(professor_ids, technicians=True)
+            ProfessorStatsService.invalidate(professor_ids)
         
+        NotificationPushService.publish_notifications_read(request.user.id)
         return JsonResponse({'success': True})
 
 
@@ -1502,6 +1435,32 @@ def all_notifications(request):
     })
 
 
+@login_required
+def recent_notifications_api(request):
+    """API com as notificações do dropdown do cabeçalho (carregada ao abrir o menu)"""
+    from django.utils.timesince import timesince
+    
+    notifications = NotificationCounterService.build_notifications(request.user)
+    counters = NotificationCounterService.get_counters(request.user)
+    
+    return JsonResponse({
+        'success': True,
+        'count': counters['notifications_count'],
+        'notifications': [
+            {
+                'title': notification['title'],
+                'message': notification['message'],
+                'type': notification['type'],
+                'url': notification['url'],
+                'icon': notification['icon'],
+                'timestamp': notification['timestamp'].isoformat() if notification['timestamp'] else None,
+                'timesince': timesince(notification['timestamp']) if notification['timestamp'] else None,
+            }
+            for notification in notifications
+        ]
+    })
+
+
 @login_required
 @user_passes_test(is_technician)
 def technician_edit_schedule(request, pk):
@@ -229,10 +229,37 @@ class ProfessorDashboard {
     }
 
     setupNotifications() {
-        // Verificar notificações a cada 30 segundos
+        // Verificar notificações a cada 30 segundos (sem WebSocket conectado)
         setInterval(() => {
-            this.checkForNotifications();
+            if (!(window.realTimeUpdater && window.realTimeUpdater.pushConnected)) {
+                this.checkForNotifications();
+            }
         }, 30000);
+
+        // Com WebSocket: aplicar os eventos recebidos em vez de consultar a API
+        document.addEventListener('labconnect:realtime', (e) => {
+            this.handleRealtimeEvent(e.detail);
+        });
+    }
+
+    handleRealtimeEvent(event) {
+        if (event.type === 'notifications.read') {
+            this.showNotificationBadge(0);
+            return;
+        }
+
+        const updater = window.realTimeUpdater;
+        const ownEvent = updater && event.author_id !== undefined && event.author_id === updater.userId;
+        const delta = (event.counters && event.counters.notifications_count) || 0;
+        if (delta && !ownEvent) {
+            const badge = document.querySelector('.notification-badge');
+            const current = badge ? (parseInt(badge.textContent) || 0) : 0;
+            this.showNotificationBadge(Math.max(current + delta, 0));
+        }
+
+        if (event.type === 'schedule.changed' || event.type === 'comment.created') {
+            this.refreshStats();
+        }
     }
 
     async checkForNotifications() {
@@ -13,6 +13,14 @@ class RealTimeUpdater {
         this.retryCount = 0;
         this.maxRetries = 3;
         
+        // WebSocket de notificações (Django Channels): enquanto conectado, não há polling
+        this.socket = null;
+        this.pushConnected = false;
+        this.userId = null;
+        this.isRelevantPage = false;
+        this.reconnectDelay = 2000;
+        this.maxReconnectDelay = 5 * 60 * 1000;
+        
         this.init();
     }
     
@@ -30,14 +38,98 @@ class RealTimeUpdater {
             currentPath.includes(page) || document.body.classList.contains(page)
         );
         
+        this.isRelevantPage = isRelevantPage;
+        
         if (isRelevantPage) {
             this.startPolling();
             this.setupEventListeners();
             this.setupVisibilityHandler();
         }
+        
+        this.connectSocket();
+    }
+    
+    connectSocket() {
+        // Caminho definido pelo base.html apenas quando REALTIME_NOTIFICATIONS está ativo
+        if (!window.LABCONNECT_REALTIME_PATH || !('WebSocket' in window)) return;
+        
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        this.socket = new WebSocket(`${protocol}//${window.location.host}${window.LABCONNECT_REALTIME_PATH}`);
+        
+        this.socket.addEventListener('open', () => {
+            this.pushConnected = true;
+            this.reconnectDelay = 2000;
+            this.stopPolling();
+        });
+        
+        this.socket.addEventListener('message', (e) => {
+            try {
+                this.handlePushEvent(JSON.parse(e.data));
+            } catch (error) {
+                console.error('Erro ao processar evento em tempo real:', error);
+            }
+        });
+        
+        this.socket.addEventListener('close', () => {
+            const wasConnected = this.pushConnected;
+            this.pushConnected = false;
+            this.socket = null;
+            
+            // Sem WebSocket a página volta ao polling até reconectar
+            if (this.isRelevantPage && !this.updateInterval) {
+                if (wasConnected) this.checkForUpdates();
+                this.startPolling();
+            }
+            
+            setTimeout(() => this.connectSocket(), this.reconnectDelay);
+            this.reconnectDelay = Math.min(this.maxReconnectDelay, this.reconnectDelay * 2);
+        });
+    }
+    
+    handlePushEvent(event) {
+        if (event.type === 'connection.ready') {
+            this.userId = event.user_id;
+            return;
+        }
+        
+        if (event.type === 'notifications.read') {
+            this.setNotificationCounter('notifications_count', 0);
+        } else if (event.counters && event.author_id !== this.userId) {
+            // O autor de um comentário não conta a própria mensagem
+            Object.entries(event.counters).forEach(([key, delta]) => {
+                this.applyCounterDelta(key, delta);
+            });
+        }
+        
+        // Páginas interessadas (dashboard, listas de solicitações) reagem ao evento
+        document.dispatchEvent(new CustomEvent('labconnect:realtime', { detail: event }));
+    }
+    
+    applyCounterDelta(key, delta) {
+        document.querySelectorAll(`[data-notification-counter="${key}"]`).forEach(el => {
+            this.setCounterElement(el, (parseInt(el.textContent) || 0) + delta);
+        });
+    }
+    
+    setNotificationCounter(key, value) {
+        document.querySelectorAll(`[data-notification-counter="${key}"]`).forEach(el => {
+            this.setCounterElement(el, value);
+        });
+    }
+    
+    setCounterElement(el, value) {
+        value = Math.max(0, value);
+        el.textContent = value;
+        el.style.display = value > 0 ? '' : 'none';
+        
+        el.classList.add('counter-updated');
+        setTimeout(() => el.classList.remove('counter-updated'), 500);
     }
     
     startPolling() {
+        // Com o WebSocket conectado as atualizações chegam por push
+        if (this.pushConnected || this.updateInterval) return;
+        
         // Usar polling inteligente - só quando a página está visível
         this.updateInterval = setInterval(() => {
             if (!document.hidden && !this.isUpdating) {
@@ -58,7 +150,7 @@ class RealTimeUpdater {
         document.addEventListener('visibilitychange', () => {
             if (document.hidden) {
                 this.stopPolling();
-            } else {
+            } else if (!this.pushConnected) {
                 // Verificar imediatamente quando volta a ficar visível
                 this.checkForUpdates();
                 this.startPolling();
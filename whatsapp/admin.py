@@ -1,3 +1,11 @@
 from django.contrib import admin
+from .models import WhatsAppOutboxMessage
 
-# Register your models here.
+
+@admin.register(WhatsAppOutboxMessage)
+class WhatsAppOutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'phone', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['phone', 'message']
+    ordering = ['-created_at']
+    readonly_fields = ['dedupe_key', 'created_at', 'sent_at', 'locked_at', 'last_error']
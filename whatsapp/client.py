@@ -8,9 +8,30 @@ logger = logging.getLogger(__name__)
 class WhatsAppClient:
     """Cliente simples para enviar mensagens WhatsApp"""
     
-    def __init__(self):
+    # Status HTTP que indicam falha temporária do gateway (vale tentar de novo)
+    RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+    
+    def __init__(self, session=None, timeout=30):
         self.base_url = getattr(settings, 'WHATSAPP_SERVICE_URL', 'http://localhost:3000/api')
         self.api_key = getattr(settings, 'WHATSAPP_API_KEY', '')
+        self.session = session
+        self.timeout = timeout
+    
+    @staticmethod
+    def build_session(pool_size=4):
+        """
+        Cria uma sessão HTTP com pool de conexões keep-alive para o gateway
+        
+        Os retries ficam a cargo de quem chama (ex.: fila de saída), por isso
+        o adapter não faz novas tentativas por conta própria.
+        """
+        from requests.adapters import HTTPAdapter
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
 
     def _format_phone(self, phone):
         """
@@ -54,6 +75,20 @@ class WhatsAppClient:
         Returns:
             bool: True se a mensagem foi enviada com sucesso, False caso contrário
         """
+        success, _, _ = self.deliver(phone, message)
+        return success
+    
+    def deliver(self, phone, message):
+        """
+        Envia uma mensagem WhatsApp informando se uma falha é temporária
+        
+        Args:
+            phone (str): Número do destinatário
+            message (str): Conteúdo da mensagem
+            
+        Returns:
+            tuple: (sucesso, falha temporária, descrição do erro)
+        """
         url = f"{self.base_url}/send-message"
         
         # Formatar número de telefone (verificar formato brasileiro)
@@ -71,26 +106,29 @@ class WhatsAppClient:
             'message': message
         }
         
+        http = self.session or requests
+        
         try:
             logger.info(f"Enviando mensagem WhatsApp para {formatted_phone}")
             
-            response = requests.post(
+            response = http.post(
                 url,
                 json=payload,
                 headers=headers,
-                timeout=30
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
                 logger.info("Mensagem WhatsApp enviada com sucesso")
-                return True
+                return True, False, ''
             else:
                 logger.error(f"Erro ao enviar mensagem WhatsApp: {response.text}")
-                return False
+                retryable = response.status_code in self.RETRYABLE_STATUS
+                return False, retryable, f"HTTP {response.status_code}: {response.text[:500]}"
                 
         except requests.exceptions.RequestException as e:
             logger.error(f"Erro de rede ao enviar mensagem WhatsApp: {e}")
-            return False
+            return False, True, str(e)
         except Exception as e:
             logger.error(f"Erro inesperado ao enviar mensagem WhatsApp: {e}")
-            return False
\ No newline at end of file
+            return False, False, str(e)
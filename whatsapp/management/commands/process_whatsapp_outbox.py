@@ -0,0 +1,65 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from whatsapp.outbox import RateLimiter, WhatsAppOutbox, get_outbox_setting
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de saída de mensagens WhatsApp'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa as mensagens pendentes e encerra (útil em cron)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Quantidade de mensagens reservadas por lote'
+        )
+
+    def handle(self, *args, **options):
+        self._running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        client = WhatsAppOutbox.build_client()
+        rate_limiter = RateLimiter(get_outbox_setting('RATE_LIMIT_PER_SECOND'))
+        poll_interval = get_outbox_setting('POLL_INTERVAL')
+        batch_size = options['batch_size']
+
+        self.stdout.write('📤 PROCESSANDO FILA DO WHATSAPP')
+
+        totals = {'sent': 0, 'pending': 0, 'failed': 0}
+        try:
+            while self._running:
+                counts = WhatsAppOutbox.process_batch(client, rate_limiter, limit=batch_size)
+                for status, count in counts.items():
+                    totals[status] += count
+
+                if any(counts.values()):
+                    self.stdout.write(
+                        f"   ✅ {counts['sent']} enviadas | 🔁 {counts['pending']} reagendadas | "
+                        f"❌ {counts['failed']} falharam"
+                    )
+                    continue
+
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+        finally:
+            client.session.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ FILA ENCERRADA: {totals['sent']} enviadas, "
+                f"{totals['pending']} reagendadas, {totals['failed']} falharam"
+            )
+        )
+
+    def _stop(self, signum, frame):
+        self._running = False
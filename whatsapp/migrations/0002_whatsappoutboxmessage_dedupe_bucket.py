@@ -0,0 +1,29 @@
+# Generated manually for atomic WhatsApp outbox deduplication
+
+from django.db import migrations, models
+
+
+def isolate_existing_messages(apps, schema_editor):
+    """Mensagens já enfileiradas recebem janelas próprias (negativas) para não violar a constraint"""
+    WhatsAppOutboxMessage = apps.get_model('whatsapp', 'WhatsAppOutboxMessage')
+    WhatsAppOutboxMessage.objects.update(dedupe_bucket=-models.F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whatsapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='whatsappoutboxmessage',
+            name='dedupe_bucket',
+            field=models.BigIntegerField(default=0, verbose_name='Janela de deduplicação'),
+        ),
+        migrations.RunPython(isolate_existing_messages, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='whatsappoutboxmessage',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'failed'), _negated=True), fields=('dedupe_key', 'dedupe_bucket'), name='whatsapp_outbox_dedupe_unique'),
+        ),
+    ]
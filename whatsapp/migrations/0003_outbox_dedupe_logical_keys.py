@@ -0,0 +1,26 @@
+# Generated manually: deduplicate only messages with a logical dedupe key
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whatsapp', '0002_whatsappoutboxmessage_dedupe_bucket'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='whatsappoutboxmessage',
+            name='whatsapp_outbox_dedupe_unique',
+        ),
+        migrations.AlterField(
+            model_name='whatsappoutboxmessage',
+            name='dedupe_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='Chave de deduplicação'),
+        ),
+        migrations.AddConstraint(
+            model_name='whatsappoutboxmessage',
+            constraint=models.UniqueConstraint(condition=models.Q(models.Q(('status', 'failed'), _negated=True), models.Q(('dedupe_key', ''), _negated=True)), fields=('dedupe_key', 'dedupe_bucket'), name='whatsapp_outbox_dedupe_unique'),
+        ),
+    ]
@@ -1,3 +1,48 @@
 from django.db import models
 
-# Create your models here.
+
+class WhatsAppOutboxMessage(models.Model):
+    """
+    Fila persistente de mensagens WhatsApp a enviar
+
+    As views apenas gravam mensagens aqui; o envio é feito pelo comando
+    process_whatsapp_outbox, fora do ciclo de request/response.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pendente'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviada'),
+        ('failed', 'Falhou'),
+    )
+
+    phone = models.CharField(max_length=20, verbose_name="Telefone")
+    message = models.TextField(verbose_name="Mensagem")
+    dedupe_key = models.CharField(max_length=64, db_index=True, blank=True, default='', verbose_name="Chave de deduplicação")
+    dedupe_bucket = models.BigIntegerField(default=0, verbose_name="Janela de deduplicação")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    next_attempt_at = models.DateTimeField(verbose_name="Próxima tentativa")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='', verbose_name="Último erro")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        verbose_name = "Mensagem WhatsApp na Fila"
+        verbose_name_plural = "Mensagens WhatsApp na Fila"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='whatsapp_outbox_due_idx'),
+        ]
+        constraints = [
+            # Garante a deduplicação mesmo com enfileiramentos concorrentes
+            # (só mensagens com chave lógica são deduplicadas)
+            models.UniqueConstraint(
+                fields=['dedupe_key', 'dedupe_bucket'],
+                condition=~models.Q(status='failed') & ~models.Q(dedupe_key=''),
+                name='whatsapp_outbox_dedupe_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"WhatsApp para {self.phone} ({self.get_status_display()})"
@@ -0,0 +1,206 @@
+# whatsapp/outbox.py
+"""
+Fila de saída (outbox) das notificações WhatsApp
+
+As views só gravam a mensagem na tabela; o comando process_whatsapp_outbox
+drena a fila com uma sessão HTTP reaproveitada, novas tentativas com backoff
+exponencial, deduplicação e limite de mensagens por segundo.
+"""
+import hashlib
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .client import WhatsAppClient
+from .models import WhatsAppOutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_OUTBOX_SETTINGS = {
+    'BATCH_SIZE': 20,
+    'MAX_ATTEMPTS': 6,
+    'BACKOFF_BASE': 30,
+    'BACKOFF_MAX': 60 * 60,
+    'RATE_LIMIT_PER_SECOND': 1,
+    'DEDUPE_WINDOW': 60 * 60,
+    'LOCK_TIMEOUT': 5 * 60,
+    'REQUEST_TIMEOUT': 15,
+    'POLL_INTERVAL': 2,
+}
+
+
+def get_outbox_setting(name):
+    """Lê uma configuração de settings.WHATSAPP_OUTBOX com valor padrão"""
+    return getattr(settings, 'WHATSAPP_OUTBOX', {}).get(name, DEFAULT_OUTBOX_SETTINGS[name])
+
+
+class RateLimiter:
+    """Espaça os envios para no máximo N mensagens por segundo"""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second and per_second > 0 else 0
+        self._next_slot = 0.0
+
+    def wait(self):
+        now = time.monotonic()
+        if now < self._next_slot:
+            time.sleep(self._next_slot - now)
+            now = self._next_slot
+        self._next_slot = now + self.interval
+
+
+class WhatsAppOutbox:
+    """Operações sobre a fila de mensagens WhatsApp"""
+
+    @staticmethod
+    def make_dedupe_key(phone, dedupe_key):
+        """Chave de deduplicação: hash do número + identificador lógico da notificação"""
+        digits = ''.join(filter(str.isdigit, phone))
+        return hashlib.sha256(f"{digits}|{dedupe_key}".encode('utf-8')).hexdigest()
+
+    @classmethod
+    def enqueue(cls, phone, message, dedupe_key=None):
+        """
+        Coloca uma mensagem na fila de envio
+
+        Args:
+            phone (str): Número do destinatário
+            message (str): Conteúdo da mensagem
+            dedupe_key (str): Identificador lógico da notificação (opcional).
+                Só mensagens com a mesma chave para o mesmo número dentro de
+                DEDUPE_WINDOW são deduplicadas; sem chave, toda mensagem é enviada.
+
+        Returns:
+            bool: True se a mensagem está na fila (nova ou já existente)
+        """
+        now = timezone.now()
+        if not dedupe_key:
+            WhatsAppOutboxMessage.objects.create(phone=phone, message=message, next_attempt_at=now)
+            return True
+
+        key = cls.make_dedupe_key(phone, dedupe_key)
+        window = get_outbox_setting('DEDUPE_WINDOW')
+        window_start = now - timedelta(seconds=window)
+
+        duplicate = WhatsAppOutboxMessage.objects.filter(
+            dedupe_key=key,
+            created_at__gte=window_start,
+        ).exclude(status='failed').exists()
+        if duplicate:
+            logger.info(f"Mensagem WhatsApp duplicada para {phone} ignorada")
+            return True
+
+        # A constraint única (dedupe_key, dedupe_bucket) resolve a corrida entre
+        # duas requisições que passaram pela verificação acima ao mesmo tempo
+        try:
+            with transaction.atomic():
+                WhatsAppOutboxMessage.objects.create(
+                    phone=phone,
+                    message=message,
+                    dedupe_key=key,
+                    dedupe_bucket=int(now.timestamp()) // max(window, 1),
+                    next_attempt_at=now,
+                )
+        except IntegrityError:
+            logger.info(f"Mensagem WhatsApp duplicada para {phone} ignorada (enfileiramento concorrente)")
+        return True
+
+    @staticmethod
+    def claim_batch(limit):
+        """
+        Reserva um lote de mensagens prontas para envio
+
+        Usa SKIP LOCKED para que vários workers não peguem a mesma mensagem;
+        mensagens presas em 'sending' (worker interrompido) são recuperadas
+        após LOCK_TIMEOUT.
+        """
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=get_outbox_setting('LOCK_TIMEOUT'))
+
+        with transaction.atomic():
+            message_ids = list(
+                WhatsAppOutboxMessage.objects.select_for_update(skip_locked=True).filter(
+                    Q(status='pending', next_attempt_at__lte=now) |
+                    Q(status='sending', locked_at__lt=stale_before)
+                ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:limit]
+            )
+            if not message_ids:
+                return []
+
+            WhatsAppOutboxMessage.objects.filter(id__in=message_ids).update(
+                status='sending',
+                locked_at=now,
+                attempts=F('attempts') + 1,
+            )
+
+        return list(WhatsAppOutboxMessage.objects.filter(id__in=message_ids).order_by('next_attempt_at', 'id'))
+
+    @staticmethod
+    def get_backoff(attempts):
+        """Intervalo até a próxima tentativa (exponencial com teto)"""
+        delay = get_outbox_setting('BACKOFF_BASE') * (2 ** max(attempts - 1, 0))
+        return timedelta(seconds=min(delay, get_outbox_setting('BACKOFF_MAX')))
+
+    @classmethod
+    def deliver(cls, outbox_message, client):
+        """
+        Envia uma mensagem reservada e registra o resultado
+
+        Returns:
+            str: status final da mensagem ('sent', 'pending' ou 'failed')
+        """
+        success, retryable, error = client.deliver(outbox_message.phone, outbox_message.message)
+        now = timezone.now()
+
+        if success:
+            status = 'sent'
+            updates = {'status': status, 'sent_at': now, 'locked_at': None, 'last_error': ''}
+        elif retryable and outbox_message.attempts < get_outbox_setting('MAX_ATTEMPTS'):
+            status = 'pending'
+            updates = {
+                'status': status,
+                'locked_at': None,
+                'last_error': error,
+                'next_attempt_at': now + cls.get_backoff(outbox_message.attempts),
+            }
+        else:
+            status = 'failed'
+            updates = {'status': status, 'locked_at': None, 'last_error': error}
+            logger.error(
+                f"Mensagem WhatsApp {outbox_message.id} descartada após "
+                f"{outbox_message.attempts} tentativa(s): {error}"
+            )
+
+        WhatsAppOutboxMessage.objects.filter(pk=outbox_message.pk).update(**updates)
+        return status
+
+    @classmethod
+    def process_batch(cls, client, rate_limiter, limit=None):
+        """
+        Reserva e envia um lote de mensagens
+
+        Returns:
+            dict: contagem por status final
+        """
+        limit = limit or get_outbox_setting('BATCH_SIZE')
+        counts = {'sent': 0, 'pending': 0, 'failed': 0}
+
+        for outbox_message in cls.claim_batch(limit):
+            rate_limiter.wait()
+            counts[cls.deliver(outbox_message, client)] += 1
+
+        return counts
+
+    @staticmethod
+    def build_client():
+        """Cliente com sessão HTTP keep-alive, reaproveitado por todo o worker"""
+        return WhatsAppClient(
+            session=WhatsAppClient.build_session(),
+            timeout=get_outbox_setting('REQUEST_TIMEOUT'),
+        )
@@ -1,6 +1,6 @@
 # whatsapp/services.py
 from django.conf import settings
-from .client import WhatsAppClient
+from .outbox import WhatsAppOutbox
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,16 +26,20 @@ class WhatsAppNotificationService:
         return self.send_notification(phone_number, message)
     
     @staticmethod
-    def send_notification(phone, message):
+    def send_notification(phone, message, dedupe_key=None):
         """
-        Envia uma notificação WhatsApp se o serviço estiver ativo
+        Coloca uma notificação WhatsApp na fila de envio se o serviço estiver ativo
+        
+        O envio é feito pelo comando process_whatsapp_outbox, fora do ciclo
+        de request/response.
         
         Args:
             phone (str): Número do destinatário
             message (str): Conteúdo da mensagem
+            dedupe_key (str): Identificador lógico da notificação (opcional)
             
         Returns:
-            bool: True se a mensagem foi enviada com sucesso, False caso contrário
+            bool: True se a mensagem foi colocada na fila, False caso contrário
         """
         # Verificar se o serviço WhatsApp está ativado
         if not getattr(settings, 'WHATSAPP_ENABLED', False):
@@ -45,9 +49,8 @@ class WhatsAppNotificationService:
             logger.warning("Tentativa de enviar mensagem sem número de telefone")
             return False
             
-        # Enviar a mensagem
-        client = WhatsAppClient()
-        return client.send_message(phone, message)
+        # Enfileirar a mensagem
+        return WhatsAppOutbox.enqueue(phone, message, dedupe_key=dedupe_key)
     
     @staticmethod
     def notify_user_registration(user):
@@ -228,20 +231,12 @@ Acesse o sistema para revisar esta solicitação.
         if not professor.phone_number:
             return
         
-        message = f"""
-*Solicitação de Agendamento Aprovada*
-
-Sua solicitação de agendamento foi aprovada.
-
-*Laboratório:* {schedule_request.laboratory.name}
-*Data:* {schedule_request.scheduled_date.strftime('%d/%m/%Y')}
-*Horário:* {schedule_request.start_time.strftime('%H:%M')} - {schedule_request.end_time.strftime('%H:%M')}
-*Disciplina:* {schedule_request.subject}
-
-Para mais detalhes, acesse o sistema LabConnect.
-        """.strip()
-        
-        WhatsAppNotificationService.send_notification(professor.phone_number, message)
+        message = WhatsAppNotificationService._build_schedule_approval_message(schedule_request)
+        WhatsAppNotificationService.send_notification(
+            professor.phone_number,
+            message,
+            dedupe_key=WhatsAppNotificationService._approval_dedupe_key(schedule_request)
+        )
     
     @staticmethod
     def notify_schedule_rejection(schedule_request):
@@ -254,23 +249,86 @@ Para mais detalhes, acesse o sistema LabConnect.
         if not getattr(settings, 'WHATSAPP_ENABLED', False):
             return
         
-        # Verificar se a notificação já foi enviada (previne duplicação)
-        from django.core.cache import cache
-        cache_key = f"whatsapp_notify_schedule_{schedule_request.id}"
-        if cache.get(cache_key):
-            # Notificação já foi enviada, não enviar novamente
-            logger.info(f"Notificação de agendamento {schedule_request.id} já enviada. Ignorando.")
-            return
-        
-        # Marcar como enviada para evitar duplicação
-        cache.set(cache_key, True, timeout=3600)  # 1 hora de timeout
-
         professor = schedule_request.professor
         if not professor.phone_number:
             return
         
+        message = WhatsAppNotificationService._build_schedule_rejection_message(schedule_request)
+        WhatsAppNotificationService.send_notification(
+            professor.phone_number,
+            message,
+            dedupe_key=WhatsAppNotificationService._rejection_dedupe_key(schedule_request)
+        )
+    
+    @staticmethod
+    def notify_schedule_reviews(approved_requests=(), rejected_requests=()):
+        """
+        Enfileira em lote as notificações dos professores sobre solicitações
+        aprovadas e rejeitadas
+        
+        Args:
+            approved_requests: Solicitações aprovadas
+            rejected_requests: Solicitações rejeitadas
+            
+        Returns:
+            int: Quantidade de mensagens colocadas na fila
+        """
+        if not getattr(settings, 'WHATSAPP_ENABLED', False):
+            return 0
+        
+        outgoing = []
+        for schedule_request in approved_requests:
+            outgoing.append((
+                schedule_request.professor.phone_number,
+                WhatsAppNotificationService._build_schedule_approval_message(schedule_request),
+                WhatsAppNotificationService._approval_dedupe_key(schedule_request)
+            ))
+        for schedule_request in rejected_requests:
+            outgoing.append((
+                schedule_request.professor.phone_number,
+                WhatsAppNotificationService._build_schedule_rejection_message(schedule_request),
+                WhatsAppNotificationService._rejection_dedupe_key(schedule_request)
+            ))
+        
+        queued_count = 0
+        for phone, message, dedupe_key in outgoing:
+            if phone and WhatsAppOutbox.enqueue(phone, message, dedupe_key=dedupe_key):
+                queued_count += 1
+        
+        logger.info(f"Notificações de revisão em lote: {queued_count}/{len(outgoing)} na fila")
+        return queued_count
+    
+    @staticmethod
+    def _approval_dedupe_key(schedule_request):
+        """Chave que impede notificar a mesma aprovação mais de uma vez"""
+        return f"schedule_approval_{schedule_request.id}"
+    
+    @staticmethod
+    def _rejection_dedupe_key(schedule_request):
+        """Chave que impede notificar a mesma rejeição mais de uma vez"""
+        return f"schedule_rejection_{schedule_request.id}"
+    
+    @staticmethod
+    def _build_schedule_approval_message(schedule_request):
+        """Monta a mensagem de aprovação de agendamento"""
+        return f"""
+*Solicitação de Agendamento Aprovada*
+
+Sua solicitação de agendamento foi aprovada.
+
+*Laboratório:* {schedule_request.laboratory.name}
+*Data:* {schedule_request.scheduled_date.strftime('%d/%m/%Y')}
+*Horário:* {schedule_request.start_time.strftime('%H:%M')} - {schedule_request.end_time.strftime('%H:%M')}
+*Disciplina:* {schedule_request.subject}
+
+Para mais detalhes, acesse o sistema LabConnect.
+        """.strip()
+    
+    @staticmethod
+    def _build_schedule_rejection_message(schedule_request):
+        """Monta a mensagem de rejeição de agendamento"""
         rejection_reason = schedule_request.rejection_reason or "Não especificado"
-        message = f"""
+        return f"""
 *Solicitação de Agendamento Rejeitada*
 
 Sua solicitação de agendamento foi rejeitada.
@@ -285,8 +343,6 @@ Sua solicitação de agendamento foi rejeitada.
 
 Para mais informações, entre em contato com o laboratório ou crie uma nova solicitação.
         """.strip()
-        
-        WhatsAppNotificationService.send_notification(professor.phone_number, message)
     
     @staticmethod
     def notify_professor_message(comment):
@@ -0,0 +1,276 @@
+# whatsapp/tests.py
+"""
+Testes da fila de saída do WhatsApp contra um gateway HTTP local (stub)
+"""
+import json
+import threading
+import time
+from datetime import date, time as clock, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from laboratories.models import Laboratory
+from scheduling.models import ScheduleRequest
+
+from .models import WhatsAppOutboxMessage
+from .outbox import RateLimiter, WhatsAppOutbox
+
+
+class GatewayStub:
+    """
+    Gateway WhatsApp falso em uma thread: registra as requisições e responde
+    com os status programados (200 quando a fila de respostas acaba)
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub.lock:
+                    stub.requests.append((time.monotonic(), self.path, body))
+                    status = stub.responses.pop(0) if stub.responses else 200
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}/api'
+
+    @property
+    def messages(self):
+        return [body['message'] for _, _, body in self.requests]
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GatewayStubMixin:
+    """Sobe o stub por teste e aponta WHATSAPP_SERVICE_URL para ele"""
+
+    def setUp(self):
+        super().setUp()
+        self.gateway = GatewayStub()
+        self.gateway.start()
+        self.addCleanup(self.gateway.stop)
+        settings_override = override_settings(
+            WHATSAPP_ENABLED=True,
+            WHATSAPP_SERVICE_URL=self.gateway.url,
+            WHATSAPP_OUTBOX={'RATE_LIMIT_PER_SECOND': 0, 'BACKOFF_BASE': 30, 'MAX_ATTEMPTS': 3},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def drain(self, rate_limiter=None):
+        client = WhatsAppOutbox.build_client()
+        try:
+            return WhatsAppOutbox.process_batch(client, rate_limiter or RateLimiter(0))
+        finally:
+            client.session.close()
+
+
+class WhatsAppOutboxTests(GatewayStubMixin, TestCase):
+
+    def test_enqueue_does_not_call_the_gateway(self):
+        WhatsAppOutbox.enqueue('11 98888-7777', 'Solicitação aprovada')
+
+        self.assertEqual(self.gateway.requests, [])
+        message = WhatsAppOutboxMessage.objects.get()
+        self.assertEqual(message.status, 'pending')
+        self.assertEqual(message.dedupe_key, '')
+
+    def test_drain_sends_pending_messages(self):
+        WhatsAppOutbox.enqueue('11988887777', 'Primeira')
+        WhatsAppOutbox.enqueue('11988887777', 'Segunda')
+
+        counts = self.drain()
+
+        self.assertEqual(counts, {'sent': 2, 'pending': 0, 'failed': 0})
+        self.assertEqual(self.gateway.messages, ['Primeira', 'Segunda'])
+        self.assertEqual(set(WhatsAppOutboxMessage.objects.values_list('status', flat=True)), {'sent'})
+
+    def test_drain_command_once(self):
+        WhatsAppOutbox.enqueue('11988887777', 'Pelo comando')
+
+        call_command('process_whatsapp_outbox', '--once', stdout=StringIO())
+
+        self.assertEqual(self.gateway.messages, ['Pelo comando'])
+        self.assertEqual(WhatsAppOutboxMessage.objects.get().status, 'sent')
+
+    def test_5xx_is_retried_with_backoff(self):
+        self.gateway.responses = [503, 502]
+        WhatsAppOutbox.enqueue('11988887777', 'Tente de novo')
+
+        before = timezone.now()
+        self.assertEqual(self.drain()['pending'], 1)
+        message = WhatsAppOutboxMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertIn('HTTP 503', message.last_error)
+        self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=30))
+
+        # Ainda dentro do backoff: nada é enviado
+        self.assertEqual(self.drain(), {'sent': 0, 'pending': 0, 'failed': 0})
+        self.assertEqual(len(self.gateway.requests), 1)
+
+        # Backoff exponencial: a segunda falha espera o dobro
+        WhatsAppOutboxMessage.objects.update(next_attempt_at=timezone.now())
+        before = timezone.now()
+        self.assertEqual(self.drain()['pending'], 1)
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 2)
+        self.assertGreaterEqual(message.next_attempt_at, before + timedelta(seconds=60))
+
+        WhatsAppOutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(self.drain()['sent'], 1)
+        self.assertEqual(len(self.gateway.requests), 3)
+
+    def test_retries_stop_at_max_attempts_and_4xx_fails_at_once(self):
+        self.gateway.responses = [500, 500, 500]
+        WhatsAppOutbox.enqueue('11988887777', 'Sempre falha')
+        for _ in range(3):
+            WhatsAppOutboxMessage.objects.update(next_attempt_at=timezone.now())
+            self.drain()
+        self.assertEqual(WhatsAppOutboxMessage.objects.get().status, 'failed')
+
+        WhatsAppOutboxMessage.objects.all().delete()
+        self.gateway.responses = [400]
+        WhatsAppOutbox.enqueue('11988887777', 'Número inválido')
+        self.assertEqual(self.drain()['failed'], 1)
+        self.assertEqual(len(self.gateway.requests), 4)
+
+    def test_dedupe_only_with_logical_key(self):
+        for _ in range(2):
+            WhatsAppOutbox.enqueue('11988887777', 'Aprovada', dedupe_key='schedule_approval_1')
+            WhatsAppOutbox.enqueue('11988887777', 'Lembrete')
+        # Mesma chave para outro número não é duplicata
+        WhatsAppOutbox.enqueue('11977776666', 'Aprovada', dedupe_key='schedule_approval_1')
+
+        messages = list(WhatsAppOutboxMessage.objects.values_list('phone', 'message'))
+        self.assertEqual(messages.count(('11988887777', 'Aprovada')), 1)
+        self.assertEqual(messages.count(('11988887777', 'Lembrete')), 2)
+        self.assertEqual(messages.count(('11977776666', 'Aprovada')), 1)
+
+        self.drain()
+        self.assertEqual(len(self.gateway.requests), 4)
+
+    def test_failed_message_does_not_block_its_dedupe_key(self):
+        WhatsAppOutbox.enqueue('11988887777', 'Aprovada', dedupe_key='schedule_approval_1')
+        WhatsAppOutboxMessage.objects.update(status='failed')
+
+        WhatsAppOutbox.enqueue('11988887777', 'Aprovada', dedupe_key='schedule_approval_1')
+
+        self.assertEqual(WhatsAppOutboxMessage.objects.filter(status='pending').count(), 1)
+
+    def test_rate_limit_spaces_out_deliveries(self):
+        for index in range(4):
+            WhatsAppOutbox.enqueue('11988887777', f'Mensagem {index}')
+
+        self.drain(RateLimiter(10))
+
+        timestamps = [sent_at for sent_at, _, _ in self.gateway.requests]
+        self.assertEqual(len(timestamps), 4)
+        gaps = [second - first for first, second in zip(timestamps, timestamps[1:])]
+        self.assertGreaterEqual(min(gaps), 0.08)
+
+    def test_claimed_messages_are_not_claimed_again(self):
+        WhatsAppOutbox.enqueue('11988887777', 'Uma vez')
+
+        claimed = WhatsAppOutbox.claim_batch(10)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(WhatsAppOutbox.claim_batch(10), [])
+
+        # Worker interrompido: a reserva expira após LOCK_TIMEOUT e a mensagem volta
+        WhatsAppOutboxMessage.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(len(WhatsAppOutbox.claim_batch(10)), 1)
+
+
+class WhatsAppEnqueueViewTests(GatewayStubMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.technician = User.objects.create(
+            email='tecnico@cogna.com.br', first_name='Tiago', last_name='Tec',
+            user_type='technician', is_approved=True, phone_number='11977776666',
+        )
+        cls.professor = User.objects.create(
+            email='professor@cogna.com.br', first_name='Paula', last_name='Prof',
+            user_type='professor', is_approved=True, phone_number='11988887777',
+        )
+        cls.laboratory = Laboratory.objects.create(name='Química 1', location='Bloco A', capacity=30)
+
+    def test_bulk_review_only_enqueues(self):
+        schedule = ScheduleRequest.objects.create(
+            professor=self.professor, laboratory=self.laboratory, subject='Titulação',
+            scheduled_date=date(2030, 3, 14), start_time=clock(8, 0), end_time=clock(10, 0),
+        )
+        self.client.force_login(self.technician)
+
+        for _ in range(2):
+            # Envio duplicado da mesma aprovação
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('bulk_review_requests_api'),
+                    data=json.dumps({'ids': [schedule.id], 'action': 'approve'}),
+                    content_type='application/json',
+                )
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.gateway.requests, [])
+        message = WhatsAppOutboxMessage.objects.get()
+        self.assertEqual(message.phone, '11988887777')
+        self.assertEqual(message.status, 'pending')
+
+
+@skipUnless(connection.features.has_select_for_update_skip_locked, 'banco sem SELECT ... SKIP LOCKED')
+class WhatsAppOutboxConcurrencyTests(GatewayStubMixin, TransactionTestCase):
+
+    def test_concurrent_workers_send_each_message_once(self):
+        for index in range(30):
+            WhatsAppOutbox.enqueue('11988887777', f'Mensagem {index}')
+
+        errors = []
+
+        def worker():
+            client = WhatsAppOutbox.build_client()
+            try:
+                while WhatsAppOutbox.process_batch(client, RateLimiter(0), limit=3)['sent']:
+                    pass
+            except Exception as e:
+                errors.append(e)
+            finally:
+                client.session.close()
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(self.gateway.messages), sorted(f'Mensagem {index}' for index in range(30)))
+        self.assertEqual(WhatsAppOutboxMessage.objects.filter(status='sent').count(), 30)